@@ -0,0 +1,51 @@
+"""Compares the time of summing the copies of a tensor held by several workers
+so that each worker holds the sum: through the client (get with a sum
+reduction, then send to every worker), and with the workers sending chunks to
+each other (ring and tree all-reduce).
+
+Usage: python benchmarks/all_reduce.py [num_workers] [size] [runs]
+"""
+import sys
+import time
+
+import torch
+
+from syft.core.hooks import TorchHook
+from syft.core.workers import VirtualWorker
+
+
+def client_relay(x, workers):
+    x.get(reduce='sum')
+    x.send(workers)
+
+
+def ring(x, workers):
+    x.all_reduce('sum', 'ring')
+
+
+def tree(x, workers):
+    x.all_reduce('sum', 'tree')
+
+
+def main(num_workers=4, size=1000000, runs=5):
+    hook = TorchHook(verbose=False)
+    workers = [VirtualWorker(id=i, hook=hook, verbose=False) for i in range(1, num_workers + 1)]
+    for worker in workers:
+        hook.local_worker.add_worker(worker)
+        for other in workers:
+            if other is not worker:
+                worker.add_worker(other)
+
+    for name, reduction in [('client relay', client_relay), ('ring', ring), ('tree', tree)]:
+        times = []
+        for _ in range(runs):
+            x = torch.FloatTensor(size).uniform_().send(workers)
+            start = time.time()
+            reduction(x, workers)
+            times.append(time.time() - start)
+        print('{:>12}: {:8.1f} ms per all-reduce of {} floats on {} workers'.format(
+            name, sorted(times)[runs // 2] * 1000, size, num_workers))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,51 @@
+"""Compares the throughput of many small remote torch commands sent one message
+per command with the same commands queued and sent in batches of queue_size
+commands. The remote worker is a VirtualWorker adding a fixed latency to every
+message to stand for the network round trip.
+
+Usage: python benchmarks/batched_commands.py [num_commands] [queue_size] [latency_ms]
+"""
+import sys
+import time
+
+import torch
+
+from syft.core.hooks import TorchHook
+from syft.core.workers import VirtualWorker
+
+
+class LatencyWorker(VirtualWorker):
+    latency = 0.001
+
+    def receive_msg(self, message_wrapper_json, is_binary=True):
+        time.sleep(self.latency)
+        return super().receive_msg(message_wrapper_json, is_binary)
+
+
+def time_commands(remote, num_commands):
+    x = torch.FloatTensor([1, 2, 3, 4, 5]).send(remote)
+    start = time.time()
+    y = x
+    for _ in range(num_commands):
+        y = y + x
+    y.get()
+    return num_commands / (time.time() - start)
+
+
+def main(num_commands=1000, queue_size=100, latency_ms=1):
+    hook = TorchHook(verbose=False)
+    local = hook.local_worker
+    remote = LatencyWorker(id=2, hook=hook)
+    remote.latency = latency_ms / 1000
+    local.add_worker(remote)
+
+    for size in [0, queue_size]:
+        local.queue_size = size
+        throughput = time_commands(remote, num_commands)
+        mode = 'batches of {}'.format(size) if size else 'one message per command'
+        print('{:>24}: {:10.0f} commands/s'.format(mode, throughput))
+    local.queue_size = 0
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,59 @@
+"""Measures the cost of encoding a torch command on the client and decoding it
+on the worker, with the former generic encoding (utils.PythonEncoder and the
+regex based utils.PythonJSONDecoder) and with the compact command encoding
+(utils.CommandEncoder and utils.CommandDecoder).
+
+Usage: python benchmarks/command_encoding.py [num_commands]
+"""
+import sys
+import json
+import time
+
+import torch
+
+from syft.core import utils
+from syft.core.hooks import TorchHook
+from syft.core.workers import VirtualWorker
+
+
+def generic_round_trip(worker, x, y, args):
+    command = {'has_self': True, 'self': x, 'command': 'index_select',
+               'args': args, 'kwargs': {'dim': 0, 'index': y}}
+    command, _ = utils.PythonEncoder().encode(command, retrieve_tensorvar=True)
+    message = json.dumps({'message': command, 'type': 'torch_cmd'})
+    return utils.PythonJSONDecoder(worker).decode(message)['message']
+
+
+def compact_round_trip(hook, worker, x, y, args):
+    command, _ = hook.command_encoder.encode('index_select', True, x, args,
+                                             {'dim': 0, 'index': y})
+    message = json.dumps({'message': command, 'type': 'torch_cmd'})
+    command = utils.PythonJSONDecoder(worker).decode(message)['message']
+    return utils.CommandDecoder(hook.command_names, worker).decode(command)
+
+
+def time_round_trips(round_trip, num_commands):
+    start = time.time()
+    for _ in range(num_commands):
+        round_trip()
+    return (time.time() - start) / num_commands
+
+
+def main(num_commands=10000):
+    hook = TorchHook(verbose=False)
+    remote = VirtualWorker(id=2, hook=hook)
+    hook.local_worker.add_worker(remote)
+
+    x = torch.FloatTensor([1, 2, 3, 4, 5]).send(remote)
+    y = torch.LongTensor([0, 2]).send(remote)
+    args = [[x, (1, [1.5], y)], slice(0, 2, None), 3]
+
+    for name, round_trip in [
+            ('generic', lambda: generic_round_trip(remote, x, y, args)),
+            ('compact', lambda: compact_round_trip(hook, remote, x, y, args))]:
+        cost = time_round_trips(round_trip, num_commands)
+        print('{:>8}: {:8.2f} us per command'.format(name, cost * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
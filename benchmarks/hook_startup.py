@@ -0,0 +1,39 @@
+"""Measures the startup time of syft: the wall time of `import syft` followed
+by the first `TorchHook()` (which hooks torch) in a fresh interpreter, and the
+time of creating another TorchHook in the same process (as every test does).
+
+Usage: python benchmarks/hook_startup.py [runs]
+"""
+import sys
+import time
+import subprocess
+
+STARTUP = """
+import time
+start = time.time()
+import syft
+from syft.core.hooks import TorchHook
+TorchHook(verbose=False)
+first = time.time() - start
+start = time.time()
+TorchHook(verbose=False)
+print(first, time.time() - start)
+"""
+
+
+def main(runs=5):
+    first, next_ = [], []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', STARTUP])
+        times = [float(t) for t in output.decode().split()]
+        first.append(times[0])
+        next_.append(times[1])
+
+    print('import syft + first TorchHook(): {:8.1f} ms (median of {})'.format(
+        sorted(first)[runs // 2] * 1000, runs))
+    print('           next TorchHook()    : {:8.1f} ms'.format(
+        sorted(next_)[runs // 2] * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
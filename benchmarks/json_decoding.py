@@ -0,0 +1,58 @@
+"""Measures the cost of decoding deeply nested arguments encoded by
+utils.PythonEncoder with utils.PythonJSONDecoder, compared with plain
+json.loads of the same message (no python types nor tensors rebuilt).
+
+Usage: python benchmarks/json_decoding.py [depth] [width] [repeats]
+"""
+import sys
+import json
+import time
+
+import torch
+
+from syft.core import utils
+from syft.core.hooks import TorchHook
+from syft.core.workers import VirtualWorker
+
+
+def nested_args(x, depth, width):
+    """Nested tuples, lists and slices of width items, with a tensor in each"""
+    if depth == 0:
+        return (x, slice(0, 2, None), 1.5)
+    children = [nested_args(x, depth - 1, width) for _ in range(width)]
+    return tuple(children) if depth % 2 else children
+
+
+def count_nodes(obj):
+    if isinstance(obj, (list, tuple)):
+        return 1 + sum(count_nodes(x) for x in obj)
+    return 1
+
+
+def time_decoding(decode, message, repeats):
+    start = time.time()
+    for _ in range(repeats):
+        decode(message)
+    return (time.time() - start) / repeats
+
+
+def main(depth=6, width=3, repeats=20):
+    hook = TorchHook(verbose=False)
+    remote = VirtualWorker(id=2, hook=hook)
+    hook.local_worker.add_worker(remote)
+    x = torch.FloatTensor([1, 2, 3]).send(remote)
+
+    args = nested_args(x, depth, width)
+    message = json.dumps(utils.PythonEncoder().encode(args))
+    nodes = count_nodes(args)
+    print('{} nodes, {} KB'.format(nodes, len(message) // 1024))
+
+    for name, decode in [('json.loads', json.loads),
+                         ('PythonJSONDecoder', utils.PythonJSONDecoder(remote).decode)]:
+        cost = time_decoding(decode, message, repeats)
+        print('{:>18}: {:8.2f} ms, {:6.3f} us per node'.format(
+            name, cost * 1000, cost * 1e6 / nodes))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,45 @@
+"""Measures the overhead of the hook on local computations: the time of
+common methods called on local tensors and Variables through the hooked
+methods, compared with the original torch methods (kept as old_<name>).
+
+Usage: python benchmarks/local_dispatch.py [repeats]
+"""
+import sys
+import time
+
+import torch
+from torch.autograd import Variable
+
+from syft.core.hooks import TorchHook
+
+METHODS = [('add', lambda x: (x,)),
+           ('mul', lambda x: (x,)),
+           ('mm', lambda x: (x,)),
+           ('sigmoid', lambda x: ()),
+           ('view', lambda x: (-1,)),
+           ('sum', lambda x: ())]
+
+
+def time_calls(method, x, args, repeats):
+    start = time.time()
+    for _ in range(repeats):
+        method(x, *args)
+    return (time.time() - start) / repeats
+
+
+def main(repeats=20000):
+    TorchHook(verbose=False)
+
+    for name, x in [('FloatTensor', torch.FloatTensor(8, 8).uniform_()),
+                    ('Variable', Variable(torch.FloatTensor(8, 8).uniform_()))]:
+        print(name)
+        for method, make_args in METHODS:
+            args = make_args(x)
+            hooked = time_calls(getattr(type(x), method), x, args, repeats)
+            original = time_calls(getattr(type(x), 'old_' + method), x, args, repeats)
+            print('  {:>8}: hooked {:6.2f} us, torch {:6.2f} us, overhead x{:.2f}'.format(
+                method, hooked * 1e6, original * 1e6, hooked / original))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
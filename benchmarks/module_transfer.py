@@ -0,0 +1,49 @@
+"""Compares the time of sending a model with many parameters to a worker and
+getting it back, one message per parameter (p.send_/p.get_) and with the whole
+module sent and fetched in a single message (Module.send/Module.get).
+
+Usage: python benchmarks/module_transfer.py [num_layers] [width] [runs]
+"""
+import sys
+import time
+
+import torch
+import torch.nn as nn
+
+from syft.core.hooks import TorchHook
+from syft.core.workers import VirtualWorker
+
+
+def per_parameter(model, remote):
+    for p in model.parameters():
+        p.send_(remote)
+    for p in model.parameters():
+        p.get_()
+
+
+def whole_module(model, remote):
+    model.send(remote)
+    model.get()
+
+
+def main(num_layers=50, width=32, runs=5):
+    hook = TorchHook(verbose=False)
+    remote = VirtualWorker(id=2, hook=hook)
+    hook.local_worker.add_worker(remote)
+
+    # 2 parameters (weight and bias) per layer
+    model = nn.Sequential(*[nn.Linear(width, width) for _ in range(num_layers)])
+    model(torch.autograd.Variable(torch.zeros(1, width))).sum().backward()
+
+    for name, transfer in [('per parameter', per_parameter), ('whole module', whole_module)]:
+        times = []
+        for _ in range(runs):
+            start = time.time()
+            transfer(model, remote)
+            times.append(time.time() - start)
+        print('{:>14}: {:8.1f} ms per send + get of {} parameters'.format(
+            name, sorted(times)[runs // 2] * 1000, 2 * num_layers))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,66 @@
+"""Compares the throughput of SPDZ multiplications (elementwise and matmul)
+with shares in the field of the integers modulo 2**31 - 1 (syft.mpc.spdz)
+and in the ring Z_2^64 (syft.mpc.ring), for two parties running in two
+threads. Also reports the fraction of matmul results which were correct:
+the products of the field overflow int64.
+
+Usage: python benchmarks/ring_vs_field.py [size] [runs]
+"""
+import functools
+import sys
+import threading
+import time
+
+import torch
+
+from syft.mpc import ring, spdz
+from syft.mpc.interface.local_interface import LocalInterface
+
+
+def run_parties(protocol, x_shares, y_shares):
+    interfaces = LocalInterface.pair()
+    results = [None, None]
+
+    def run(party):
+        results[party] = protocol(x_shares[party], y_shares[party], interfaces[party])
+
+    threads = [threading.Thread(target=run, args=(party,)) for party in (0, 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def bench(engine, op, x, y, expected, runs, **options):
+    """Returns the median time of op and the fraction of correct results."""
+    x_shares = engine.share(engine.encode(x, 0))
+    y_shares = engine.share(engine.encode(y, 0))
+    protocol = functools.partial(getattr(engine, op), **options)
+    times, correct = [], 0
+    for _ in range(runs):
+        start = time.time()
+        results = run_parties(protocol, x_shares, y_shares)
+        times.append(time.time() - start)
+        correct += torch.equal(engine.reconstruct(results), expected)
+    return sorted(times)[runs // 2], correct / runs
+
+
+def main(size=256, runs=5):
+    # small values, so that the results fit in the field
+    x = torch.LongTensor(size, size).random_(10).float()
+    y = torch.LongTensor(size, size).random_(10).float()
+    cases = [('mul', 'spdz_mul', (x * y).long(), size * size),
+             ('matmul', 'spdz_matmul', (x @ y).long(), 2 * size**3)]
+
+    for name, op, expected, ops in cases:
+        # the field has no fractional precision, use none in the ring either
+        for engine_name, engine, options in [('field', spdz, {}),
+                                             ('ring', ring, {'precision_fractional': 0})]:
+            elapsed, correct = bench(engine, op, x, y, expected, runs, **options)
+            print('{:>6} {:>5}: {:8.1f} ms, {:8.1f} Mop/s, {:4.0%} correct ({}x{})'.format(
+                name, engine_name, elapsed * 1000, ops / elapsed / 1e6, correct, size, size))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,52 @@
+"""Compares the latency of remote torch commands sent through a WebSocketWorker
+that opens a new connection per message with one that keeps a persistent,
+multiplexed connection.
+
+Usage: python benchmarks/websocket_latency.py [num_commands] [port]
+"""
+import sys
+import time
+import multiprocessing
+
+import torch
+
+from syft.core.hooks import TorchHook
+from syft.core.workers import WebSocketWorker
+
+
+def serve(port):
+    hook = TorchHook(verbose=False)
+    WebSocketWorker(hook=hook, id=2, port=port, is_pointer=False,
+                    is_client_worker=False, verbose=False)
+
+
+def time_commands(hook, remote, num_commands):
+    x = torch.FloatTensor([1, 2, 3, 4, 5]).send(remote)
+    start = time.time()
+    for _ in range(num_commands):
+        x + x
+    return (time.time() - start) / num_commands
+
+
+def main(num_commands=200, port=8765):
+    server = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    time.sleep(2)
+
+    hook = TorchHook(local_worker=WebSocketWorker(id=0, port=port + 1, verbose=False),
+                     verbose=False)
+    try:
+        for persistent in [False, True]:
+            remote = WebSocketWorker(hook=hook, id=2, port=port, is_pointer=True,
+                                     verbose=False, persistent=persistent)
+            hook.local_worker.add_worker(remote)
+            latency = time_commands(hook, remote, num_commands)
+            mode = 'persistent' if persistent else 'connection per message'
+            print('{:>24}: {:8.3f} ms per command'.format(mode, latency * 1000))
+            remote.close()
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
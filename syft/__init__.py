@@ -1,5 +1,6 @@
 """Some syft imports..."""
 from . import core
 from . import mpc
+from . import federated
 
-__all__ = ['core', 'mpc']
+__all__ = ['core', 'mpc', 'federated']
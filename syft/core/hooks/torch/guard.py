@@ -23,6 +23,30 @@ class TorchGuard():
         }
         self.map_torch_type = dict(self.map_tensor_type, **self.map_var_type)
 
+        # Storage classes used to rebuild tensors from raw binary buffers
+        self.map_storage_type = {
+            'torch.FloatTensor': torch.FloatStorage,
+            'torch.DoubleTensor': torch.DoubleStorage,
+            'torch.HalfTensor': torch.HalfStorage,
+            'torch.ByteTensor': torch.ByteStorage,
+            'torch.CharTensor': torch.CharStorage,
+            'torch.ShortTensor': torch.ShortStorage,
+            'torch.IntTensor': torch.IntStorage,
+            'torch.LongTensor': torch.LongStorage
+        }
+
+        # numpy dtypes of the tensor types torch.from_numpy can wrap without
+        # copying (torch 0.3.1 does not support int8, so CharTensor is absent)
+        self.map_numpy_type = {
+            'torch.FloatTensor': 'float32',
+            'torch.DoubleTensor': 'float64',
+            'torch.HalfTensor': 'float16',
+            'torch.ByteTensor': 'uint8',
+            'torch.ShortTensor': 'int16',
+            'torch.IntTensor': 'int32',
+            'torch.LongTensor': 'int64'
+        }
+
     def types_guard(self, torch_type_str):
         """types_guard(torch_type_str) -> torch.Tensor or torch.autograd.Variable
 
@@ -69,3 +93,31 @@ class TorchGuard():
                security concern.
         """
         return contents
+
+    def storage_types_guard(self, torch_type_str):
+        """storage_types_guard(torch_type_str) -> torch storage type
+
+        Returns the storage class backing the tensor type named torch_type_str.
+        Like :func:`types_guard`, only whitelisted tensor types are accepted.
+        """
+        try:
+            return self.map_storage_type[torch_type_str]
+        except KeyError:
+            raise TypeError(
+                "Tried to receive a non-Torch object of type {}.".format(
+                    torch_type_str))
+
+    def tensor_buffer_guard(self, buffer, shape, element_size):
+        """tensor_buffer_guard(buffer, shape, element_size) -> buffer
+        Checks that a raw binary buffer holds exactly the number of bytes
+        required by a tensor of the given shape, so that a malformed message
+        cannot make us read past (or silently truncate) the received data.
+        """
+        numel = 1
+        for dim in shape:
+            numel *= dim
+        if memoryview(buffer).nbytes != numel * element_size:
+            raise ValueError(
+                "Tensor buffer of {} bytes does not match shape {}".format(
+                    memoryview(buffer).nbytes, shape))
+        return buffer
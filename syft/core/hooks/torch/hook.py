@@ -1,16 +1,28 @@
 import torch
+import ctypes
+import numpy as np
 import inspect
 import re
 import json
 import types
+import asyncio
 import functools
 import importlib
+import contextlib
+import collections
 from ... import workers
 from ... import utils
 from ..base import BaseHook
 from .guard import TorchGuard
 
 
+# The attributes every object has, which are never overridden
+_object_attrs = frozenset(dir(object))
+
+# The attributes saved by the hook under old_<name>
+_old_attr = re.compile('old*')
+
+
 class TorchHook(BaseHook):
     r""" A Hook which Overrides Methods on PyTorch Variables & Tensors -
     **Currently compatible with PyTorch 0.3.1**
@@ -46,6 +58,19 @@ class TorchHook(BaseHook):
         * **verbose (bool, optional)** whether or not to print operations
           as they occur. (Defalt: True)
 
+        * **deferred (bool, optional)** whether or not to start in deferred
+          mode, where commands on remote pointers are recorded and only sent
+          to their owner when a result is needed or :func:`flush` is called.
+          See :func:`deferred_execution`. (Default: False)
+
+        * **queue_size (int, optional)** if the local worker is created by
+          the hook, the number of queued commands it sends at once. Commands
+          on remote pointers are queued whenever it is set. (Default: 0)
+
+        * **queue_timeout (float, optional)** if the local worker is created
+          by the hook, the time after which queued commands are sent
+          if they weren't sent before.
+
     :Example:
 
     >>> from syft.core.hooks import TorchHook
@@ -63,7 +88,10 @@ class TorchHook(BaseHook):
     [torch.FloatTensor of size 5]
     """
 
-    def __init__(self, local_worker=None, is_client=True, verbose=True, queue_size=0):
+    _overload_tables = None
+
+    def __init__(self, local_worker=None, is_client=True, verbose=True, queue_size=0,
+                 deferred=False, queue_timeout=None):
         super().__init__()
 
         self.local_worker = local_worker
@@ -79,9 +107,11 @@ class TorchHook(BaseHook):
                 if (verbose):
                     print("Torch seems to already have a local_worker object... \
                           using that one instead...")
+                self.local_worker.hook = self
             else:
                 self.local_worker = workers.VirtualWorker(
-                    hook=self, is_client_worker=is_client, queue_size=queue_size)
+                    hook=self, is_client_worker=is_client, queue_size=queue_size,
+                    queue_timeout=queue_timeout)
         else:
             # if the local_worker already exists, then it MUST not know about the hook which is
             # just being created. Thus, we must inform it.
@@ -89,12 +119,6 @@ class TorchHook(BaseHook):
 
         torch.local_worker = self.local_worker
 
-        # this is a list of all module functions in the torch module
-        self.torch_funcs = dir(torch)
-
-        # this is a list of all module functions in torch.nn.functional
-        self.torch_functional_funcs = dir(torch.nn.functional)
-
         # this is the list of torch tensor types that we will override for remote execution
         self.tensor_types = [torch.FloatTensor,
                              torch.DoubleTensor,
@@ -122,16 +146,14 @@ class TorchHook(BaseHook):
                                    'set_precision', 'fixed_prec_trudiv', 'free_precision',
                                    '_execute_fixed_precision_call', '_conversion']
 
-        self.tensorvar_methods = list(
-            set(
-                [method
-                 for tensorvar in self.tensorvar_types
-                 for method in dir(tensorvar)]
-            )
-        )
-
-        # adding fixed precision methods to the list of overriding methods for remote execution
-        self.tensorvar_methods.extend(self.fixed_prec_var_methods)
+        # The lists of the functions and methods which may be overridden are
+        # computed by the first TorchHook, before torch is hooked (hooking
+        # adds the old_<name> and syft attributes), and shared by the others.
+        if TorchHook._overload_tables is None:
+            TorchHook._overload_tables = self._build_overload_tables()
+        (self.torch_funcs,
+         self.torch_functional_funcs,
+         self.tensorvar_methods) = TorchHook._overload_tables
 
         # Methods that caused infinite recursion during testing
         # TODO: May want to handle the ones in "exclude" manually at
@@ -150,13 +172,60 @@ class TorchHook(BaseHook):
 
         self.guard = TorchGuard()
 
+        # Statistics about deserialized tensors: 'tensors' counts the tensors
+        # rebuilt from received data and 'copies' how many of them needed their
+        # data copied (JSON messages always do, binary ones only when the
+        # received buffer cannot be shared, see _build_tensor_from_buffer)
+        self.deser_stats = {'tensors': 0, 'copies': 0}
+
+        # In deferred mode (or when the local worker has a queue_size) the
+        # commands listed below are not sent right away when called on a
+        # remote pointer: they are queued by the local worker with the ids of
+        # their result, and the pointer to the result is created locally.
+        # Queued commands are sent as one composite message when the queue is
+        # full or times out, when a message which can't be queued is sent to
+        # the same worker (e.g. to get a result) or when flush() is called.
+        # The errors of the commands which failed are raised by the latter two.
+        # Only out-of-place commands always returning a new tensor (or
+        # Variable) of the type of self can be queued, as the client has to
+        # guess the type of the result.
+        self.deferred = deferred
+        self.deferrable_commands = set([
+            '__add__', '__radd__', '__sub__', '__rsub__', '__mul__', '__rmul__',
+            '__div__', '__rdiv__', '__truediv__', '__rtruediv__', '__neg__',
+            '__pow__', '__matmul__', 'add', 'sub', 'mul', 'div', 'neg', 'pow',
+            'abs', 'exp', 'log', 'sqrt', 'sigmoid', 'tanh', 'sin', 'cos',
+            'clamp', 'mm', 'matmul', 't', 'transpose', 'view', 'unsqueeze',
+            'squeeze', 'addmm'])
+
         self.set_hooks(verbose)
 
+    def _build_overload_tables(self):
+        """Returns the lists of all module functions in the torch module, of
+        all module functions in torch.nn.functional and of all the methods of
+        the tensor and Variable types (with the fixed precision methods)."""
+        torch_funcs = dir(torch)
+        torch_functional_funcs = dir(torch.nn.functional)
+
+        tensorvar_methods = list(
+            set(
+                [method
+                 for tensorvar in self.tensorvar_types
+                 for method in dir(tensorvar)]
+            )
+        )
+
+        # adding fixed precision methods to the list of overriding methods for remote execution
+        tensorvar_methods.extend(self.fixed_prec_var_methods)
+
+        return torch_funcs, torch_functional_funcs, tensorvar_methods
+
     def set_hooks(self, verbose):
         """Overload functions in torch with our own versions to enable routing"""
         if (not hasattr(torch, 'hooked')):
             if (verbose):
                 print('Hooking into Torch...')
+            self._set_command_table()
             self._hook_torch_module()
             self._hook_torch_functional()
             for t_type in self.tensor_types:
@@ -170,6 +239,18 @@ class TorchHook(BaseHook):
             if (verbose):
                 print("WARNING: Torch seems to be already overloaded... skipping...")
 
+    def _set_command_table(self):
+        """Sets the table of the names of the commands which can be sent to
+        other workers (see :class:`utils.CommandEncoder`): the opcode of a
+        command is its index in this table. It is computed once, right before
+        torch is hooked, so that it is the same on every worker running the
+        same version of torch.
+        """
+        TorchHook.command_names = sorted(set(self.tensorvar_methods) |
+                                         set(self.torch_funcs) |
+                                         set(self.torch_functional_funcs))
+        TorchHook.command_encoder = utils.CommandEncoder(TorchHook.command_names)
+
     def __enter__(self):
         """Allow for using TorchHook as a context manager"""
         if hasattr(torch, 'hooked'):
@@ -185,14 +266,100 @@ class TorchHook(BaseHook):
         if not self.previously_hooked:
             importlib.reload(torch)
 
+    @contextlib.contextmanager
+    def deferred_execution(self):
+        """Context manager enabling the deferred mode: the deferrable
+        commands called on remote pointers are queued by the local worker and
+        sent to their owner in a single message when one of their results is
+        needed, which saves a round trip per command. The queued commands are
+        flushed when leaving the context.
+
+        :Example:
+
+        >>> with hook.deferred_execution():
+        ...     y = x + x2 + x  # nothing is sent yet
+        >>> y.get()  # one message runs both additions, one fetches y
+        """
+        previously_deferred = self.deferred
+        self.deferred = True
+        try:
+            yield self
+        finally:
+            self.deferred = previously_deferred
+            self.flush()
+
+    def flush(self, worker=None):
+        """Sends the commands queued by the local worker (in deferred mode)
+        to their owner, as a single composite message per worker, along with
+        the deletion of the objects no longer pointed to. Raises a
+        RuntimeError listing the errors of the queued commands which failed.
+
+        :Parameters:
+
+        * **worker (**:class:`.workers.BaseWorker` **or id, optional)** if
+          given, only the commands queued for this worker are sent.
+        """
+        self.local_worker.flush_queue(worker)
+
+    def _active_hook(self):
+        """Returns the hook of the local worker, which holds the runtime
+        state (deferred mode, statistics). Torch is only hooked once, so the
+        hooked methods stay bound to the first TorchHook created while this
+        is the most recent one."""
+        return self.local_worker.hook
+
+    def _defer_remote_call(hook_self, _method, command, owner):
+        """Queues a command on a remote pointer instead of sending it and
+        returns the pointer to its future result. The ids of the result are
+        chosen here and sent along with the command, with the expected type
+        of the result (see :func:`BaseWorker.handle_command`).
+        """
+        self = _method.args[0]
+        owner_id = hook_self.local_worker._recipient_id(owner)
+
+        if isinstance(self, torch.autograd.variable.Variable):
+            torch_type = 'torch.autograd.variable.Variable'
+            data_id = hook_self.local_worker.ids.new_id()
+            var_data = dict(registration=dict(id=data_id, owners=[owner_id], is_pointer=True),
+                            torch_type=self.data.type(), var_data=None, var_grad=None)
+            ids = dict(id=hook_self.local_worker.ids.new_id(), data=dict(id=data_id))
+        else:
+            torch_type = self.type()
+            var_data = None
+            ids = dict(id=hook_self.local_worker.ids.new_id())
+
+        registration = dict(id=ids['id'], owners=[owner_id], is_pointer=True)
+        pointer = hook_self._assemble_result_pointer(registration, torch_type, var_data, None)
+
+        command[utils.CMD_IDS] = ids
+        command[utils.CMD_TORCH_TYPE] = torch_type
+        # the pointer holds the future of the command computing its object,
+        # so that the deferred commands form a graph of futures resolved by
+        # the owner in the order they were queued (see _wait_deferred)
+        pointer._deferred_result = hook_self.local_worker.queue_msg(
+            message=command, message_type='torch_cmd', recipient=owner)
+        return pointer
+
+    @staticmethod
+    def _wait_deferred(pointer):
+        """Waits for the deferred command computing the object of pointer, if
+        any: sends the commands queued with it if they weren't sent yet, and
+        raises the error of the command if it failed."""
+        future = getattr(pointer, '_deferred_result', None)
+        if future is not None:
+            future.result()
+            pointer._deferred_result = None
+
     # ######## BEGIN GENERIC method/function hooking logic #########
     def _get_overload_method_in_tensor_or_var(hook_self, method):
-        """Wrapper overloading partialmethod objects of Torch object
-        methods.  Compiles command, checks for Tensors and Variables in
+        """Wrapper overloading a method of a Torch object. Methods called on
+        local objects are executed right away (fast path). Otherwise,
+        compiles command, checks for Tensors and Variables in
         the args/kwargs, determines locations of all Tensors and
         Variables involved in computation, and handles the computation
         accordingly.
         """
+        passer = utils.pass_method_args(method)
 
         @functools.wraps(method)
         def method_router(self, *args, **kwargs):
@@ -201,18 +368,19 @@ class TorchHook(BaseHook):
             the call locally. If self is a remote tensor, it
             executes a call to a remote worker.
             """
+            # is_pointer and fixed_precision default to False on the class
+            # (see _hook_registration_attributes), and local results are only
+            # registered if needed, so local calls cost a single method call.
+            if not (self.is_pointer or self.fixed_precision):
+                return method(self, *args, **kwargs)
 
-            _method = method(self, *args, **kwargs)
+            _method = passer(self, *args, **kwargs)
 
-            if hasattr(self, 'is_pointer') and self.is_pointer:
+            if self.is_pointer:
                 return hook_self._execute_remote_call(_method,
                                                       has_self=True)[0]
-            elif (hasattr(self, 'fixed_precision') and self.fixed_precision):
-
-                return hook_self._execute_fixed_precision_call(self, _method, args, kwargs)
-
             else:
-                return hook_self._execute_local_call(self, _method, args, kwargs)
+                return hook_self._execute_fixed_precision_call(self, _method, args, kwargs)
 
         return method_router
 
@@ -462,16 +630,12 @@ class TorchHook(BaseHook):
     def _execute_local_call(hook_self, self, _method, args, kwargs, function_not_method=False):
         """This executes a method locally"""
 
+        # the result is registered when its id or owners are first needed
+        # (see _hook_registration_attributes)
         if (function_not_method):
-            result = _method.func(*args, **kwargs)
+            return _method.func(*args, **kwargs)
         else:
-            result = _method.func(self, *args, **kwargs)
-
-        # if the result hasn't been registered, register it
-        if (type(result) in hook_self.tensorvar_types and (not hasattr(result, 'owner'))):
-            result = hook_self.local_worker.register_object(result,
-                                                            is_pointer=False)
-        return result
+            return _method.func(self, *args, **kwargs)
 
     def _execute_remote_call(hook_self, _method, has_self=True):
         """This function is responsible for overloading all
@@ -496,38 +660,17 @@ class TorchHook(BaseHook):
         # if the tensor only has one owner (remote)
         if has_remote and not multiple_owners:
 
+            hook = hook_self._active_hook()
+            if ((hook.deferred or hook.local_worker.queue_size) and has_self and
+                    _method.func.__name__ in hook.deferrable_commands):
+                pointer = hook._defer_remote_call(_method, command, owners[0])
+                return pointer, has_remote, multiple_owners
+
             for worker in owners:
                 responses = hook_self.local_worker.send_torch_command(recipient=worker,
                                                                      message=command)
 
-                if not isinstance(responses, list):
-                    responses = [responses]
-
-                pointers = []
-                for response in responses:
-                    # Case 1: numeric response
-                    if isinstance(response, dict) and 'numeric' in response.keys():
-                        var_data = response['numeric']
-                        pointers.append(var_data)
-                        continue
-                    # Case 2: normal response (reg, torch_type, data, grad)
-                    else:
-                        # if the response was send in a dict (vs list)
-                        if isinstance(response, dict):
-                            response = response.values()
-
-                        registration, torch_type, var_data, var_grad = response
-
-                        if registration is None:
-                            pointers.append(var_data)
-                        else:
-                            pointer = hook_self._assemble_result_pointer(registration,
-                                                                         torch_type,
-                                                                         var_data,
-                                                                         var_grad)
-                            pointers.append(pointer)
-
-                pointers = tuple(pointers) if len(pointers) > 1 else pointers[0]
+                pointers = hook_self._assemble_response_pointers(responses)
 
                 return pointers, has_remote, multiple_owners
 
@@ -540,9 +683,64 @@ class TorchHook(BaseHook):
 
         return (None, has_remote, multiple_owners)
 
+    async def _async_execute_remote_call(hook_self, _method, has_self=True):
+        """Coroutine version of :func:`_execute_remote_call` for a method whose
+        self is a pointer. The command is sent with
+        :func:`BaseWorker.async_send_torch_command`, so that commands sent to
+        different workers can be in flight at the same time. Returns the
+        resulting pointer(s).
+        """
+        command, tensorvars = hook_self._compile_command(_method, has_self=has_self)
+
+        owners = list(
+            set([owner for tensorvar in tensorvars for owner in tensorvar.owners]))
+        if len(owners) > 1:
+            raise NotImplementedError("""MPC not yet implemented:
+                Torch objects need to be on the same machine in
+                order to compute with them.""")
+
+        responses = await hook_self.local_worker.async_send_torch_command(recipient=owners[0],
+                                                                          message=command)
+        return hook_self._assemble_response_pointers(responses)
+
+    def _assemble_response_pointers(hook_self, responses):
+        """Turns the processed response(s) of a torch command into the
+        resulting pointer, numeric value or tuple of those."""
+
+        if not isinstance(responses, list):
+            responses = [responses]
+
+        pointers = []
+        for response in responses:
+            # Case 1: numeric response
+            if isinstance(response, dict) and 'numeric' in response.keys():
+                var_data = response['numeric']
+                pointers.append(var_data)
+                continue
+            # Case 2: normal response (reg, torch_type, data, grad)
+            else:
+                # if the response was send in a dict (vs list)
+                if isinstance(response, dict):
+                    response = response.values()
+
+                registration, torch_type, var_data, var_grad = response
+
+                if registration is None:
+                    pointers.append(var_data)
+                else:
+                    pointer = hook_self._assemble_result_pointer(registration,
+                                                                 torch_type,
+                                                                 var_data,
+                                                                 var_grad)
+                    pointers.append(pointer)
+
+        return tuple(pointers) if len(pointers) > 1 else pointers[0]
+
     @classmethod
     def _compile_command(cls, partial_func, has_self):
-        """Assembles a JSON-serializable message from a partial function.
+        """Assembles a JSON-serializable message from a partial function,
+        using the compact command encoding (see :class:`utils.CommandEncoder`).
+        Returns the message and the Tensors and Variables found in it.
 
         Args:
         partial_func: a functools.partial or functools.partialmethod
@@ -550,21 +748,13 @@ class TorchHook(BaseHook):
             kwargs.
         has_self: a flag for whether or not the function is a method.
         """
-        func = partial_func.func
         args = partial_func.args
-        kwargs = partial_func.keywords
-        command = {}
-        command['has_self'] = has_self
         if has_self:
-            command['self'] = args[0]
-            args = args[1:]
-        command['command'] = func.__name__
-        command['args'] = args
-        command['kwargs'] = kwargs
-
-        encoder = utils.PythonEncoder()
-        command, tensorvars = encoder.encode(command, retrieve_tensorvar=True)
-        return command, tensorvars
+            self_obj, args = args[0], args[1:]
+        else:
+            self_obj = None
+        return cls.command_encoder.encode(partial_func.func.__name__, has_self,
+                                          self_obj, args, partial_func.keywords)
 
     def _assemble_result_pointer(self, registration, torch_type, var_data, var_grad):
         """Assembles a pointer to a remote Torch object. Pointers feel like
@@ -620,7 +810,7 @@ class TorchHook(BaseHook):
                 continue
 
             # if we haven't already overloaded this function
-            if 'old_{}'.format(attr) in dir(torch):
+            if hasattr(torch, 'old_' + attr):
                 continue
 
             # if we haven't already overloaded this function (redundancy allowed)
@@ -656,7 +846,7 @@ class TorchHook(BaseHook):
                 continue
 
             # if we haven't already overloaded this function
-            if 'old_{}'.format(attr) in dir(torch.nn.functional):
+            if hasattr(torch.nn.functional, 'old_' + attr):
                 continue
 
             # if we haven't already overloaded this function (redundancy allowed)
@@ -679,36 +869,36 @@ class TorchHook(BaseHook):
     def _hook_tensor(self, tensor_type):
         """Overloading a given tensor_type"""
         # Overload 'special' methods here
-        self._hook___new__(tensor_type)
+        self._hook_registration_attributes(tensor_type)
         self._hook_tensor___repr__(tensor_type)
         self._hook_fixed_precision_methods(tensor_type)
 
         for attr in dir(tensor_type):
             # if we haven't already overloaded this function
-            if 'old_{}'.format(attr) not in dir(tensor_type):
+            if not hasattr(tensor_type, 'old_' + attr):
                 # Conditions for inclusion/exclusion
                 if attr in self.exclude:
                     continue
                 lit = getattr(tensor_type, attr)
-                is_base = attr in dir(object)
+                is_base = attr in _object_attrs
                 is_desc = inspect.ismethoddescriptor(lit)
                 is_func = isinstance(lit, types.FunctionType)
                 try:
                     is_service_func = 'HookService' in lit.__qualname__
                 except:
                     is_service_func = False
-                is_old = re.match('old*', attr) is not None
+                is_old = _old_attr.match(attr) is not None
 
                 # Where the overloading happens
                 if ((is_desc or (is_func and not is_service_func)) and not is_base and not is_old):
-                    passer = utils.pass_method_args(lit)
-                    new_attr = self._get_overload_method_in_tensor_or_var(passer)
+                    new_attr = self._get_overload_method_in_tensor_or_var(lit)
                     setattr(tensor_type, 'old_{}'.format(attr), lit)
                     setattr(tensor_type, attr, new_attr)
 
         # Add in our own Grid-specific methods
         self._hook_send_(tensor_type)
         self._hook_get_(tensor_type)
+        self._hook_async_call(tensor_type)
         self._hook_tensor__serde(tensor_type)
 
     def _hook_tensor___del__(hook_self, tensor_type):
@@ -718,28 +908,14 @@ class TorchHook(BaseHook):
 
         tensor_type.__del__ = new____del__
 
-    def _hook___new__(hook_self, tensorvar_type):
-        """Overloads tensor_type.__new__ or Variale.__new__"""
-
-        if ('old___new__' not in dir(tensorvar_type)):
-            tensorvar_type.old___new__ = tensorvar_type.__new__
-
-            def new___new__(cls, *args, **kwargs):
-                result = cls.old___new__(cls, *args, **kwargs)
-                result = hook_self.local_worker.register_object(
-                    result, is_pointer=False)
-                cls.fixed_precision = False
-                return result
-
-            tensorvar_type.__new__ = new___new__
-
     def _hook_tensor___repr__(hook_self, tensor_type):
         """Overload tensor_type.__repr__"""
         if ('old__repr__' not in dir(tensor_type)):
             tensor_type.old__repr__ = tensor_type.__repr__
 
             def new___repr__(self):
-                if (not hasattr(self, 'owners')):
+                # don't register the tensor just to print it
+                if (not hasattr(self, '_owners')):
                     return self.old__repr__()
                 _id_in_owners = hook_self.local_worker.id in self.owners
                 if (hook_self.local_worker in self.owners or _id_in_owners):
@@ -790,74 +966,174 @@ class TorchHook(BaseHook):
         setattr(tensorvar_type, 'send_', send_)
         setattr(tensorvar_type, 'send', send_)
 
-    def _hook_get_(hook_self, torch_type):
-        """Overloads the get methods"""
-        def get_(self, reduce=lambda x: x[0]):
-            """Gets a Torch object from its current owners.
+        def move_(self, worker):
+            """Moves the object pointed to by self from its owner to worker
+            directly, without it going through the local worker (see
+            BaseWorker.forward_obj). The owner must know worker.
 
             Args:
-            reduce: (EXPERIMENTAL) How to reduce tensors that come from
-                multiple workers
+            worker: the worker (or id) the object is moved to
             """
-            # TODO: fully generalize this to multiple workers; consider
-            #       adding arguments for other tensor ids, e.g. mapping workers
-            #       to tensors, and a reduce function (for example, would allow
-            #       for built-in gradient averaging when Variable.get is done)
-            #       (low priority)
-            try:
-                assert len(self.owners) == 1
-            except AssertionError:
-                raise NotImplementedError('Only able to get_ tensors belonging \
+            if len(self.owners) != 1:
+                raise NotImplementedError('Only able to move_ tensors belonging \
                                             to a single worker right now.')
-            if hook_self.local_worker.id in self.owners:
+            worker = hook_self.local_worker.get_worker(worker)
+            hook_self.local_worker.forward_obj(self.id, self.owners[0], worker)
+
+            # as in send_, registering a Variable re-registers its data and
+            # grad (and the data of its grad) with the new owner too
+            self = hook_self.local_worker.register_object(obj=self,
+                                                          id=self.id,
+                                                          owners=[worker],
+                                                          is_pointer=True)
+            if tensorvar_type == torch.autograd.variable.Variable:
+                return hook_self._var_to_pointer(self)
+            return self
+
+        setattr(tensorvar_type, 'move_', move_)
+        setattr(tensorvar_type, 'move', move_)
+
+        def all_reduce_(self, reduce='sum', algorithm='ring'):
+            """Reduces the copies of the object pointed to by self held by
+            its owners (e.g. after sending it to several workers), so that
+            every owner holds the reduction, without the copies going
+            through the local worker (see BaseWorker.all_reduce).
+
+            Args:
+            reduce: 'sum' or 'mean'
+            algorithm: 'ring' or 'tree'
+            """
+            hook_self.local_worker.all_reduce(self.id, self.owners, reduce, algorithm)
+            return self
+
+        setattr(tensorvar_type, 'all_reduce_', all_reduce_)
+        setattr(tensorvar_type, 'all_reduce', all_reduce_)
+
+    def _fetched(hook_self, self, x):
+        """Turns the pointer self into the local copy x of the object it
+        points to"""
+        hook_self.local_worker.register_object(x, id=x.id)
+
+        _id = hook_self.local_worker.id  # for brevity
+        if (type(self) != torch.autograd.variable.Variable and
+                type(self) != torch.nn.parameter.Parameter):
+            _os = self.old_set_(x.type(self.type()))
+        else:
+            _os = self.old_set_(x.type(self.data.type()))  # for brevity
+            self.data = x.data
+            if (x.grad is not None):
+                self.grad = x.grad
+
+        self = hook_self.local_worker.register_object(_os,
+                                                      id=self.id,
+                                                      owners=[_id])
+        return self
+
+    def _hook_get_(hook_self, torch_type):
+        """Overloads the get methods"""
+        fetched = hook_self._fetched
 
+        def get_(self, reduce='mean', max_in_flight=4):
+            """Gets a Torch object from its current owners. The copies held
+            by several owners (e.g. a model sent to all of them) are fetched
+            concurrently and reduced into one as they arrive (see
+            BaseWorker.request_obj_reduced).
 
+            Args:
+            reduce: How to reduce tensors that come from multiple workers:
+                'sum', 'mean' or a function reduce(result, tensor) returning
+                the partial result with tensor folded in
+            max_in_flight: The most copies fetched at the same time
+            """
+            if hook_self.local_worker.id in self.owners:
                 return self
+            hook_self._wait_deferred(self)
+
+            if len(self.owners) > 1:
+                x = hook_self.local_worker.request_obj_reduced(self.id, self.owners, reduce,
+                                                               max_in_flight)
+                return fetched(self, x)
 
             _out = hook_self.local_worker.request_obj(obj_id=self.id,
                                                       recipient=self.owners[0])
             x, request_obj_cleanup_method = _out
 
-            hook_self.local_worker.register_object(x, id=x.id)
+            return fetched(self, x)
 
-            _id = hook_self.local_worker.id  # for brevity
-            if (type(self) != torch.autograd.variable.Variable and
-                    type(self) != torch.nn.parameter.Parameter):
-                _os = self.old_set_(x.type(self.type()))
-            else:
-                _os = self.old_set_(x.type(self.data.type()))  # for brevity
-                self.data = x.data
-                if (x.grad is not None):
-                    self.grad = x.grad
+        async def async_get_(self, reduce='mean', max_in_flight=4):
+            """Coroutine version of get_: awaiting it fetches the Torch object
+            from its owner, so that objects held by different workers can be
+            fetched concurrently (e.g. with asyncio.gather). The copies held by
+            several owners are fetched and reduced as by get_, on a thread of
+            the event loop's executor.
 
-            self = hook_self.local_worker.register_object(_os,
-                                                          id=self.id,
-                                                          owners=[_id])
+            Args:
+            reduce: How to reduce tensors that come from multiple workers
+                (see get_)
+            max_in_flight: The most copies fetched at the same time
+            """
+            if hook_self.local_worker.id in self.owners:
+                return self
+            hook_self._wait_deferred(self)
 
+            if len(self.owners) > 1:
+                x = await asyncio.get_event_loop().run_in_executor(None, functools.partial(
+                    hook_self.local_worker.request_obj_reduced, self.id, self.owners, reduce,
+                    max_in_flight))
+                return fetched(self, x)
 
-            return self
+            _out = await hook_self.local_worker.async_request_obj(obj_id=self.id,
+                                                                  recipient=self.owners[0])
+            x, request_obj_cleanup_method = _out
+
+            return fetched(self, x)
 
         setattr(torch_type, 'get_', get_)
 
         # TODO: make this a non-inline version
         setattr(torch_type, 'get', get_)
 
+        setattr(torch_type, 'async_get_', async_get_)
+        setattr(torch_type, 'async_get', async_get_)
+
+    def _hook_async_call(hook_self, tensorvar_type):
+        """Adds async_call, the awaitable version of calling a method"""
+        def async_call(self, command, *args, **kwargs):
+            """Returns an awaitable executing self.<command>(*args, **kwargs).
+            If self is a pointer, the command is sent to its owner without
+            blocking, so that commands to different workers overlap. Awaiting
+            it gives the resulting pointer (or local result).
+
+            Example: y, z = await asyncio.gather(x.async_call('add', x),
+                                                 w.async_call('mm', w))
+            """
+            if not self.is_pointer:
+                async def local_call():
+                    return getattr(self, command)(*args, **kwargs)
+                return local_call()
+
+            lit = getattr(type(self), 'old_{}'.format(command))
+            _method = utils.pass_method_args(lit)(self, *args, **kwargs)
+            return hook_self._async_execute_remote_call(_method, has_self=True)
+
+        setattr(tensorvar_type, 'async_call', async_call)
+
     # ######## BEGIN torch VARIABLE hooking #########
 
     def _hook_variable(self):
         """Responsible for hooking Variable methods"""
         # Overload 'special' methods here
-        self._hook___new__(torch.autograd.variable.Variable)
         self._hook_var_contents()
-        self._hook_var_owners()
+        self._hook_registration_attributes(torch.autograd.variable.Variable)
 
+        exclude = set(self.exclude + self.var_exclude)
         for attr in dir(torch.autograd.variable.Variable):
 
             # Conditions for inclusion/exclusion
-            if attr in self.exclude + self.var_exclude:
+            if attr in exclude:
                 continue
             lit = getattr(torch.autograd.variable.Variable, attr)
-            is_base = attr in dir(object)
+            is_base = attr in _object_attrs
             is_desc = inspect.ismethoddescriptor(lit)
             # is_func = isinstance(type(lit), types.FunctionType)
             is_func = isinstance(lit, types.FunctionType)
@@ -865,27 +1141,46 @@ class TorchHook(BaseHook):
                 is_service_func = 'HookService' in lit.__qualname__
             except:
                 is_service_func = False
-            is_old = re.match('old*', attr) is not None
+            is_old = _old_attr.match(attr) is not None
 
             # Where the overloading happens
             if ((is_desc or (is_func and not is_service_func)) and not is_base and not is_old):
-                passer = utils.pass_method_args(lit)
-                new_attr = self._get_overload_method_in_tensor_or_var(passer)
+                new_attr = self._get_overload_method_in_tensor_or_var(lit)
                 setattr(torch.autograd.variable.Variable,
                         'old_{}'.format(attr), lit)
                 setattr(torch.autograd.variable.Variable, attr, new_attr)
 
         self._hook_send_(torch.autograd.variable.Variable)
         self._hook_get_(torch.autograd.variable.Variable)
+        self._hook_async_call(torch.autograd.variable.Variable)
         self._hook_var_serde()
 
-    def _hook_var_owners(hook_self):
-        """Responsible for managing the 'owners' attribute"""
+    def _hook_registration_attributes(hook_self, tensorvar_type):
+        """Adds the registration attributes of tensorvar_type objects. Objects
+        created locally are only registered with the local worker when their
+        id or owners are first read (e.g. when they are sent or used in a
+        remote command), until then is_pointer and fixed_precision take the
+        default value set on the class."""
+        tensorvar_type.is_pointer = False
+        tensorvar_type.fixed_precision = False
+
+        @property
+        def id(self):
+            try:
+                return self._id
+            except AttributeError:
+                hook_self.local_worker.register_object(obj=self)
+                return self._id
+
+        @id.setter
+        def id(self, value):
+            self._id = value
+
         @property
         def owners(self):
-            if (hasattr(self, '_owners')):
+            try:
                 return self._owners
-            else:
+            except AttributeError:
                 hook_self.local_worker.register_object(obj=self)
                 return self._owners
 
@@ -893,7 +1188,8 @@ class TorchHook(BaseHook):
         def owners(self, value):
             self._owners = value
 
-        torch.autograd.variable.Variable.owners = owners
+        tensorvar_type.id = id
+        tensorvar_type.owners = owners
 
     def _hook_var_contents(hook_self):
         """Overload Variable.data and Variable.grad properties."""
@@ -909,12 +1205,10 @@ class TorchHook(BaseHook):
         def new_data(self):
             if not hasattr(self, 'data_registered'):
 
-                if (hasattr(self.old_data, 'id')):
-                    obj_id = self.old_data.id
-                else:
-                    obj_id = None
+                # (reading id or owners would register the objects)
+                obj_id = getattr(self.old_data, '_id', None)
 
-                if (not hasattr(self, 'owners')):
+                if (not hasattr(self, '_owners')):
                     self.owners = [hook_self.local_worker.id]
 
                 self.old_data = hook_self.local_worker.register_object(obj=self.old_data,
@@ -971,11 +1265,12 @@ class TorchHook(BaseHook):
     def _hook_tensor__serde(hook_self, tensor_type):
         """Hooks object/json serialization and deserialization for tensor_type objects"""
 
-        def ser(self, include_data=True):
-            """Serializes a {} object to JSON.""".format(tensor_type)
+        def ser(self, include_data=True, as_json=False):
+            """Serializes a {} object to the binary wire format, or to JSON
+            if as_json is set (slow, intended for debugging).""".format(tensor_type)
             tensor_msg = {}
             tensor_msg['torch_type'] = self.type()
-            if include_data:
+            if include_data and as_json:
                 tensor_msg['data'] = self.tolist()
             tensor_msg['id'] = self.id
             if (type(self.owners[0]) is int):
@@ -984,15 +1279,34 @@ class TorchHook(BaseHook):
                 tensor_msg['owners'] = list(map(lambda x: x.id, self.owners))
             tensor_msg['is_pointer'] = not include_data
 
-            return json.dumps(tensor_msg) + "\n"
+            if as_json:
+                return json.dumps(tensor_msg) + "\n"
 
-        def deser(self, obj_msg):
-            """Deserializes a {} object from JSON.""".format(tensor_type)
+            segments = []
+            if include_data:
+                # keep a reference to the contiguous tensor until it is packed
+                contiguous = self.old_contiguous()
+                tensor_msg['shape'] = list(contiguous.size())
+                tensor_msg['data'] = len(segments)
+                segments.append(hook_self._tensor_buffer(contiguous))
+            return utils.pack_blob(tensor_msg, segments)
+
+        def deser(self, obj_msg, segments=None, register=True):
+            """Deserializes a {} object from JSON or from the binary
+            wire format. Tensors are registered by the caller, whatever
+            register is.""".format(tensor_type)
+
+            if(segments is not None and 'data' in obj_msg):
+                return hook_self._build_tensor_from_buffer(self, obj_msg,
+                                                           segments[obj_msg['data']])
 
             # this could be a significant failure point, security-wise
             if('data' in obj_msg):
                 data = hook_self.guard.tensor_contents_guard(obj_msg['data'])
                 v = self(data)
+                deser_stats = hook_self._active_hook().deser_stats
+                deser_stats['tensors'] += 1
+                deser_stats['copies'] += 1
             else:
                 v = self([])
             return v
@@ -1000,20 +1314,75 @@ class TorchHook(BaseHook):
         tensor_type.ser = ser
         tensor_type.deser = deser
 
+    @staticmethod
+    def _tensor_buffer(tensor):
+        """Returns a bytes-like object exposing the storage of a contiguous
+        tensor without copying it. The caller must keep the tensor alive
+        for as long as the buffer is used.
+        """
+        nbytes = tensor.numel() * tensor.element_size()
+        if nbytes == 0:
+            return b''
+        return (ctypes.c_char * nbytes).from_address(tensor.data_ptr())
+
+    def _build_tensor_from_buffer(hook_self, tensor_type, obj_msg, buffer):
+        """Rebuilds a tensor of type tensor_type from the raw storage bytes
+        of a binary message.
+
+        Whenever possible the tensor's storage IS the received buffer (wrapped
+        with numpy.frombuffer and torch.from_numpy), so no data is copied and
+        the received message stays alive for as long as the tensor does. The
+        data is only copied if the buffer is read-only or misaligned, or if
+        torch.from_numpy can't handle the tensor type. Copies are counted in
+        hook.deser_stats.
+        """
+        shape = obj_msg['shape']
+        torch_type = obj_msg['torch_type']
+        storage_type = hook_self.guard.storage_types_guard(torch_type)
+        buffer = hook_self.guard.tensor_buffer_guard(buffer, shape,
+                                                     storage_type().element_size())
+        deser_stats = hook_self._active_hook().deser_stats
+        deser_stats['tensors'] += 1
+
+        view = memoryview(buffer)
+        if view.nbytes == 0:
+            return tensor_type([])
+
+        numpy_type = hook_self.guard.map_numpy_type.get(torch_type)
+        if numpy_type is not None and not view.readonly:
+            array = np.frombuffer(view, dtype=numpy_type).reshape(shape)
+            if array.flags.aligned:
+                return torch.old_from_numpy(array)
+
+        deser_stats['copies'] += 1
+        storage = storage_type.from_buffer(view, 'native')
+        return tensor_type(storage).old_view(*shape)
+
     def _hook_var_serde(hook_self):
         """Hooks object/json serialization and deserialization for Variable objects"""
 
-        def ser(self, include_data=True):
-            """Serializes a variable into a JSON object"""
+        def ser(self, include_data=True, as_json=False):
+            """Serializes a variable into the binary wire format, or into
+            a JSON object if as_json is set"""
+
+            segments = []
+
+            def ser_child(child):
+                # JSON nests the child message as a string, the binary
+                # format stores it as a segment and keeps its index
+                if as_json:
+                    return child.ser(include_data, as_json=True)
+                segments.append(child.ser(include_data))
+                return len(segments) - 1
 
             var_msg = {}
             var_msg['torch_type'] = re.search(
                 "<class '(.*)'>", str(self.__class__)).group(1)
             var_msg['requires_grad'] = self.requires_grad
             var_msg['volatile'] = self.volatile
-            var_msg['data'] = self.data.ser(include_data)
+            var_msg['data'] = ser_child(self.data)
             if self.grad is not None:
-                var_msg['grad'] = self.grad.ser(include_data)
+                var_msg['grad'] = ser_child(self.grad)
             else:
                 var_msg['grad'] = None
             var_msg['id'] = self.id
@@ -1022,30 +1391,41 @@ class TorchHook(BaseHook):
             else:
                 var_msg['owners'] = list(map(lambda x: x.id, self.owners))
             var_msg['is_pointer'] = not include_data
-            return json.dumps(var_msg)
+            if as_json:
+                return json.dumps(var_msg)
+            return utils.pack_blob(var_msg, segments)
 
-        def deser(self, obj_msg):
-            """Deserializes a JSON object into a variable"""
+        def deser(self, obj_msg, segments=None, register=True):
+            """Deserializes a JSON object or a binary message into a variable.
+            Unless register is False, its data and grad are registered with
+            the local worker."""
 
             if 'data' in obj_msg.keys():
-                data_msg = json.loads(obj_msg['data'])
+                data_msg, data_segments = hook_self._load_child_msg(obj_msg['data'], segments)
                 tensor_type = hook_self.guard.types_guard(data_msg['torch_type'])
-                data_obj = tensor_type.deser(tensor_type, data_msg)
+                data_obj = tensor_type.deser(tensor_type, data_msg, data_segments)
                 # data_obj = hook_self.build_tensor(data_msg, tensor_type)
-                data = hook_self.local_worker.handle_register(
-                    data_obj, data_msg)
+                if register:
+                    data = hook_self.local_worker.handle_register(
+                        data_obj, data_msg)
+                else:
+                    data = data_obj
 
             if 'grad' in obj_msg.keys():
                 if obj_msg['grad'] is not None:
 
-                    grad_msg = json.loads(obj_msg['grad'])
+                    grad_msg, grad_segments = hook_self._load_child_msg(obj_msg['grad'],
+                                                                        segments)
 
                     var_type = hook_self.guard.types_guard(grad_msg['torch_type'])
-                    grad_obj = hook_self._build_var(grad_msg, var_type)
+                    grad_obj = hook_self._build_var(grad_msg, var_type, grad_segments,
+                                                    register)
 
-                    grad = hook_self.local_worker.handle_register(grad_obj, grad_msg,
-                                                                  force_attach_to_worker=False,
-                                                                  temporary=True)
+                    if register:
+                        grad = hook_self.local_worker.handle_register(
+                            grad_obj, grad_msg, force_attach_to_worker=False, temporary=True)
+                    else:
+                        grad = grad_obj
                 else:
                     grad = None
 
@@ -1088,23 +1468,36 @@ class TorchHook(BaseHook):
 
         return var
 
-    def _build_var(self, obj_msg, torch_type):
+    def _load_child_msg(self, child, segments):
+        """Loads the message of a Variable's data or grad. In JSON messages it
+        is a nested JSON string, in binary messages the index of the segment
+        holding its blob. Returns the message and its segments (None for JSON).
+        """
+        if segments is None:
+            return json.loads(child), None
+        return utils.unpack_blob(segments[child])
+
+    def _build_var(self, obj_msg, torch_type, segments=None, register=True):
         """Overloads variable building function"""
         if 'data' in obj_msg.keys():
-            data_msg = json.loads(obj_msg['data'])
+            data_msg, data_segments = self._load_child_msg(obj_msg['data'], segments)
             tensor_type = self.guard.types_guard(data_msg['torch_type'])
-            data_obj = tensor_type.deser(tensor_type, data_msg)
+            data_obj = tensor_type.deser(tensor_type, data_msg, data_segments)
             # data_obj = self.build_tensor(data_msg, tensor_type)
-            data = self.local_worker.handle_register(
-                data_obj, data_msg, temporary=True)
+            data = data_obj
+            if register:
+                data = self.local_worker.handle_register(
+                    data_obj, data_msg, temporary=True)
 
         if 'grad' in obj_msg.keys():
             if obj_msg['grad'] is not None:
-                grad_msg = json.loads(obj_msg['grad'])
+                grad_msg, grad_segments = self._load_child_msg(obj_msg['grad'], segments)
                 var_type = self.guard.types_guard(grad_msg['torch_type'])
-                grad_obj = self._build_var(grad_msg, var_type)
-                grad = self.local_worker.handle_register(
-                    grad_obj, grad_msg, temporary=True)
+                grad_obj = self._build_var(grad_msg, var_type, grad_segments, register)
+                grad = grad_obj
+                if register:
+                    grad = self.local_worker.handle_register(
+                        grad_obj, grad_msg, temporary=True)
             else:
                 grad = None
         var = torch_type(data, volatile=obj_msg['volatile'],
@@ -1126,27 +1519,93 @@ class TorchHook(BaseHook):
             return missing_grad
 
         def create_grad_objects(model):
-            """Overloads create grad parameter for model"""
+            """Allocates the missing grads of the parameters of model (as
+            zeros), so that pointers to them are sent along"""
             for p in model.parameters():
-                o = p.sum()
-                o.backward()
-                p.grad -= p.grad
+                if p.grad is None:
+                    p.grad = torch.autograd.Variable(p.data.new(p.data.size()).zero_())
+
+        def module_send_(self, dest, delta=False):
+            """Overloads send to remote for torch.nn.Module. All the
+            parameters (and their grads) are sent in a single message.
 
-        def module_send_(self, dest):
-            """Overloads send to remote for torch.nn.Module"""
+            If delta is set, the parameters are kept locally and by dest,
+            so that get(delta=True) only fetches their change. The bytes
+            sent are recorded in self.wire_stats."""
             if (module_is_missing_grad(self)):
                 create_grad_objects(self)
 
-            for p in self.parameters():
-                p.send_(dest)
+            dest = hook_self.local_worker.get_worker(dest)
+            params = list(self.parameters())
+            if delta:
+                self._update_bases = {p.id: p.data.clone() for p in params}
+            message = hook_self.local_worker.prepare_send_objects(params, keep_base=delta)
+            hook_self.local_worker.send_msg(message=message,
+                                            message_type='objs',
+                                            recipient=dest)
+            self.wire_stats = {'sent': len(message)}
+
+            for p in params:
+                p = hook_self.local_worker.register_object(obj=p,
+                                                           id=p.id,
+                                                           owners=[dest],
+                                                           is_pointer=True)
+                hook_self._var_to_pointer(p)
 
         torch.nn.Module.send_ = module_send_
         torch.nn.Module.send = module_send_
 
-        def module_get_(self):
-            """Overload get from remote for torch.nn.Module"""
+        def module_get_(self, delta=False, compression=None, error_feedback=True, **options):
+            """Overload get from remote for torch.nn.Module. The parameters
+            held by each worker are fetched in a single message.
+
+            If delta is set, only the change of the parameters since they
+            were sent with send(delta=True) is fetched (without their grads),
+            compressed as set by compression (see
+            :func:`BaseWorker.prepare_send_deltas`). The grads are not fetched
+            along: the parameters come back with zero grads, as after
+            zero_grad(), and the remote copies (grads included) are deleted.
+            The bytes received are recorded in self.wire_stats."""
+            local_id = hook_self.local_worker.id
+            params_by_owner = collections.OrderedDict()
             for p in self.parameters():
-                p.get_()
+                if len(p.owners) != 1:
+                    raise NotImplementedError('Only able to get_ tensors belonging \
+                                                to a single worker right now.')
+                owner_id = hook_self.local_worker._recipient_id(p.owners[0])
+                if owner_id != local_id:
+                    params_by_owner.setdefault(owner_id, (p.owners[0], []))[1].append(p)
+
+            if delta and params_by_owner and getattr(self, '_update_bases', None) is None:
+                raise RuntimeError('The module was not sent with send(delta=True)')
+
+            received = 0
+            for owner, params in params_by_owner.values():
+                ids = [p.id for p in params]
+                if delta:
+                    message = {'ids': ids, 'compression': compression,
+                               'error_feedback': error_feedback, 'options': options}
+                    response = hook_self.local_worker.send_msg(message=message,
+                                                               message_type='req_deltas',
+                                                               recipient=owner)
+                    deltas = hook_self.local_worker.receive_deltas(response)
+                    xs = []
+                    for p, d in zip(params, deltas):
+                        data = self._update_bases.pop(p.id)
+                        x = torch.autograd.Variable(data.add_(d.type(data.type())))
+                        x.grad = torch.autograd.Variable(data.new(data.size()).zero_())
+                        xs.append(x)
+                else:
+                    response = hook_self.local_worker.send_msg(message=ids,
+                                                               message_type='req_objs',
+                                                               recipient=owner)
+                    xs = hook_self.local_worker.receive_objs(response)
+                received += len(response)
+                for p, x in zip(params, xs):
+                    hook_self._fetched(p, x)
+
+            self._update_bases = None
+            self.wire_stats = dict(getattr(self, 'wire_stats', {}), received=received)
 
         torch.nn.Module.get_ = module_get_
         torch.nn.Module.get = module_get_
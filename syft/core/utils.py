@@ -1,9 +1,12 @@
 """Framework agnostic static utility functions."""
 import json
-import re
+import struct
+import hashlib
 import types
 import functools
 import logging
+import random
+import threading
 
 import torch
 
@@ -79,50 +82,446 @@ class PythonJSONDecoder(json.JSONDecoder):
         Decode JSON and reinsert python types when needed
         Retrieve Torch objects replaced by their id
     """
+    tensorvar_types = tuple([torch.autograd.Variable,
+                             torch.nn.Parameter,
+                             torch.FloatTensor,
+                             torch.DoubleTensor,
+                             torch.HalfTensor,
+                             torch.ByteTensor,
+                             torch.CharTensor,
+                             torch.ShortTensor,
+                             torch.IntTensor,
+                             torch.LongTensor])
+
+    # Tensors and Variables are encoded as '_fl.<id>'
+    tensorvar_id_offset = len('_fl.')
+
     def __init__(self, worker, *args, **kwargs):
         super(PythonJSONDecoder, self).__init__(*args,
             object_hook=self.custom_obj_hook, **kwargs)
         self.worker = worker
-        self.tensorvar_types = tuple([torch.autograd.Variable,
-                                     torch.nn.Parameter,
-                                     torch.FloatTensor,
-                                     torch.DoubleTensor,
-                                     torch.HalfTensor,
-                                     torch.ByteTensor,
-                                     torch.CharTensor,
-                                     torch.ShortTensor,
-                                     torch.IntTensor,
-                                     torch.LongTensor])
 
     def custom_obj_hook(self, dct):
         """
-            Is called on every dict found. We check if some keys correspond
-            to special keywords referring to a type we need to re-cast
-            (e.g. tuple, or torch Variable).
-            Note that in the case we have such a keyword, we will have created
-            at encoding a dict with a single key value pair, so the return if
-            the for loop is valid.
+            Is called on every dict found. We check if its key is one of the
+            special keywords referring to a type we need to re-cast
+            (e.g. tuple, or torch Variable), in which case the dict was
+            created at encoding with a single key value pair, and decode it
+            with the function registered for this keyword in tag_decoders.
         """
-        pat = re.compile('__(.+)__')
-        for key, obj in dct.items():
+        if len(dct) != 1:
+            return dct
+        for key in dct:
+            decode = self.tag_decoders.get(key)
+            if decode is None:
+                return dct
+            return decode(self, dct[key])
+
+    def decode_tensorvar(self, obj):
+        return self.worker.get_obj(int(obj[self.tensorvar_id_offset:]))
+
+    def decode_range(self, obj):
+        if not obj:
+            return range(0)
+        step = obj[1] - obj[0] if len(obj) > 1 else 1
+        return range(obj[0], obj[-1] + step, step)
+
+    def decode_slice(self, obj):
+        return slice(*obj['args'])
+
+
+# Maps the keyword of each special dict created by PythonEncoder, e.g.
+# '__tuple__', to the function decoding its value
+PythonJSONDecoder.tag_decoders = {
+    '__tuple__': lambda decoder, obj: tuple(obj),
+    '__set__': lambda decoder, obj: set(obj),
+    '__bytearray__': lambda decoder, obj: bytearray(obj),
+    '__range__': PythonJSONDecoder.decode_range,
+    '__slice__': PythonJSONDecoder.decode_slice,
+}
+PythonJSONDecoder.tag_decoders.update({
+    '__{}__'.format(tensorvar_type.__name__): PythonJSONDecoder.decode_tensorvar
+    for tensorvar_type in PythonJSONDecoder.tensorvar_types})
+
+# Compact torch command encoding. A command is sent as the JSON array
+#   [command, has_self, self, args, kwargs, ids, torch_type]
+# where command is the opcode of the command's name, i.e. its index in the
+# table of command names shared by all workers (see TorchHook.command_names),
+# or the name itself when it isn't in the table. self, args and kwargs are
+# encoded by CommandEncoder: JSON scalars are kept as they are while tensors,
+# Variables and containers become arrays starting with a tag, e.g. a
+# LongTensor is [CMD_TAG_TENSORVAR, 9, <id>] (9 being the index of LongTensor
+# in COMMAND_TENSORVAR_TYPES). ids and torch_type are only set for commands
+# queued by a client (see BaseWorker.handle_command).
+CMD_NAME, CMD_HAS_SELF, CMD_SELF, CMD_ARGS, CMD_KWARGS, CMD_IDS, CMD_TORCH_TYPE = range(7)
+
+(CMD_TAG_TENSORVAR, CMD_TAG_LIST, CMD_TAG_TUPLE, CMD_TAG_SET,
+ CMD_TAG_BYTEARRAY, CMD_TAG_RANGE, CMD_TAG_SLICE, CMD_TAG_DICT) = range(8)
+
+COMMAND_TENSORVAR_TYPES = [torch.autograd.Variable,
+                           torch.nn.Parameter,
+                           torch.FloatTensor,
+                           torch.DoubleTensor,
+                           torch.HalfTensor,
+                           torch.ByteTensor,
+                           torch.CharTensor,
+                           torch.ShortTensor,
+                           torch.IntTensor,
+                           torch.LongTensor]
+
+_COMMAND_SCALAR_TYPES = frozenset([int, float, str, bool, type(None)])
+
+
+class CommandEncoder():
+    """
+        Encodes torch commands to the compact layout described above.
+        The opcodes are computed once from the table of command names.
+    """
+    def __init__(self, command_names):
+        self.opcodes = {name: opcode for opcode, name in enumerate(command_names)}
+        self.tensorvar_codes = {tensorvar_type: code for code, tensorvar_type
+                                in enumerate(COMMAND_TENSORVAR_TYPES)}
+
+    def encode(self, command, has_self, self_obj, args, kwargs):
+        """
+            Returns the encoded command (a JSON-able list) and the list of
+            the Tensors and Variables found in it.
+        """
+        tensorvars = []
+        encoded = [self.opcodes.get(command, command),
+                   has_self,
+                   self.encode_arg(self_obj, tensorvars) if has_self else None,
+                   [self.encode_arg(arg, tensorvars) for arg in args],
+                   {key: self.encode_arg(value, tensorvars)
+                    for key, value in kwargs.items()},
+                   None,
+                   None]
+        return encoded, tensorvars
+
+    def encode_arg(self, obj, tensorvars):
+        obj_type = type(obj)
+        if obj_type in _COMMAND_SCALAR_TYPES:
+            return obj
+        code = self.tensorvar_codes.get(obj_type)
+        if code is not None:
+            tensorvars.append(obj)
+            return [CMD_TAG_TENSORVAR, code, obj.id]
+        if obj_type is list:
+            return [CMD_TAG_LIST] + [self.encode_arg(x, tensorvars) for x in obj]
+        if obj_type is tuple:
+            return [CMD_TAG_TUPLE] + [self.encode_arg(x, tensorvars) for x in obj]
+        if obj_type is slice:
+            return [CMD_TAG_SLICE, obj.start, obj.stop, obj.step]
+        if obj_type is dict:
+            return [CMD_TAG_DICT, {key: self.encode_arg(value, tensorvars)
+                                   for key, value in obj.items()}]
+        if obj_type is set:
+            return [CMD_TAG_SET] + [self.encode_arg(x, tensorvars) for x in obj]
+        if obj_type is bytearray:
+            return [CMD_TAG_BYTEARRAY] + list(obj)
+        if obj_type is range:
+            return [CMD_TAG_RANGE, obj.start, obj.stop, obj.step]
+        # subclasses of the types above
+        if isinstance(obj, (int, float, str)):
+            return obj
+        for tensorvar_type in COMMAND_TENSORVAR_TYPES:
+            if isinstance(obj, tensorvar_type):
+                tensorvars.append(obj)
+                return [CMD_TAG_TENSORVAR, self.tensorvar_codes[tensorvar_type], obj.id]
+        if isinstance(obj, types.GeneratorType):
+            logging.warning("Generator args can't be transmitted")
+            return [CMD_TAG_LIST]
+        raise ValueError('Unhandled type', type(obj))
+
+
+class CommandDecoder():
+    """
+        Decodes the commands encoded by CommandEncoder. Tensors and Variables
+        are retrieved from the worker by id.
+    """
+    def __init__(self, command_names, worker):
+        self.command_names = command_names
+        self.worker = worker
+        self.decoders = [self.decode_tensorvar,
+                         self.decode_list,
+                         self.decode_tuple,
+                         self.decode_set,
+                         self.decode_bytearray,
+                         self.decode_range,
+                         self.decode_slice,
+                         self.decode_dict]
+
+    def decode(self, command):
+        """
+            Returns the command as a dict with the keys 'command', 'has_self',
+            'self', 'args', 'kwargs', 'ids' and 'torch_type', as well as
+            'tensorvars', the Tensors and Variables found in the command
+            (self coming last).
+        """
+        tensorvars = []
+        name = command[CMD_NAME]
+        if type(name) is int:
+            name = self.command_names[name]
+        args = [self.decode_arg(arg, tensorvars) for arg in command[CMD_ARGS]]
+        kwargs = {key: self.decode_arg(value, tensorvars)
+                  for key, value in command[CMD_KWARGS].items()}
+        has_self = command[CMD_HAS_SELF]
+        obj_self = self.decode_arg(command[CMD_SELF], tensorvars) if has_self else None
+        return {'command': name,
+                'has_self': has_self,
+                'self': obj_self,
+                'args': args,
+                'kwargs': kwargs,
+                'ids': command[CMD_IDS],
+                'torch_type': command[CMD_TORCH_TYPE],
+                'tensorvars': tensorvars}
+
+    def decode_arg(self, obj, tensorvars):
+        if type(obj) is list:
+            return self.decoders[obj[0]](obj, tensorvars)
+        return obj
+
+    def decode_tensorvar(self, obj, tensorvars):
+        tensorvar = self.worker.get_obj(obj[2])
+        tensorvars.append(tensorvar)
+        return tensorvar
+
+    def decode_list(self, obj, tensorvars):
+        return [self.decode_arg(x, tensorvars) for x in obj[1:]]
+
+    def decode_tuple(self, obj, tensorvars):
+        return tuple(self.decode_arg(x, tensorvars) for x in obj[1:])
+
+    def decode_set(self, obj, tensorvars):
+        return set(self.decode_arg(x, tensorvars) for x in obj[1:])
+
+    def decode_bytearray(self, obj, tensorvars):
+        return bytearray(obj[1:])
+
+    def decode_range(self, obj, tensorvars):
+        return range(*obj[1:])
+
+    def decode_slice(self, obj, tensorvars):
+        return slice(*obj[1:])
+
+    def decode_dict(self, obj, tensorvars):
+        return {key: self.decode_arg(value, tensorvars) for key, value in obj[1].items()}
+
+
+# Object ids are 63 bit integers (so that they fit a signed 64 bit integer)
+# made of the prefix of an IdAllocator, in the high ID_PREFIX_BITS bits, and
+# of a counter, in the low ID_COUNTER_BITS bits.
+ID_PREFIX_BITS = 31
+ID_COUNTER_BITS = 32
+
+
+class IdAllocator():
+    """
+        Allocates the ids of the objects registered with a worker. Ids are
+        handed out in increasing order from blocks of block_size ids reserved
+        under the prefix of the allocator, so that allocating an id is a
+        single next() on the current block. The ids of an allocator never
+        collide, and the prefixes of the allocators of a process are all
+        different, so that workers never draw each other's ids.
+
+        The first prefix of the allocator of a worker is derived from the id
+        of the worker (see :func:`worker_id_prefix`), so that workers of
+        different processes only share ids if their ids hash to the same
+        31 bits. A worker recreated under the same id starts over from the
+        same ids. Allocators without a worker id, those whose derived prefix
+        is already used in the process, and allocators whose prefix ran out
+        draw a prefix at random.
+
+        :Parameters:
+
+        * **prefix (int, optional)** the first prefix of the allocator. A
+          ValueError is raised if it is already used in the process.
+
+        * **block_size (int, optional)** the number of ids reserved at once
+          by :func:`new_id`.
+
+        * **worker_id (int or string, optional)** the id of the worker whose
+          objects get the ids, from which the first prefix is derived if
+          prefix isn't given.
+    """
+    _prefixes = set()
+    _prefixes_lock = threading.Lock()
+
+    def __init__(self, prefix=None, block_size=2**12, worker_id=None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._ids = iter(())
+        self._new_prefix(prefix, worker_id)
+
+    @staticmethod
+    def worker_id_prefix(worker_id):
+        """Returns the id prefix derived from a worker id: the first
+        ID_PREFIX_BITS bits of the SHA-256 of its repr, which doesn't depend
+        on the process (unlike hash())."""
+        digest = hashlib.sha256(repr(worker_id).encode()).digest()
+        return int.from_bytes(digest[:8], 'big') >> (64 - ID_PREFIX_BITS)
+
+    def _new_prefix(self, prefix=None, worker_id=None):
+        with IdAllocator._prefixes_lock:
+            if prefix is not None:
+                if not 0 <= prefix < 2**ID_PREFIX_BITS:
+                    raise ValueError('Id prefixes are {} bit integers'.format(ID_PREFIX_BITS),
+                                     prefix)
+                if prefix in IdAllocator._prefixes:
+                    raise ValueError('Id prefix already in use', prefix)
+            elif (worker_id is not None and
+                    self.worker_id_prefix(worker_id) not in IdAllocator._prefixes):
+                prefix = self.worker_id_prefix(worker_id)
+            else:
+                prefix = random.SystemRandom().getrandbits(ID_PREFIX_BITS)
+                while prefix in IdAllocator._prefixes:
+                    prefix = random.SystemRandom().getrandbits(ID_PREFIX_BITS)
+            IdAllocator._prefixes.add(prefix)
+        self.prefix = prefix
+        self._base = prefix << ID_COUNTER_BITS
+        self._next = 0
+
+    def reserve(self, n):
+        """
+            Reserves a block of n consecutive ids and returns them as a
+            range. Once the ids of its prefix run out, the allocator moves
+            on to a new prefix.
+        """
+        if not 0 < n <= 2**ID_COUNTER_BITS:
+            raise ValueError('Can only reserve between 1 and 2**{} ids'.format(ID_COUNTER_BITS), n)
+        with self._lock:
+            return self._reserve(n)
+
+    def _reserve(self, n):
+        # (the caller holds self._lock)
+        if self._next + n > 2**ID_COUNTER_BITS:
+            self._new_prefix()
+        start = self._base + self._next
+        self._next += n
+        return range(start, start + n)
+
+    def new_id(self):
+        """Returns a new id."""
+        while True:
+            ids = self._ids
             try:
-                obj_type = pat.search(key).group(1)
-                # Case of a tensor or a Variable
-                if obj_type in map(lambda x: x.__name__, self.tensorvar_types):
-                    pattern_var = re.compile('_fl.(.*)')
-                    id = int(pattern_var.search(obj).group(1))
-                    return self.worker.get_obj(id)
-                # Case of a iter type non json serializable
-                elif obj_type in ('tuple', 'set', 'bytearray', 'range'):
-                    return eval(obj_type)(obj)
-                # Case of a slice
-                elif obj_type == 'slice':
-                    return slice(*obj['args'])
-                else:
-                    return obj
-            except AttributeError:
-                pass
-        return dct
+                return next(ids)
+            except StopIteration:
+                with self._lock:
+                    # another thread may have replaced the block already
+                    if self._ids is ids:
+                        self._ids = iter(self._reserve(self.block_size))
+
+
+# Binary wire format. A blob is laid out as
+#   BLOB_MAGIC | uint32 header length | JSON header | segment 0 | segment 1 | ...
+# where every segment starts on an 8 byte boundary and the header lists the
+# byte length of each segment under the 'segments' key. Segments hold raw
+# tensor storage (or nested blobs) so that they never go through JSON.
+BLOB_MAGIC = b'SYB1'
+BLOB_PREAMBLE = struct.Struct('<4sI')
+BLOB_ALIGNMENT = 8
+
+
+def _blob_padding(nbytes):
+    return (-nbytes) % BLOB_ALIGNMENT
+
+
+def is_blob(obj):
+    """Returns True if obj is a binary blob created by :func:`pack_blob`."""
+    if not isinstance(obj, (bytes, bytearray, memoryview)):
+        return False
+    return bytes(obj[:len(BLOB_MAGIC)]) == BLOB_MAGIC
+
+
+def pack_blob(header, segments=()):
+    """
+        Packs a JSON-able header and a list of bytes-like segments
+        into a single bytearray. Each segment is copied exactly once.
+    """
+    sizes = [memoryview(segment).nbytes for segment in segments]
+    header = dict(header)
+    header['segments'] = sizes
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    offset = BLOB_PREAMBLE.size + len(header_bytes)
+    offset += _blob_padding(offset)
+    total = offset + sum(nbytes + _blob_padding(nbytes) for nbytes in sizes)
+
+    blob = bytearray(total)
+    BLOB_PREAMBLE.pack_into(blob, 0, BLOB_MAGIC, len(header_bytes))
+    blob[BLOB_PREAMBLE.size:BLOB_PREAMBLE.size + len(header_bytes)] = header_bytes
+    for segment, nbytes in zip(segments, sizes):
+        blob[offset:offset + nbytes] = segment
+        offset += nbytes + _blob_padding(nbytes)
+    return blob
+
+
+def unpack_blob(blob, decoder=None):
+    """
+        Reverses :func:`pack_blob`. Returns the decoded header and a list
+        of memoryviews over the segments (no segment data is copied).
+        If a JSON decoder is given it is used to decode the header.
+    """
+    view = memoryview(blob).cast('B')
+    magic, header_len = BLOB_PREAMBLE.unpack_from(view, 0)
+    if magic != BLOB_MAGIC:
+        raise ValueError('Not a binary syft blob')
+
+    start = BLOB_PREAMBLE.size
+    header_str = bytes(view[start:start + header_len]).decode('utf-8')
+    header = decoder.decode(header_str) if decoder else json.loads(header_str)
+
+    offset = start + header_len
+    offset += _blob_padding(offset)
+    segments = []
+    for nbytes in header['segments']:
+        segments.append(view[offset:offset + nbytes])
+        offset += nbytes + _blob_padding(nbytes)
+    return header, segments
+
+
+def _detach_payloads(message_wrapper, segments):
+    """Replaces binary messages in a (composite) wrapper by segment indices"""
+    message = message_wrapper['message']
+    if message_wrapper['type'] == 'composite':
+        message = {k: _detach_payloads(v, segments) for k, v in message.items()}
+    elif isinstance(message, (bytes, bytearray, memoryview)):
+        segments.append(message)
+        return {'type': message_wrapper['type'], 'segment': len(segments) - 1}
+    return {'type': message_wrapper['type'], 'message': message}
+
+
+def _attach_payloads(header, segments):
+    """Reverses _detach_payloads"""
+    if 'segment' in header:
+        return {'type': header['type'], 'message': segments[header['segment']]}
+    message = header['message']
+    if header['type'] == 'composite':
+        message = {k: _attach_payloads(v, segments) for k, v in message.items()}
+    return {'type': header['type'], 'message': message}
+
+
+def has_binary_payload(message_wrapper):
+    """Returns True if a (composite) message wrapper carries binary messages"""
+    message = message_wrapper['message']
+    if message_wrapper['type'] == 'composite':
+        return any(has_binary_payload(m) for m in message.values())
+    return isinstance(message, (bytes, bytearray, memoryview))
+
+
+def pack_message(message_wrapper):
+    """Packs a message wrapper holding binary messages into a blob."""
+    segments = []
+    header = _detach_payloads(message_wrapper, segments)
+    return pack_blob(header, segments)
+
+
+def unpack_message(blob, decoder=None):
+    """Unpacks a blob created by :func:`pack_message` into a message wrapper."""
+    header, segments = unpack_blob(blob, decoder)
+    return _attach_payloads(header, segments)
+
 
 def map_tuple(hook, args, func):
     if hook:
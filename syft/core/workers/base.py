@@ -2,11 +2,39 @@ import torch
 import json
 import numbers
 import re
-import random
 import asyncio
+import weakref
+import threading
+import collections
+import concurrent.futures
 from abc import ABC, abstractmethod
 
 from .. import utils
+from .store import ObjectStore
+from . import compression as compression_
+
+
+class QueuedResponse(concurrent.futures.Future):
+    """The future response of a message queued with
+    :func:`BaseWorker.queue_msg`. Asking for the result of a message which
+    hasn't been sent yet sends the messages queued with it. If the message
+    failed, its error is raised there, and no longer by the next
+    :func:`BaseWorker.flush_queue`.
+    """
+
+    def __init__(self, worker, recipient):
+        super().__init__()
+        self.worker = worker
+        self.recipient = recipient
+
+    def result(self, timeout=None):
+        if not self.done():
+            with self.worker._send_lock_of(self.recipient):
+                self.worker._flush_queue(self.recipient)
+        with self.worker._queue_lock:
+            if self in self.worker._failed_responses:
+                self.worker._failed_responses.remove(self)
+        return super().result(timeout)
 
 
 class BaseWorker(ABC):
@@ -59,10 +87,39 @@ class BaseWorker(ABC):
         * **verbose (bool, optional)** A flag for whether or not to
           print events to stdout.
 
+        * **queue_size (int, optional)** The number of messages queued for a
+          worker (see :func:`queue_msg`) after which they are sent as one
+          composite message. If 0, queued messages are only sent when
+          needed. A TorchHook whose local worker has a queue_size queues
+          the commands it can on remote pointers.
+
+        * **queue_timeout (float, optional)** If set, the messages queued
+          for a worker are sent by a timer thread queue_timeout seconds
+          after the oldest of them was queued, if they weren't sent before.
+
+        * **use_json (bool, optional)** If set to True, objects are
+          serialized to JSON instead of the binary wire format. JSON is
+          much slower and is only intended as a fallback for debugging.
+
+        * **memory_budget (int, optional)** If set, the number of bytes of
+          tensor data the worker aims to hold in memory: beyond it,
+          intermediate results released with :func:`release_obj` are
+          evicted and, if spill_dir is set, cold tensors are spilled to disk
+          (see :class:`.store.ObjectStore`).
+
+        * **spill_dir (string, optional)** The directory in which cold
+          tensors are spilled to memory-mapped files.
+
     """
 
+    # The number of objects of a worker no longer pointed to after which it
+    # is told to delete them, if they aren't deleted along with other
+    # messages before (see _queue_deletes).
+    delete_batch_size = 100
+
     def __init__(self,  hook=None, id=0, is_client_worker=False, objects={},
-                 tmp_objects={}, known_workers={}, verbose=True, queue_size=0):
+                 tmp_objects={}, known_workers={}, verbose=True, queue_size=0,
+                 use_json=False, queue_timeout=None, memory_budget=None, spill_dir=None):
 
         # This is a reference to the hook object which overloaded
         # the underlying deep learning framework
@@ -83,10 +140,17 @@ class BaseWorker(ABC):
         # a client worker, it stores all tensors it receives
         #  or creates in this dictionary. The key to each object
         # is it's id.
-        self._objects = {}
+        self._objects = ObjectStore(memory_budget=memory_budget, spill_dir=spill_dir)
         for k, v in objects.items():
             self._objects[k] = v
 
+        # Allocates the ids of the objects registered with this worker
+        # (see utils.IdAllocator), under a prefix derived from the id of the
+        # worker. The default id is shared by all the workers which weren't
+        # given one (e.g. the local worker of every client), so their prefix
+        # is drawn at random.
+        self.ids = utils.IdAllocator(worker_id=None if id == 0 else id)
+
         # The temporary registry. When the worker IS a client
         # worker, it stores some tensors temporarily in this
         # _tmp_objects simply to ensure that they do not get
@@ -109,9 +173,52 @@ class BaseWorker(ABC):
         # A flag for whether or not to print events to stdout.
         self.verbose = verbose
 
-        # A list for storing messages to be sent as well as the max size of the list
-        self.message_queue = []
+        # Messages queued for each recipient (see queue_msg), with the futures
+        # of their responses, as well as the number of messages after which
+        # they are sent, and the timers sending them after queue_timeout
+        # seconds. The futures of the queued messages which failed are kept
+        # until their errors are raised (see _raise_queue_errors).
+        self._message_queues = {}
+        self._queue_timers = {}
+        self._queue_lock = threading.RLock()
         self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._failed_responses = []
+
+        # Whether objects sent by this worker are serialized to JSON (for
+        # debugging) instead of the binary wire format.
+        self.use_json = use_json
+
+        # Per recipient id, the lock held while this worker sends messages
+        # to the recipient, so that concurrent messages to the same worker
+        # (e.g. from several threads, or through the asynchronous API) don't
+        # interleave on its connection. It is always taken before
+        # _queue_lock, which is never held during a round trip: messages to
+        # different workers overlap. Locks belong to the sender, so that
+        # workers relaying messages to each other can't deadlock.
+        self._send_locks = {}
+
+        # Pointers held by this worker to the objects of other workers: the
+        # number of pointer objects per (owner id, object id), the keys of
+        # the pointer objects garbage collected since they were last counted
+        # and, per owner id, the ids of the objects it is to be told to
+        # delete (see _track_pointer).
+        self._pointer_refs = {}
+        self._released_pointers = collections.deque()
+        self._pending_deletes = {}
+
+        # The data of the objects received with keep_base set, and the
+        # compression errors carried over to the next change of each object
+        # (see prepare_send_deltas).
+        self._update_bases = {}
+        self._update_residuals = {}
+
+    def memory_stats(self):
+        """Returns statistics about the objects held by the worker: the
+        number of objects, the bytes of tensor data held in memory, the
+        number of objects evicted and the number and bytes of tensors
+        spilled to disk (see :class:`.store.ObjectStore`)."""
+        return self._objects.stats()
 
     def whoami(self):
         """Returns metadata information about the worker. This function returns the default
@@ -123,7 +230,8 @@ class BaseWorker(ABC):
 
     def send_msg(self, message, message_type, recipient):
         """Sends a string message to another worker with message_type information
-        indicating how the message should be processed.
+        indicating how the message should be processed. The messages queued for
+        the recipient are sent first.
 
         :Parameters:
 
@@ -142,37 +250,366 @@ class BaseWorker(ABC):
         message_wrapper = {}
         message_wrapper['message'] = message
         message_wrapper['type'] = message_type
-        self.message_queue.append(message_wrapper)
-        if self.queue_size:
-            if len(self.message_queue) > self.queue_size:
-                message_wrapper = self.compile_composite_message()
+
+        with self._send_lock_of(recipient):
+            self._flush_queue(recipient, self.delete_batch_size)
+            self._raise_queue_errors()
+            return self._send_msg(self._encode_message(message_wrapper), recipient)
+
+    def queue_msg(self, message, message_type, recipient):
+        """Queues a message for another worker instead of sending it. The
+        messages queued for a worker are sent together, as one composite
+        message, when queue_size of them are queued, queue_timeout seconds
+        after the oldest one was queued, before any other message is sent to
+        the worker, or when :func:`flush_queue` is called.
+        The errors of queued messages are raised by the next of these last
+        two (see :func:`flush_queue`), or when asking for their response.
+
+        :Parameters:
+
+        * **recipient (** :class:`VirtualWorker` **)** the worker being sent a message.
+
+        * **message (string)** the message being sent
+
+        * **message_type (string)** the type of message being sent.
+
+        * **out (** :class:`QueuedResponse` **)** the future response of the
+          message. Asking for its result sends the queued messages if needed.
+        """
+        message_wrapper = {}
+        message_wrapper['message'] = message
+        message_wrapper['type'] = message_type
+        response = QueuedResponse(self, recipient)
+
+        with self._queue_lock:
+            recipient_id = self._recipient_id(recipient)
+            _, queue = self._message_queues.setdefault(recipient_id, (recipient, []))
+            queue.append((message_wrapper, response))
+
+            full = self.queue_size and len(queue) >= self.queue_size
+            if (not full and self.queue_timeout is not None and
+                    recipient_id not in self._queue_timers):
+                timer = threading.Timer(self.queue_timeout, self._flush_on_timeout,
+                                        args=(recipient, queue))
+                timer.daemon = True
+                self._queue_timers[recipient_id] = timer
+                timer.start()
+
+        if full:
+            with self._send_lock_of(recipient):
+                self._flush_queue(recipient)
+        return response
+
+    def flush_queue(self, recipient=None):
+        """Sends the messages queued for recipient (or for every worker if
+        recipient is None) as one composite message per worker, and resolves
+        their futures with the responses. The objects of recipient which are
+        no longer pointed to are deleted along (see :func:`_track_pointer`).
+        Raises a RuntimeError listing the errors of the queued messages which
+        failed since the errors were last raised, if any.
+
+        :Parameters:
+
+        * **recipient (** :class:`VirtualWorker` **or id, optional)** the
+          worker whose queued messages are sent.
+        """
+        if recipient is None:
+            with self._queue_lock:
+                pending_deletes = self._collect_pointers()
+                recipients = [recipient for recipient, _ in self._message_queues.values()]
+                recipients += [self._known_workers[owner_id] for owner_id in pending_deletes
+                               if owner_id in self._known_workers and
+                               owner_id not in self._message_queues]
+        else:
+            recipients = [recipient]
+
+        for recipient in recipients:
+            with self._send_lock_of(recipient):
+                self._flush_queue(recipient)
+        self._raise_queue_errors()
+
+    def _flush_queue(self, recipient, min_deletes=1):
+        """Sends the messages queued for recipient, along with the deletes
+        pending for it (see :func:`_queue_deletes`). The caller holds the send
+        lock of recipient. The recipient processes every message even if
+        some fail: the futures of those get their error, and are kept until
+        it is raised (see :func:`_raise_queue_errors`)."""
+        with self._queue_lock:
+            self._queue_deletes(recipient, min_deletes)
+            recipient_id = self._recipient_id(recipient)
+            timer = self._queue_timers.pop(recipient_id, None)
+            if timer is not None:
+                timer.cancel()
+            if recipient_id not in self._message_queues:
+                return
+            recipient, queue = self._message_queues.pop(recipient_id)
+
+        message_wrapper = self.compile_composite_message(
+            [message_wrapper for message_wrapper, _ in queue])
+        try:
+            response = self._send_msg(self._encode_message(message_wrapper), recipient)
+            responses = self._decode_composite_response(response)
+        except Exception as e:
+            for _, future in queue:
+                future.set_exception(e)
+            raise
+        for (message_wrapper, future), (response_type, response) in zip(queue, responses):
+            if response_type == 'error':
+                future.set_exception(RuntimeError(
+                    'Queued {} message to worker {} failed: {}'.format(
+                        message_wrapper['type'], recipient_id, response)))
+                with self._queue_lock:
+                    self._failed_responses.append(future)
             else:
-                return None
+                future.set_result(response)
+
+    def _flush_on_timeout(self, recipient, queue):
+        """Sends the messages queued for recipient from the timer started
+        when the oldest of them was queued, unless they were sent in the
+        meantime. The futures of the messages which can't be sent get the
+        error, which is raised by the next :func:`flush_queue` or
+        :func:`send_msg`."""
+        with self._send_lock_of(recipient):
+            with self._queue_lock:
+                _, current = self._message_queues.get(self._recipient_id(recipient), (None, None))
+                if current is not queue:
+                    return
+            try:
+                self._flush_queue(recipient)
+            except Exception:
+                with self._queue_lock:
+                    self._failed_responses.extend(
+                        future for _, future in queue if future not in self._failed_responses)
+
+    def _raise_queue_errors(self):
+        """Raises a RuntimeError listing the errors of the queued messages
+        which failed since the last call, if any."""
+        with self._queue_lock:
+            failed, self._failed_responses = self._failed_responses, []
+        if failed:
+            raise RuntimeError('{} queued message(s) failed:\n{}'.format(
+                len(failed), '\n'.join(str(future.exception()) for future in failed)))
+
+    def _send_lock_of(self, recipient):
+        """Returns the lock held while sending messages to recipient (a
+        worker or its id)."""
+        recipient_id = self._recipient_id(recipient)
+        lock = self._send_locks.get(recipient_id)
+        if lock is None:
+            lock = self._send_locks.setdefault(recipient_id, threading.RLock())
+        return lock
+
+    def _track_pointer(self, obj):
+        """Counts obj among the pointers held to the objects of other workers.
+        Once the last pointer to an object is garbage collected, its owner is
+        told to delete it by a 'delete' message, queued along with the next
+        messages sent to the owner. Re-registering a pointer (e.g. when get
+        turns it into a local object) stops counting it under its former id
+        and owners without telling them.
+
+        Garbage collection only records the pointers released (a finalizer
+        may run in the middle of sending a message): they are counted by
+        :func:`_collect_pointers` before messages are sent.
+        """
+        keys = ()
+        if obj.is_pointer:
+            keys = tuple((owner_id, obj.id) for owner_id in map(self._recipient_id, obj.owners)
+                         if owner_id != self.id)
+
+        finalizer = getattr(obj, '_pointer_finalizer', None)
+        if finalizer is not None and finalizer.alive:
+            _, release, (old_keys,), _ = finalizer.peek()
+            if release.__self__ is not self._released_pointers or old_keys == keys:
+                return
+            finalizer.detach()
+            with self._queue_lock:
+                for key in old_keys:
+                    self._release_pointer(key, notify=False)
+
+        if keys:
+            with self._queue_lock:
+                for key in keys:
+                    self._pointer_refs[key] = self._pointer_refs.get(key, 0) + 1
+            finalizer = weakref.finalize(obj, self._released_pointers.extend, keys)
+            finalizer.atexit = False
+            obj._pointer_finalizer = finalizer
+
+    def _release_pointer(self, key, notify=True):
+        count = self._pointer_refs.get(key, 0) - 1
+        if count > 0:
+            self._pointer_refs[key] = count
+            return
+        self._pointer_refs.pop(key, None)
+        if notify:
+            self._pending_deletes.setdefault(key[0], []).append(key[1])
+
+    def _collect_pointers(self):
+        """Counts the pointers garbage collected since the last call, and
+        returns the ids of the objects to delete, per owner id."""
+        with self._queue_lock:
+            while self._released_pointers:
+                self._release_pointer(self._released_pointers.popleft())
+            return self._pending_deletes
+
+    def _queue_deletes(self, recipient=None, min_batch=1):
+        """Queues a 'delete' message for the objects of recipient (or of
+        every known worker if recipient is None) no longer pointed to. Before
+        a message is sent, they are only deleted by batches of
+        delete_batch_size, unless messages are queued for recipient anyway,
+        so that deleting them doesn't cost a round trip per message. The
+        caller holds _queue_lock."""
+        pending_deletes = self._collect_pointers()
+        if recipient is None:
+            owners = [self._known_workers[owner_id] for owner_id in list(pending_deletes)
+                      if owner_id in self._known_workers]
+        else:
+            owners = [recipient]
+        for owner in owners:
+            owner_id = self._recipient_id(owner)
+            obj_ids = pending_deletes.get(owner_id)
+            if obj_ids and (len(obj_ids) >= min_batch or owner_id in self._message_queues):
+                del pending_deletes[owner_id]
+                self.queue_msg(obj_ids, 'delete', owner)
+
+    @staticmethod
+    def _recipient_id(recipient):
+        if isinstance(recipient, BaseWorker):
+            return recipient.id
+        return recipient
 
-        message_wrapper_json = json.dumps(message_wrapper) + "\n"
+    @classmethod
+    def _encode_message(cls, message_wrapper):
+        """
+        Encodes a message wrapper for the wire. Wrappers carrying binary
+        objects are packed into a binary blob (see :func:`utils.pack_message`)
+        while all others are sent as newline terminated JSON.
 
-        message_wrapper_json_binary = message_wrapper_json.encode()
+        * **message_wrapper (dict)** Dictionary containing the message
+          and meta information
+
+        * **out (binary)** the encoded message
+        """
+        if utils.has_binary_payload(message_wrapper):
+            return utils.pack_message(message_wrapper)
 
-        self.message_queue = []
-        return self._send_msg(message_wrapper_json_binary, recipient)
+        message_wrapper_json = json.dumps(message_wrapper) + "\n"
+        return message_wrapper_json.encode()
 
-    def compile_composite_message(self):
+    @classmethod
+    def compile_composite_message(cls, message_wrappers):
         """
-        Returns a composite message in a dictionary from the message queue.
-        Eventually will take a recipient id.
+        Returns a composite message in a dictionary from a list of message
+        wrappers. The messages which aren't binary are JSON encoded on their
+        own, as the recipient can only decode each of them right before
+        processing it: they may refer to objects created by the previous ones.
+
+        * **message_wrappers (list of dict)** the messages to be sent
 
-        * **out (dict)** dictionary containing the message queue compiled
-        as a composite message
+        * **out (dict)** dictionary containing the messages compiled
+          as a composite message
         """
 
         message_wrapper = {}
 
-        message_wrapper['message'] = {
-            message_number: message for message_number, message in enumerate(self.message_queue)}
+        message_wrapper['message'] = {}
+        for message_number, wrapper in enumerate(message_wrappers):
+            message = wrapper['message']
+            if not isinstance(message, (bytes, bytearray, memoryview)):
+                message = json.dumps(message)
+            message_wrapper['message'][message_number] = {'type': wrapper['type'],
+                                                          'message': message}
         message_wrapper['type'] = 'composite'
 
         return message_wrapper
 
+    def process_composite_message(self, message):
+        """
+        Processes in order the messages of a composite message and returns
+        their responses, encoded as a composite message as well. A message
+        which fails doesn't stop the others: its response is of type 'error'
+        and carries the error.
+
+        * **message (dict)** the messages (see :func:`compile_composite_message`)
+
+        * **out (binary)** the encoded responses
+        """
+        decoder = utils.PythonJSONDecoder(self)
+        responses = []
+        for message_number in sorted(message.keys(), key=int):
+            message_wrapper = message[message_number]
+            try:
+                if isinstance(message_wrapper['message'], str):
+                    message_wrapper = {'type': message_wrapper['type'],
+                                       'message': decoder.decode(message_wrapper['message'])}
+                responses.append({'type': 'response',
+                                  'message': self.process_message_type(message_wrapper)})
+            except Exception as e:
+                responses.append({'type': 'error',
+                                  'message': '{}: {}'.format(type(e).__name__, e)})
+        return self._encode_message(self.compile_composite_message(responses))
+
+    @classmethod
+    def _decode_composite_response(cls, response):
+        """Reverses :func:`process_composite_message`: returns the list of
+        the (type, response) of the messages of a composite message, type
+        being 'response' or 'error'."""
+        if utils.is_blob(response):
+            message = utils.unpack_message(response)['message']
+        else:
+            if isinstance(response, (bytes, bytearray, memoryview)):
+                response = str(response, 'utf-8')
+            message = json.loads(response)['message']
+
+        responses = []
+        for message_number in sorted(message.keys(), key=int):
+            response = message[message_number]['message']
+            if isinstance(response, str):
+                response = json.loads(response)
+            responses.append((message[message_number]['type'], response))
+        return responses
+
+    async def async_send_msg(self, message, message_type, recipient):
+        """Coroutine version of :func:`send_msg`. Awaiting it sends the message
+        and gives the response, without blocking the event loop, so that
+        messages to several workers can be in flight at the same time.
+        Messages sent this way are never queued, but the messages queued for
+        the recipient are sent first.
+
+        :Parameters:
+
+        * **recipient (** :class:`VirtualWorker` **)** the worker being sent a message.
+
+        * **message (string)** the message being sent
+
+        * **message_type (string)** the type of message being sent.
+
+        * **out (object)** the response from the message being sent.
+        """
+        message_wrapper = {}
+        message_wrapper['message'] = message
+        message_wrapper['type'] = message_type
+
+        with self._send_lock_of(recipient):
+            self._flush_queue(recipient, self.delete_batch_size)
+        self._raise_queue_errors()
+        return await self._async_send_msg(self._encode_message(message_wrapper), recipient)
+
+    async def _async_send_msg(self, message_wrapper_json_binary, recipient):
+        """Coroutine version of :func:`_send_msg`. By default the blocking
+        :func:`_send_msg` runs in the event loop's executor while holding the
+        recipient's send lock: messages to the same worker are sent one at a
+        time while messages to different workers overlap. Only the transport
+        may run on the executor: the response is processed (and pointers
+        registered) by the caller, on the event loop's thread. Workers with
+        an asynchronous transport, or which process messages in this process
+        (see :class:`VirtualWorker`), override this method.
+        """
+        def send():
+            with self._send_lock_of(recipient):
+                return self._send_msg(message_wrapper_json_binary, recipient)
+
+        return await asyncio.get_event_loop().run_in_executor(None, send)
+
     @abstractmethod
     def _send_msg(self, message_wrapper_json_binary, recipient):
         """Sends a string message to another worker with message_type information
@@ -192,7 +629,7 @@ class BaseWorker(ABC):
 
     def receive_msg(self, message_wrapper_json, is_binary=True):
         """Receives an message from a worker and then executes its contents appropriately.
-        The message is encoded as a binary blob.
+        The message is encoded either as a binary blob or as JSON.
 
         * **message (binary)** the message being sent
 
@@ -201,10 +638,13 @@ class BaseWorker(ABC):
           local development with :class:`VirtualWorker` workers.
         """
 
-        if(is_binary):
-            message_wrapper_json = message_wrapper_json.decode('utf-8')
         decoder = utils.PythonJSONDecoder(self)
-        message_wrapper = decoder.decode(message_wrapper_json)
+        if(utils.is_blob(message_wrapper_json)):
+            message_wrapper = utils.unpack_message(message_wrapper_json, decoder)
+        else:
+            if(is_binary):
+                message_wrapper_json = str(message_wrapper_json, 'utf-8')
+            message_wrapper = decoder.decode(message_wrapper_json)
         return self.process_message_type(message_wrapper)
 
     def process_message_type(self, message_wrapper):
@@ -226,20 +666,53 @@ class BaseWorker(ABC):
         # Receiving an object from another worker
         if(message_wrapper['type'] == 'obj'):
             response = self.receive_obj(message)  # DONE!
-            return response.ser()
+            return response.ser(as_json=self.use_json)
 
         #  Receiving a request for an object from another worker
         elif(message_wrapper['type'] == 'req_obj'):
             return self.prepare_send_object(self.get_obj(message))
 
+        # Receiving several objects at once (e.g. the parameters of a model)
+        elif(message_wrapper['type'] == 'objs'):
+            return json.dumps([obj.id for obj in self.receive_objs(message)]) + "\n"
+
+        #  Receiving a request for several objects at once
+        elif(message_wrapper['type'] == 'req_objs'):
+            return self.prepare_send_objects([self.get_obj(obj_id) for obj_id in message])
+
+        #  Receiving a request for the change of several objects (see prepare_send_deltas)
+        elif(message_wrapper['type'] == 'req_deltas'):
+            return self.prepare_send_deltas(message['ids'], message['compression'],
+                                            message['error_feedback'], **message['options'])
+
+        #  Receiving a request to send an object to another worker directly
+        elif(message_wrapper['type'] == 'fwd_obj'):
+            self.send_objs([self.get_obj(message['id'])], self.get_worker(message['to']))
+            return json.dumps(message['id']) + "\n"
+
+        #  Receiving a request to send a chunk of a tensor to another worker
+        #  (see all_reduce)
+        elif(message_wrapper['type'] == 'fwd_chunk'):
+            return self.send_chunk(**message)
+
+        #  Receiving a chunk of a tensor from another worker
+        elif(message_wrapper['type'] == 'chunk'):
+            return self.receive_chunk(message)
+
         #  A torch command from another worker involving one or more tensors
         #  hosted locally
         elif(message_wrapper['type'] == 'torch_cmd'):
-            return json.dumps(self.handle_command(message)) + "\n"
+            command = utils.CommandDecoder(self.hook.command_names, self).decode(message)
+            return json.dumps(self.handle_command(command)) + "\n"
         # A composite command. Must be unrolled
         elif(message_wrapper['type'] == 'composite'):
-            return [self.process_message_type(message[message_number])
-                    for message_number in message]
+            return self.process_composite_message(message)
+
+        # The ids of objects no other worker points to anymore
+        elif(message_wrapper['type'] == 'delete'):
+            for obj_id in message:
+                self.rm_obj(obj_id)
+            return json.dumps(len(message)) + "\n"
 
         return "Unrecognized message type:" + message_wrapper['type']
 
@@ -384,12 +857,12 @@ class BaseWorker(ABC):
         >>> x
         [torch.FloatTensor - Locations:[<VirtualWorker at 0x113f58c50>]]
         >>> x.id
-        3214169934
+        6917529027641081857
         >>> remote.get_obj(x.id)
         [torch.FloatTensor - Locations:[1]]
         """
 
-        return self._objects[int(remote_key)]
+        return self._objects[remote_key]
 
     def set_obj(self, remote_key, value, force=False, tmp=False):
         """
@@ -497,8 +970,44 @@ class BaseWorker(ABC):
 
         * **remote_key(int or string)** the id of the object to be removed
         """
-        if(remote_key in self._objects):
-            del self._objects[remote_key]
+        self._objects.discard(remote_key)
+        self._update_bases.pop(remote_key, None)
+        self._update_residuals.pop(remote_key, None)
+
+    def _rm_obj_tree(self, obj):
+        """
+        Removes an object from the permanent object registry along with the
+        children registered with it by :func:`register_object` (the .data and
+        .grad of a Variable, recursively).
+
+        :parameters:
+
+        * **obj (object)** the object to be removed
+        """
+        self.rm_obj(obj.id)
+        grad = getattr(obj, 'grad', None)
+        if(grad is not None):
+            self._rm_obj_tree(grad)
+        try:
+            data = getattr(obj, 'data', None)
+        except RuntimeError:
+            data = None
+        if(data is not None and data is not obj):
+            self.rm_obj(data.id)
+
+    def release_obj(self, remote_key):
+        """
+        Marks an object as no longer needed by the workers pointing to it,
+        without removing it: if it is the result of a command, it may be
+        evicted once the memory budget of the worker is exceeded (see
+        :class:`.store.ObjectStore`). Objects no worker points to anymore
+        are removed by 'delete' messages instead.
+
+        :parameters:
+
+        * **remote_key(int or string)** the id of the object released
+        """
+        self._objects.release(remote_key)
 
     def _clear_tmp_objects(self):
         """
@@ -557,8 +1066,9 @@ class BaseWorker(ABC):
 
         :kwargs:
 
-        * **id (int or string)** random integer between 0 and 1e10 or
-          string uniquely identifying the object.
+        * **id (int or string)** integer or string uniquely identifying
+          the object (by default, a new id from the worker's
+          :class:`utils.IdAllocator`).
 
         * **owners (list of ** :class:`BaseWorker` objects ** or ids)**
           owner(s) of the object
@@ -567,29 +1077,11 @@ class BaseWorker(ABC):
           registered contains the data locally or is instead a pointer to
           a tensor that lives on a different worker.
         """
-        # TODO: Assign default id more intelligently (low priority)
-        #       Consider popping id from long list of unique integers
-
         keys = kwargs.keys()
 
-        # DO NOT DELETE THIS TRY/CATCH UNLESS YOU KNOW WHAT YOU'RE DOING
-        # PyTorch tensors wrapped invariables (if my_var.data) are python
-        # objects that get deleted and re-created randomly according to
-        # the whims of the PyTorch wizards. Thus, our attributes were getting
-        # deleted with them (because they are not present in the underlying
-        # C++ code.) Thus, so that these python objects do NOT get garbage
-        # collected, we're creating a secondary reference to them from the
-        # parent Variable object (which we have been told is stable). This
-        # is experimental functionality but seems to solve the symptoms we
-        # were previously experiencing.
-        try:
-            obj.data_backup = obj.data
-        except:
-            ""
-
         obj.id = (kwargs['id']
                   if ('id' in keys and kwargs['id'] is not None)
-                  else random.randint(0, 1e10))
+                  else self.ids.new_id())
 
         obj.owners = (kwargs['owners']
                       if 'owners' in keys
@@ -607,6 +1099,24 @@ class BaseWorker(ABC):
         obj.is_pointer = (kwargs['is_pointer']
                           if 'is_pointer' in keys
                           else False)
+        self._track_pointer(obj)
+
+        # DO NOT DELETE THIS TRY/CATCH UNLESS YOU KNOW WHAT YOU'RE DOING
+        # (it comes after setting id and owners, as reading obj.data may
+        # register obj.data, which needs the owners of obj)
+        # PyTorch tensors wrapped invariables (if my_var.data) are python
+        # objects that get deleted and re-created randomly according to
+        # the whims of the PyTorch wizards. Thus, our attributes were getting
+        # deleted with them (because they are not present in the underlying
+        # C++ code.) Thus, so that these python objects do NOT get garbage
+        # collected, we're creating a secondary reference to them from the
+        # parent Variable object (which we have been told is stable). This
+        # is experimental functionality but seems to solve the symptoms we
+        # were previously experiencing.
+        try:
+            obj.data_backup = obj.data
+        except:
+            ""
 
         mal_points_away = obj.is_pointer and self.id in obj.owners
         # print("Mal Points Away:" + str(mal_points_away))
@@ -660,39 +1170,33 @@ class BaseWorker(ABC):
         :Parameters:
 
         * **command_msg (dict)** The dictionary containing a
-          command from another worker.
+          command from another worker, as decoded by
+          :class:`utils.CommandDecoder`.
 
         * **out (command output, list of** :class:`BaseWorker`
           ids/objects **)** This executes the command
           and returns its output along with a list of
           the owners of the tensors involved.
         """
-        # Args and kwargs contain special strings in place of tensors
-        # Need to retrieve the tensors from self.worker.objects
-        arg_tensors = self._retrieve_tensor(command_msg['args'])
         args = command_msg['args']
-        kwarg_tensors = self._retrieve_tensor(list(command_msg['kwargs'].values()))
         kwargs = command_msg['kwargs']
         has_self = command_msg['has_self']
-        # TODO: Implement get_owners and refactor to make it prettier
-        tensorvars = arg_tensors + kwarg_tensors
+        tensorvars = command_msg['tensorvars']
 
         if has_self:
             command = self._command_guard(
                 command_msg['command'], self.hook.tensorvar_methods)
-            obj_self = self._retrieve_tensor(command_msg['self'])[0]
-            tensorvars = tensorvars + [obj_self]
-            command = eval('obj_self.{}'.format(command))
+            command = getattr(command_msg['self'], command)
         else:
             try:
                 command = self._command_guard(
                     command_msg['command'], self.hook.torch_funcs)
-                command = eval('torch.{}'.format(command))
+                command = getattr(torch, command)
             except RuntimeError:
                 try:
                     command = self._command_guard(
                         command_msg['command'], self.hook.torch_functional_funcs)
-                    command = eval('torch.nn.functional.{}'.format(command))
+                    command = getattr(torch.nn.functional, command)
                 except ValueError:
                     pass
 
@@ -709,10 +1213,13 @@ class BaseWorker(ABC):
                 owner_ids.append(owner.id)
         return command(*args, **kwargs), owner_ids
 
-    def compile_result(self, result, owners):
+    def compile_result(self, result, owners, intermediate=False):
         """
         Converts the result to a JSON serializable message for sending
-        over PubSub.
+        over PubSub. If intermediate is True, the tensors and Variables
+        which weren't registered yet are stored as intermediate results,
+        which may be evicted under memory pressure (see
+        :class:`.store.ObjectStore`).
         """
         if result is None:
             return dict(registration=None, torch_type=None,
@@ -728,19 +1235,23 @@ class BaseWorker(ABC):
                                    str(result.__class__)).group(1)
 
             try:
-                var_data = self.compile_result(result.data, owners)
+                var_data = self.compile_result(result.data, owners, intermediate)
             except (AttributeError, RuntimeError):
                 var_data = None
             try:
                 assert result.grad is not None
-                var_grad = self.compile_result(result.grad, owners)
+                var_grad = self.compile_result(result.grad, owners, intermediate)
             except (AttributeError, AssertionError):
                 var_grad = None
+            # (in-place commands return objects which are already stored)
+            is_new = getattr(result, '_id', None) not in self._objects
             try:
                 result = self.register_object(
                     result, id=result.id, owners=owners)
             except AttributeError:
                 result = self.register_object(result, owners=owners)
+            if intermediate and is_new:
+                self._objects.mark_intermediate(result.id)
 
             registration = dict(id=result.id,
                                 owners=owners, is_pointer=True)
@@ -751,17 +1262,29 @@ class BaseWorker(ABC):
         except AttributeError as e:
             # result is occasionally a sequence of tensors or variables
 
-            return [self.compile_result(x, owners) for x in result]
+            return [self.compile_result(x, owners, intermediate) for x in result]
 
     def handle_command(self, message):
         """
-        Main function that handles incoming torch commands.
+        Main function that handles incoming torch commands, decoded by
+        :class:`utils.CommandDecoder`.
+
+        Commands queued by a client (see :func:`TorchHook._defer_remote_call`)
+        come with the ids of their result under 'ids' and its expected type
+        under 'torch_type', as the client already created the pointer to it.
         """
 
         # take in command message, return result of local execution
         result, owners = self.process_command(message)
 
-        compiled = self.compile_result(result, owners)
+        if message.get('ids') is not None:
+            torch_type = re.search("<class '(torch.(.*))'>", str(result.__class__))
+            if torch_type is None or torch_type.group(1) != message['torch_type']:
+                raise TypeError('Queued command {} returned a {} instead of a {}'.format(
+                    message['command'], type(result), message['torch_type']))
+            result = self._register_deferred_result(result, message['ids'])
+
+        compiled = self.compile_result(result, owners, intermediate=True)
 
         compiled = json.dumps(compiled)
         if compiled is not None:
@@ -770,6 +1293,19 @@ class BaseWorker(ABC):
             return dict(registration=None, torch_type=None,
                         var_data=None, var_grad=None)
 
+    def _register_deferred_result(self, result, ids):
+        """
+        Re-registers the result of a deferred command with the ids chosen by
+        the client: ids['id'] for the result itself and, for Variables,
+        ids['data']['id'] for its data.
+        """
+        if ids.get('data') is not None:
+            self.handle_register(result.data, ids['data'])
+            self._objects.mark_intermediate(ids['data']['id'])
+        result = self.handle_register(result, ids)
+        self._objects.mark_intermediate(ids['id'])
+        return result
+
     def handle_register(self, torch_object, obj_msg, force_attach_to_worker=False, temporary=False):
         """
         This function is responsible for re-registering an object when it has
@@ -819,13 +1355,27 @@ class BaseWorker(ABC):
         return torch_object
 
     def prepare_send_object(self, obj, delete_local=True, send_pointer=False):
+        """prepare_send_object(self, obj, delete_local=True, send_pointer=False) -> binary
+        Serializes an object so that it can be sent to another worker. Unless
+        self.use_json is set, the object is encoded in the binary wire format.
+
+        :Parameters:
 
-        obj_json = obj.ser(include_data=not send_pointer)
+        * **obj (object)** a python object to be sent
+
+        * **delete_local (bool, optional)** when set to true, it deletes the version of the
+          object in the local registry.
+
+        * **send_pointer (bool, optional)** when set to true, only the metadata of the
+          object is serialized, not its contents.
+        """
+
+        obj_msg = obj.ser(include_data=not send_pointer, as_json=self.use_json)
 
         if(delete_local):
             self.rm_obj(obj.id)
 
-        return obj_json
+        return obj_msg
 
     def send_obj(self, obj, recipient, delete_local=True, send_pointer=True):
         """send_obj(self, obj, recipient, delete_local=True) -> obj
@@ -863,23 +1413,194 @@ class BaseWorker(ABC):
     def receive_obj(self, message):
         """receive_obj(self, message) -> (a torch.autograd.Variable or torch.Tensor object)
         Functionality that receives a Tensor or Variable from another VirtualWorker
-        (as a string), deserializes it, and registers it within the local permanent registry.
+        (as a binary blob or JSON string), deserializes it, and registers it within
+        the local permanent registry.
 
         :Parameters:
 
-        * **message(JSON string)** the message encoding the object being received.
+        * **message(binary or JSON string)** the message encoding the object being received.
 
 
         """
 
-        message_obj = json.loads(message)
-        obj_type = self.hook.guard.types_guard(message_obj['torch_type'])
-        obj = obj_type.deser(obj_type, message_obj)
+        obj, message_obj = self._load_obj(message)
 
         self.handle_register(obj, message_obj, force_attach_to_worker=True)
 
         return obj
 
+    def _load_obj(self, message, register=True):
+        """Deserializes the object encoded in message (see :func:`receive_obj`)
+        and returns it with its decoded message. Unless register is False, the
+        children of the object (the data and grad of a Variable) are registered,
+        but never the object itself."""
+        if(utils.is_blob(message)):
+            message_obj, segments = utils.unpack_blob(message)
+        else:
+            message_obj, segments = json.loads(message), None
+        obj_type = self.hook.guard.types_guard(message_obj['torch_type'])
+        if register:
+            return obj_type.deser(obj_type, message_obj, segments), message_obj
+        return obj_type.deser(obj_type, message_obj, segments, register=False), message_obj
+
+    def prepare_send_objects(self, objs, delete_local=True, keep_base=False):
+        """prepare_send_objects(self, objs, delete_local=True, keep_base=False) -> binary
+        Serializes several objects into a single message: a binary blob whose
+        segments are the blobs of the objects (see :func:`utils.pack_blob`),
+        or a JSON object listing their JSON strings if self.use_json is set.
+
+        :Parameters:
+
+        * **objs (list of objects)** the python objects to be sent
+
+        * **delete_local (bool, optional)** when set to true, it deletes the objects
+          from the local registry.
+
+        * **keep_base (bool, optional)** when set to true, the recipient keeps a copy
+          of the data of the objects (Variables), so that only their change can be sent back
+          (see :func:`prepare_send_deltas`).
+        """
+        if self.use_json:
+            message = json.dumps({'objects': [obj.ser(as_json=True) for obj in objs],
+                                  'keep_base': keep_base}) + "\n"
+        else:
+            message = utils.pack_blob({'objects': len(objs), 'keep_base': keep_base},
+                                      [obj.ser() for obj in objs])
+
+        if(delete_local):
+            for obj in objs:
+                self._rm_obj_tree(obj)
+
+        return message
+
+    def send_objs(self, objs, recipient, delete_local=True, keep_base=False):
+        """send_objs(self, objs, recipient, delete_local=True, keep_base=False) -> object
+        Sends several objects (e.g. all the parameters of a model) to another worker
+        in a single message, instead of one message per object as :func:`send_obj`.
+        The recipient answers with the ids of the objects it registered.
+
+        :Parameters:
+
+        * **objs (list of objects)** the python objects to be sent
+
+        * **recipient (** :class:`VirtualWorker` **)** the worker object to send the message to.
+
+        * **delete_local (bool, optional)** when set to true, it deletes the objects
+          from the local registry.
+
+        * **keep_base (bool, optional)** see :func:`prepare_send_objects`.
+        """
+        return self.send_msg(message=self.prepare_send_objects(objs, delete_local, keep_base),
+                             message_type='objs',
+                             recipient=recipient)
+
+    def receive_objs(self, message):
+        """receive_objs(self, message) -> list of objects
+        Reverses :func:`prepare_send_objects`: deserializes and registers every
+        object of the message (see :func:`receive_obj`).
+
+        :Parameters:
+
+        * **message(binary or JSON string)** the message encoding the objects.
+        """
+        header, segments = self._load_multipart(message)
+        obj_messages = header['objects'] if segments is None else segments
+        objs = [self.receive_obj(obj_message) for obj_message in obj_messages]
+        for obj in objs:
+            if header.get('keep_base'):
+                self._update_bases[obj.id] = obj.data.clone()
+            else:
+                # the compression error of a previous round no longer applies
+                self._update_residuals.pop(obj.id, None)
+        return objs
+
+    @staticmethod
+    def _load_multipart(message):
+        """Returns the header and the segments of a binary blob, or the decoded
+        JSON object and None for a JSON message."""
+        if(utils.is_blob(message)):
+            return utils.unpack_blob(message)
+        if isinstance(message, (bytes, bytearray, memoryview)):
+            message = str(message, 'utf-8')
+        return json.loads(message), None
+
+    def prepare_send_deltas(self, obj_ids, compression=None, error_feedback=True, **options):
+        """prepare_send_deltas(self, obj_ids, compression=None, error_feedback=True) -> binary
+        Serializes the change of the data of several objects since they were received
+        with keep_base set (see :func:`prepare_send_objects`), optionally compressed
+        (see :mod:`.compression`), and deletes the objects.
+
+        With error feedback, the compression error of an object is added to its next
+        change, so that it isn't lost but only delayed. It is kept under the id of the
+        object, which stays the same from one round to the next when a model is sent
+        and fetched back, until the object is sent again without keep_base or deleted.
+
+        :Parameters:
+
+        * **obj_ids (list of str or int)** the ids of the objects
+
+        * **compression (str, optional)** one of :data:`compression.COMPRESSIONS`, or
+          None to send the change as is.
+
+        * **error_feedback (bool, optional)** whether to carry the compression error
+          over to the next change.
+
+        * **options** the options of the compression (topk_ratio, bits)
+        """
+        header, segments, tensors = [], [], []
+        for obj_id in obj_ids:
+            obj = self.get_obj(obj_id)
+            delta = obj.data - self._update_bases.pop(obj_id)
+            feedback = error_feedback and compression is not None
+            residual = self._update_residuals.get(obj_id)
+            if feedback and residual is not None:
+                delta += residual
+            meta, parts = compression_.compress(delta, compression, **options)
+            self._rm_obj_tree(obj)
+            if feedback:
+                self._update_residuals[obj_id] = delta - compression_.decompress(meta, parts)
+
+            meta['parts'] = []
+            for part in parts:
+                part = part.contiguous()
+                part_meta = {'torch_type': part.type(), 'shape': list(part.size())}
+                if self.use_json:
+                    part_meta['data'] = part.tolist()
+                else:
+                    part_meta['data'] = len(segments)
+                    # keep a reference to the part until it is packed
+                    tensors.append(part)
+                    segments.append(self.hook._tensor_buffer(part))
+                meta['parts'].append(part_meta)
+            header.append(meta)
+
+        if self.use_json:
+            return json.dumps({'deltas': header}) + "\n"
+        return utils.pack_blob({'deltas': header}, segments)
+
+    def receive_deltas(self, message):
+        """receive_deltas(self, message) -> list of tensors
+        Reverses :func:`prepare_send_deltas`: returns the (decompressed) changes.
+
+        :Parameters:
+
+        * **message(binary or JSON string)** the message encoding the changes.
+        """
+        header, segments = self._load_multipart(message)
+        deltas = []
+        for meta in header['deltas']:
+            parts = []
+            for part_meta in meta['parts']:
+                tensor_type = self.hook.guard.types_guard(part_meta['torch_type'])
+                if segments is None:
+                    data = self.hook.guard.tensor_contents_guard(part_meta['data'])
+                    parts.append(tensor_type(data).view(*part_meta['shape']))
+                else:
+                    parts.append(self.hook._build_tensor_from_buffer(
+                        tensor_type, part_meta, segments[part_meta['data']]))
+            deltas.append(compression_.decompress(meta, parts))
+        return deltas
+
     def send_torch_command(self, recipient, message):
         """send_torch_command(self, recipient, message, response_handler, timeout=10) -> object
 
@@ -897,6 +1618,22 @@ class BaseWorker(ABC):
         response = self.process_response(response)
         return response
 
+    async def async_send_torch_command(self, recipient, message):
+        """async_send_torch_command(self, recipient, message) -> object
+
+        Coroutine version of :func:`send_torch_command`: awaiting it sends the command
+        and gives the processed response without blocking the other commands in flight.
+
+        :Parameters:
+
+        * **recipient (** :class:`VirtualWorker` **)** the worker being sent a message.
+
+        * **message (string)** the message being sent
+        """
+        response = await self.async_send_msg(
+            message=message, message_type='torch_cmd', recipient=recipient)
+        return self.process_response(response)
+
     def request_obj(self, obj_id, recipient):
         """request_obj(self, obj_id, sender)
         This method requests that another VirtualWorker send an object to the local one.
@@ -932,6 +1669,308 @@ class BaseWorker(ABC):
 
         return obj, self._clear_tmp_objects
 
+    async def async_request_obj(self, obj_id, recipient):
+        """async_request_obj(self, obj_id, recipient)
+        Coroutine version of :func:`request_obj`, so that objects can be requested
+        from several workers concurrently.
+
+        :Parameters:
+
+        * **obj_id (str or int)** the id of the object being requested
+
+        * **recipient (** :class:`VirtualWorker` **)** the worker who currently has the
+          object who is being requested to send it.
+        """
+
+        # resolves IDs to worker objects
+        recipient = self.get_worker(recipient)
+
+        obj_msg = await self.async_send_msg(
+            message=obj_id, message_type='req_obj', recipient=recipient)
+        obj = self.receive_obj(obj_msg)
+
+        return obj, self._clear_tmp_objects
+
+    def request_objs(self, obj_ids, recipient):
+        """request_objs(self, obj_ids, recipient)
+        Requests several objects from another worker in a single message (see
+        :func:`request_obj`). Returns the objects, in the order of obj_ids, and the
+        method cleaning up the temporary registry.
+
+        :Parameters:
+
+        * **obj_ids (list of str or int)** the ids of the objects being requested
+
+        * **recipient (** :class:`VirtualWorker` **)** the worker who currently has the
+          objects.
+        """
+        recipient = self.get_worker(recipient)
+
+        objs_msg = self.send_msg(
+            message=list(obj_ids), message_type='req_objs', recipient=recipient)
+        objs = self.receive_objs(objs_msg)
+
+        return objs, self._clear_tmp_objects
+
+    def request_obj_reduced(self, obj_id, recipients, reduce='mean', max_in_flight=4):
+        """request_obj_reduced(self, obj_id, recipients, reduce='mean', max_in_flight=4)
+        Requests the copies of an object held by several workers (e.g. a tensor sent
+        to all of them) and reduces them into one tensor or Variable, which is
+        returned. The copies are requested concurrently, at most max_in_flight at
+        the same time, and each copy is folded into the result as soon as it is
+        received, so that they are never all held in memory at once. Only the
+        result is registered, under the id of the object: the other copies are
+        deserialized without being registered.
+
+        The requests are sent from a thread pool, and the copies are received
+        and folded by the calling thread. The registries the requests go
+        through (see :class:`.store.ObjectStore`), the id allocators and the
+        message queues and pending deletes (see :func:`queue_msg`) are safe
+        to use from several threads.
+
+        :Parameters:
+
+        * **obj_id (str or int)** the id of the object being requested
+
+        * **recipients (list of** :class:`VirtualWorker` **)** the workers who hold
+          a copy of the object.
+
+        * **reduce (str or function, optional)** 'sum', 'mean' or a function
+          reduce(result, tensor) returning the partial result with tensor folded in
+          (it may modify result in place). The data and grads of Variables are
+          reduced separately.
+
+        * **max_in_flight (int, optional)** the most copies requested at the same time.
+        """
+        if reduce in ('sum', 'mean'):
+            fold = self._add_inplace
+        elif callable(reduce):
+            fold = reduce
+        else:
+            raise ValueError('Unknown reduction', reduce)
+
+        recipients = [self.get_worker(recipient) for recipient in recipients]
+        waiting = list(reversed(recipients))
+
+        def request(recipient):
+            return self.send_msg(message=obj_id, message_type='req_obj', recipient=recipient)
+
+        result = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            pending = set()
+            while waiting or pending:
+                while waiting and len(pending) < max_in_flight:
+                    pending.add(executor.submit(request, waiting.pop()))
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    if result is None:
+                        result = self.receive_obj(future.result())
+                        continue
+                    obj, _ = self._load_obj(future.result(), register=False)
+                    result = self._fold(fold, result, obj)
+                    del obj
+
+        if reduce == 'mean':
+            result = self._fold(lambda x, _: x.div_(len(recipients)), result, result)
+        return result
+
+    @staticmethod
+    def _add_inplace(result, tensor):
+        return result.add_(tensor)
+
+    @staticmethod
+    def _fold(fold, result, obj):
+        """Folds the tensor or Variable obj into result. The grad of a Variable
+        is dropped unless every copy has one. The data and grad of obj are read
+        without registering them (see :func:`request_obj_reduced`)."""
+        if not isinstance(result, torch.autograd.Variable):
+            return fold(result, obj)
+        result.data = fold(result.data, obj.old_data)
+        if result.grad is not None:
+            if obj.old_grad is None:
+                result.grad = None
+            else:
+                result.grad.data = fold(result.grad.data, obj.old_grad.old_data)
+        return result
+
+    def forward_obj(self, obj_id, sender, recipient):
+        """forward_obj(self, obj_id, sender, recipient)
+        Has sender send the object it holds under obj_id to recipient directly,
+        without the object going through this worker, and delete it. Sender must
+        know recipient (see :func:`add_worker`).
+
+        :Parameters:
+
+        * **obj_id (str or int)** the id of the object being moved
+
+        * **sender (** :class:`VirtualWorker` **)** the worker who holds the object.
+
+        * **recipient (** :class:`VirtualWorker` **or id)** the worker the object is
+          moved to.
+        """
+        return self.send_msg(message={'id': obj_id, 'to': self._recipient_id(recipient)},
+                             message_type='fwd_obj',
+                             recipient=self.get_worker(sender))
+
+    def all_reduce(self, obj_id, workers, reduce='sum', algorithm='ring'):
+        """all_reduce(self, obj_id, workers, reduce='sum', algorithm='ring')
+        Reduces the copies of a tensor (or of the data of a Variable) held by several
+        workers under the same id (e.g. a tensor sent to all of them), so that each
+        worker ends up holding the reduction. The workers send the tensor to each
+        other directly: this worker only tells them what to send and when, so that
+        the data doesn't all go through it. Each worker must know the next ones
+        (see :func:`add_worker`), and their copies must be contiguous.
+
+        With the 'ring' algorithm, each worker sends 2 * (n - 1) / n times the size
+        of the tensor in 2 * (n - 1) steps, to the next worker in the ring. With the
+        'tree' algorithm, the copies are summed up a binary tree and the result
+        sent back down, in 2 * log2(n) steps of whole tensors. The messages of a step
+        are sent concurrently, from a thread pool: a worker may then process the chunk
+        it receives while sending its own, both going through its registry, which is
+        safe to use from several threads (see :func:`request_obj_reduced`). The
+        chunks a worker sends and receives in a step never overlap.
+
+        :Parameters:
+
+        * **obj_id (str or int)** the id of the copies
+
+        * **workers (list of** :class:`VirtualWorker` **)** the workers who hold a copy.
+
+        * **reduce (str, optional)** 'sum' or 'mean'
+
+        * **algorithm (str, optional)** 'ring' or 'tree'
+        """
+        if reduce not in ('sum', 'mean'):
+            raise ValueError('Unknown reduction', reduce)
+        if algorithm == 'ring':
+            steps = self._ring_all_reduce_steps(len(workers))
+        elif algorithm == 'tree':
+            steps = self._tree_all_reduce_steps(len(workers))
+        else:
+            raise ValueError('Unknown all-reduce algorithm', algorithm)
+
+        workers = [self.get_worker(worker) for worker in workers]
+        scale = 1.0 / len(workers) if reduce == 'mean' else None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(workers))) as executor:
+            for step in steps:
+                futures = []
+                for sender, recipient, index, chunks, op, last in step:
+                    message = {'id': obj_id, 'to': self._recipient_id(workers[recipient]),
+                               'index': index, 'chunks': chunks, 'op': op,
+                               'scale': scale if last else None}
+                    futures.append(executor.submit(self.send_msg, message, 'fwd_chunk',
+                                                   workers[sender]))
+                for future in futures:
+                    future.result()
+
+    @staticmethod
+    def _ring_all_reduce_steps(n):
+        """The steps of a ring all-reduce between n workers: lists of (sender,
+        recipient, chunk index, number of chunks, op, last reduction). In the
+        first n - 1 steps (reduce-scatter), every worker adds the chunk it
+        receives to its own, so that worker i ends up with the reduction of chunk
+        i + 1. In the last n - 1 steps, these chunks are passed around the ring."""
+        steps = []
+        for step in range(n - 1):
+            steps.append([(i, (i + 1) % n, (i - step) % n, n, 'add', step == n - 2)
+                          for i in range(n)])
+        for step in range(n - 1):
+            steps.append([(i, (i + 1) % n, (i + 1 - step) % n, n, 'copy', False)
+                          for i in range(n)])
+        return steps
+
+    @staticmethod
+    def _tree_all_reduce_steps(n):
+        """The steps of a tree all-reduce between n workers (see
+        :func:`_ring_all_reduce_steps`): whole tensors are added up a binary tree
+        rooted at worker 0, then copied back down."""
+        up = []
+        stride = 1
+        while stride < n:
+            up.append([(i + stride, i, 0, 1, 'add', False)
+                       for i in range(0, n, 2 * stride) if i + stride < n])
+            stride *= 2
+        if up:
+            # the root receives the last partial reduction in the last step
+            up[-1] = [step[:5] + (True,) for step in up[-1]]
+        down = [[(recipient, sender, 0, 1, 'copy', False)
+                 for sender, recipient, _, _, _, _ in step] for step in reversed(up)]
+        return up + down
+
+    def send_chunk(self, id, to, index, chunks, op='copy', scale=None):
+        """send_chunk(self, id, to, index, chunks, op='copy', scale=None)
+        Sends the index-th of chunks (nearly) equal slices of the tensor held under
+        id (flattened, or the data of a Variable) to the worker to, who copies or adds
+        it to the same slice of its own copy (see :func:`receive_chunk`).
+
+        :Parameters:
+
+        * **id (str or int)** the id of the tensor (held by both workers)
+
+        * **to (** :class:`VirtualWorker` **or id)** the recipient
+
+        * **index (int)** the index of the chunk
+
+        * **chunks (int)** the number of chunks the tensor is divided into
+
+        * **op (str, optional)** 'copy' or 'add'
+
+        * **scale (float, optional)** if set, the recipient multiplies its slice by
+          scale after adding or copying the chunk.
+        """
+        flat = self._tensor_data(self.get_obj(id)).view(-1)
+        start = flat.numel() * index // chunks
+        stop = flat.numel() * (index + 1) // chunks
+        if stop == start:
+            return json.dumps(0) + "\n"
+
+        part = flat.narrow(0, start, stop - start)
+        header = {'id': id, 'start': start, 'op': op, 'scale': scale,
+                  'torch_type': part.type(), 'shape': [stop - start]}
+        if self.use_json:
+            header['data'] = part.tolist()
+            message = header
+        else:
+            message = utils.pack_blob(header, [self.hook._tensor_buffer(part)])
+        return self.send_msg(message=message, message_type='chunk',
+                             recipient=self.get_worker(to))
+
+    def receive_chunk(self, message):
+        """receive_chunk(self, message)
+        Reverses :func:`send_chunk`: copies or adds the chunk to the tensor it is a
+        slice of.
+
+        :Parameters:
+
+        * **message(binary or dict)** the chunk and where it goes
+        """
+        if isinstance(message, dict):
+            header, segments = message, None
+        else:
+            header, segments = utils.unpack_blob(message)
+        tensor_type = self.hook.guard.types_guard(header['torch_type'])
+        if segments is None:
+            chunk = tensor_type(self.hook.guard.tensor_contents_guard(header['data']))
+        else:
+            chunk = self.hook._build_tensor_from_buffer(tensor_type, header, segments[0])
+
+        flat = self._tensor_data(self.get_obj(header['id'])).view(-1)
+        part = flat.narrow(0, header['start'], chunk.numel())
+        if header['op'] == 'add':
+            part.add_(chunk)
+        else:
+            part.copy_(chunk)
+        if header['scale'] is not None:
+            part.mul_(header['scale'])
+        return json.dumps(chunk.numel()) + "\n"
+
+    @staticmethod
+    def _tensor_data(obj):
+        if isinstance(obj, torch.autograd.Variable):
+            return obj.data
+        return obj
+
     # Helpers for HookService and TorchService
     @classmethod
     def _check_workers(cls, torch_obj, workers):
@@ -947,15 +1986,6 @@ class BaseWorker(ABC):
         return workers
 
     # Worker needs to retrieve tensor by ID before computing with it
-    def _retrieve_tensor(self, obj):
-        """
-            Small trick to leverage the work made by the PythonEncoder:
-            recursively inspect an object and return all Tensors/Variable/etc.
-        """
-        encoder = utils.PythonEncoder(retrieve_tensorvar=True)
-        _, tensorvars = encoder.encode(obj)
-        return tensorvars
-
     @classmethod
     def _command_guard(cls, command, allowed):
         if command not in allowed:
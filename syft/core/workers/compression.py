@@ -0,0 +1,62 @@
+"""Lossy compression of the updates of model parameters, sent by workers when a
+client gets only the change of a model (see :func:`BaseWorker.prepare_send_deltas`)."""
+
+# The compression methods, and their options:
+# - 'float16': casts the update to half precision.
+# - 'topk': only keeps the topk_ratio fraction of the entries of largest
+#   magnitude (at least one), sent as int32 indices and float values.
+# - 'quantize': quantizes the update uniformly between its minimum and its
+#   maximum, on bits bits (at most 8, each value takes one byte).
+COMPRESSIONS = ('float16', 'topk', 'quantize')
+
+
+def compress(delta, compression=None, topk_ratio=0.01, bits=8):
+    """Compresses the update delta (a tensor). Returns a JSON-able dict of
+    metadata and the list of the tensors holding the compressed update."""
+    meta = {'compression': compression, 'shape': list(delta.size())}
+    if compression is None:
+        return meta, [delta]
+
+    if compression == 'float16':
+        return meta, [delta.half()]
+
+    flat = delta.contiguous().view(-1)
+    if compression == 'topk':
+        k = max(1, int(topk_ratio * flat.numel()))
+        _, indices = flat.abs().topk(k)
+        return meta, [indices.int(), flat.index_select(0, indices)]
+
+    if compression == 'quantize':
+        if not 0 < bits <= 8:
+            raise ValueError('Can only quantize updates on 1 to 8 bits', bits)
+        low, high = float(flat.min()), float(flat.max())
+        scale = (high - low) / (2 ** bits - 1) or 1.0
+        meta['low'], meta['scale'] = low, scale
+        return meta, [((flat - low) / scale).round().byte()]
+
+    raise ValueError('Unknown compression', compression)
+
+
+def decompress(meta, tensors):
+    """Reverses :func:`compress`: returns the (float) update."""
+    compression = meta['compression']
+    shape = meta['shape']
+    if compression is None:
+        return tensors[0].view(*shape)
+
+    if compression == 'float16':
+        return tensors[0].float().view(*shape)
+
+    if compression == 'topk':
+        indices, values = tensors
+        numel = 1
+        for size in shape:
+            numel *= size
+        flat = values.new(numel).zero_()
+        flat.index_copy_(0, indices.long(), values)
+        return flat.view(*shape)
+
+    if compression == 'quantize':
+        return (tensors[0].float() * meta['scale'] + meta['low']).view(*shape)
+
+    raise ValueError('Unknown compression', compression)
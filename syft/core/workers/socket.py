@@ -1,6 +1,8 @@
 import socket
+import struct
 import json
 
+from .. import utils
 from .base import BaseWorker
 
 
@@ -41,6 +43,25 @@ class SocketWorker(BaseWorker):
 
     * **verbose (bool, optional)** A flag for whether or not to print events to stdout.
 
+    * **use_json (bool, optional)** If set to True, objects are serialized to JSON
+      instead of the binary wire format (slow, intended for debugging).
+
+    * **queue_size (int, optional)** The number of queued messages (see
+      :func:`BaseWorker.queue_msg`) sent at once as a composite message.
+
+    * **queue_timeout (float, optional)** If set, queued messages are sent
+      queue_timeout seconds after the oldest of them was queued.
+
+    * **memory_budget (int, optional)** If set, the number of bytes of tensor data
+      the worker aims to hold in memory (see :class:`.store.ObjectStore`).
+
+    * **spill_dir (string, optional)** The directory in which cold tensors are
+      spilled to memory-mapped files once memory_budget is exceeded.
+
+    Every message sent over the socket is framed by an 8 byte big-endian length
+    prefix, so payloads may contain arbitrary bytes (including newlines) and are
+    read straight into a preallocated buffer.
+
     :Example Server:
 
     >>> from syft.core.hooks import TorchHook
@@ -85,11 +106,15 @@ class SocketWorker(BaseWorker):
 
     def __init__(self,  hook=None, hostname='localhost', port=8110, max_connections=5,
                  id=0, is_client_worker=True, objects={}, tmp_objects={},
-                 known_workers={}, verbose=True, is_pointer=False, queue_size=0):
+                 known_workers={}, verbose=True, is_pointer=False, queue_size=0,
+                 use_json=False, queue_timeout=None,
+                 memory_budget=None, spill_dir=None):
 
         super().__init__(hook=hook, id=id, is_client_worker=is_client_worker,
                          objects=objects, tmp_objects=tmp_objects,
-                         known_workers=known_workers, verbose=verbose, queue_size=queue_size)
+                         known_workers=known_workers, verbose=verbose, queue_size=queue_size,
+                         use_json=use_json, queue_timeout=queue_timeout,
+                         memory_budget=memory_budget, spill_dir=spill_dir)
 
         self.hostname = hostname
         self.port = port
@@ -104,6 +129,7 @@ class SocketWorker(BaseWorker):
 
             clientsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             clientsocket.connect((self.hostname, self.port))
+            clientsocket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self.clientsocket = clientsocket
 
         else:
@@ -137,18 +163,20 @@ class SocketWorker(BaseWorker):
 
             # blocking until a message is received
             connection, address = self.serversocket.accept()
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             try:
                 while num_messages != 0:
-                    # collapse buffer of messages into a string
-                    message = self._process_buffer(connection)
+                    # read the next length-prefixed message
+                    message = self._recv_frame(connection)
+                    if message is None:
+                        # the client closed the connection
+                        break
 
                     # process message and generate response
-                    response = self.receive_msg(message, False)
+                    response = self.receive_msg(message)
 
-                    if(response[-1] != "\n"):
-                        response += "\n"
                     # send response back
-                    connection.send(response.encode())
+                    self._send_frame(connection, response)
 
                     if(self.verbose):
                         print("Received Command From:", address)
@@ -172,28 +200,62 @@ class SocketWorker(BaseWorker):
           local development with :class:`VirtualWorker` workers.
         """
 
-        recipient.clientsocket.send(message_wrapper_json_binary)
+        self._send_frame(recipient.clientsocket, message_wrapper_json_binary)
 
-        response = self._process_buffer(recipient.clientsocket)
+        response = self._recv_frame(recipient.clientsocket)
 
+        # binary objects are handed over as is, JSON responses as strings
+        if(not utils.is_blob(response)):
+            response = response.decode('utf-8')
         return response
 
+    # Length prefix preceding every message sent over a socket
+    frame_header = struct.Struct('!Q')
+
+    # Messages up to this size are sent with their length prefix in a single
+    # call; larger ones are sent separately to avoid copying the payload
+    frame_coalesce_size = 1 << 16
+
     @classmethod
-    def _process_buffer(cls, socket, buffer_size=1024, delimiter="\n"):
-        # WARNING: will hang if buffer doesn't finish with newline
+    def _send_frame(cls, sock, message):
+        """Sends a message (string or bytes-like object) prefixed by its length"""
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        length = memoryview(message).nbytes
+        header = cls.frame_header.pack(length)
+        if length <= cls.frame_coalesce_size:
+            sock.sendall(header + message)
+        else:
+            sock.sendall(header)
+            sock.sendall(message)
 
-        buffer = socket.recv(buffer_size).decode('utf-8')
-        buffering = True
-        while buffering:
+    @classmethod
+    def _recv_frame(cls, sock):
+        """Receives a length-prefixed message into a preallocated bytearray.
+        Returns None if the connection was closed before a new message started.
+        """
+        header = cls._recv_exactly(sock, cls.frame_header.size)
+        if header is None:
+            return None
+        (length,) = cls.frame_header.unpack(header)
+        message = cls._recv_exactly(sock, length)
+        if message is None:
+            raise ConnectionError("Socket closed in the middle of a message")
+        return message
 
-            if delimiter in buffer:
-                (line, buffer) = buffer.split(delimiter, 1)
-                return line + delimiter
-            else:
-                more = socket.recv(buffer_size).decode('utf-8')
-                if not more:
-                    buffering = False
-                else:
-                    buffer += more
-        if buffer:
-            return buffer
+    @classmethod
+    def _recv_exactly(cls, sock, nbytes):
+        """Reads exactly nbytes from sock with recv_into, without intermediate
+        copies. Returns None if the connection is closed before any byte arrives.
+        """
+        buffer = bytearray(nbytes)
+        view = memoryview(buffer)
+        received = 0
+        while received < nbytes:
+            n = sock.recv_into(view[received:])
+            if n == 0:
+                if received == 0:
+                    return None
+                raise ConnectionError("Socket closed in the middle of a message")
+            received += n
+        return buffer
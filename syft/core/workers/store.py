@@ -0,0 +1,218 @@
+"""The registry in which workers store the objects they hold."""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import torch
+
+
+class ObjectStore(OrderedDict):
+    r"""
+    The permanent registry of a worker (BaseWorker._objects), mapping object
+    ids to objects. It keeps track of the memory held by the tensors it
+    stores and, when a memory budget is set, frees memory whenever storing
+    an object pushes the memory held over the budget. Objects are visited
+    from the least recently stored or retrieved one, and:
+
+    - intermediates (the results of commands, see
+      :func:`BaseWorker.compile_result`) which were released (see
+      :func:`release`) and are referenced by nothing but the store are
+      evicted,
+    - if spill_dir is set, other tensors are spilled: their storage is moved
+      to a memory-mapped file in spill_dir, so that the OS can page it out.
+      Spilled tensors stay in the store and can be used as before.
+
+    The store can't tell whether other workers still point to an object:
+    pointers are objects of other processes (or workers), which don't show
+    in its reference counts. Objects are only evicted once released, and
+    objects no longer pointed to at all are deleted by their owner when it
+    is told so (see :func:`BaseWorker._track_pointer`). The budget is
+    therefore a soft limit. Memory is counted per storage, so that views and
+    the data of Variables aren't counted twice.
+
+    Storing, retrieving and removing objects are atomic, so that a worker
+    may use its registry from several threads (e.g. while processing the
+    responses of concurrent messages, see
+    :func:`BaseWorker.request_obj_reduced`).
+
+    :Parameters:
+
+    * **memory_budget (int, optional)** the number of bytes of tensor
+      storage the store aims to hold in memory. If None, nothing is ever
+      evicted nor spilled.
+
+    * **spill_dir (string, optional)** the directory of the files cold
+      tensors are spilled to. If None, tensors are never spilled.
+    """
+
+    # References to an object held while _evictable looks at it: the store,
+    # the local variable and the argument of sys.getrefcount
+    _store_refcount = 3
+
+    def __init__(self, memory_budget=None, spill_dir=None):
+        super().__init__()
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+
+        self.nbytes = 0
+        self.evictions = 0
+        # the storage of each object, and for each storage (by data_ptr) its
+        # size, the objects using it and whether it was spilled
+        self._storage_of = {}
+        self._storages = {}
+        self._intermediates = set()
+        self._released = set()
+        # held while the store and its bookkeeping are updated
+        self._lock = threading.RLock()
+
+    def __getitem__(self, key):
+        with self._lock:
+            obj = super().__getitem__(key)
+            self.move_to_end(key)
+            return obj
+
+    def __setitem__(self, key, obj):
+        with self._lock:
+            if key in self:
+                self._forget(key)
+            super().__setitem__(key, obj)
+            self._count(key, obj)
+            if self.memory_budget is not None and self.nbytes > self.memory_budget:
+                self.free_memory()
+
+    def __delitem__(self, key):
+        with self._lock:
+            super().__delitem__(key)
+            self._forget(key)
+
+    def discard(self, key):
+        """Removes the object stored under key, if any."""
+        with self._lock:
+            if key in self:
+                del self[key]
+
+    def clear(self):
+        with self._lock:
+            for key in list(self.keys()):
+                del self[key]
+
+    def mark_intermediate(self, key):
+        """Marks the object stored under key as an intermediate result, which
+        may be evicted once released."""
+        with self._lock:
+            if key in self:
+                self._intermediates.add(key)
+
+    def release(self, key):
+        """Marks the object stored under key as no longer needed by the
+        workers pointing to it: if it is an intermediate result, it may be
+        evicted whenever the store is the only one referencing it."""
+        with self._lock:
+            if key in self:
+                self._released.add(key)
+
+    def stats(self):
+        """Returns the number of objects stored, the bytes of tensor storage
+        held in memory, the number of objects evicted and the number and
+        bytes of storages spilled to disk."""
+        with self._lock:
+            spilled = [nbytes for nbytes, _, mapped in self._storages.values() if mapped]
+            return dict(objects=len(self), bytes=self.nbytes, evictions=self.evictions,
+                        spilled=len(spilled), spilled_bytes=sum(spilled))
+
+    def free_memory(self):
+        """Evicts and spills objects, from the least recently used one, until
+        the memory held is within the budget or nothing more can be freed."""
+        with self._lock:
+            for key in list(self.keys()):
+                if self.nbytes <= self.memory_budget:
+                    break
+                if key in self._intermediates and key in self._released and \
+                        self._evictable(key):
+                    del self[key]
+                    self.evictions += 1
+                elif self.spill_dir is not None and key in self._storage_of:
+                    self.spill(key)
+
+    def spill(self, key):
+        """Moves the storage of the tensor (or of the data of the Variable)
+        stored under key to a memory-mapped file in spill_dir. The objects
+        sharing the storage through the same tensor are spilled with it."""
+        with self._lock:
+            self._spill(key)
+
+    def _spill(self, key):
+        data_ptr = self._storage_of.get(key)
+        if data_ptr is None or self._storages[data_ptr][2]:
+            return
+        tensor = _data(OrderedDict.__getitem__(self, key))
+        storage = tensor.storage()
+        filename = os.path.join(self.spill_dir, '{}.{}'.format(key, type(storage).__name__))
+        mapped = type(storage).from_file(filename, True, storage.size())
+        mapped.copy_(storage)
+        tensor.set_(mapped, tensor.storage_offset(), tensor.size(), tensor.stride())
+        try:
+            # the mapping outlives the file, which is removed along with it
+            os.remove(filename)
+        except OSError:
+            pass
+
+        for other in list(self._storages[data_ptr][1]):
+            obj = OrderedDict.__getitem__(self, other)
+            if _data(obj) is tensor:
+                self._uncount(other)
+                self._count(other, obj, mapped=True)
+
+    def _evictable(self, key):
+        # (only references local to this process count)
+        obj = OrderedDict.__getitem__(self, key)
+        # (register_object may have set obj.data_backup to obj itself)
+        self_refs = getattr(obj, 'data_backup', None) is obj
+        return sys.getrefcount(obj) <= self._store_refcount + self_refs
+
+    def _count(self, key, obj, mapped=False):
+        tensor = _data(obj)
+        if tensor is None:
+            return
+        storage = tensor.storage()
+        if storage is None:
+            return
+        data_ptr = storage.data_ptr()
+        self._storage_of[key] = data_ptr
+        if data_ptr not in self._storages:
+            nbytes = storage.size() * storage.element_size()
+            self._storages[data_ptr] = [nbytes, set(), mapped]
+            if not mapped:
+                self.nbytes += nbytes
+        self._storages[data_ptr][1].add(key)
+
+    def _uncount(self, key):
+        data_ptr = self._storage_of.pop(key, None)
+        if data_ptr is None:
+            return
+        nbytes, keys, mapped = self._storages[data_ptr]
+        keys.discard(key)
+        if not keys:
+            del self._storages[data_ptr]
+            if not mapped:
+                self.nbytes -= nbytes
+
+    def _forget(self, key):
+        self._uncount(key)
+        self._intermediates.discard(key)
+        self._released.discard(key)
+
+
+def _data(obj):
+    """Returns the tensor holding the data of a tensor or Variable, or None
+    for other objects and pointers (which hold no data)."""
+    if getattr(obj, 'is_pointer', False):
+        return None
+    if isinstance(obj, torch.autograd.Variable):
+        # the data of a registered Variable, without reading Variable.data,
+        # which would register it
+        obj = getattr(obj, 'data_backup', None)
+    if not torch.is_tensor(obj):
+        return None
+    return obj
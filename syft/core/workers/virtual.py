@@ -40,6 +40,21 @@ class VirtualWorker(BaseWorker):
 
     * **verbose (bool, optional)** A flag for whether or not to print events to stdout.
 
+    * **use_json (bool, optional)** If set to True, objects are serialized to JSON
+      instead of the binary wire format (slow, intended for debugging).
+
+    * **queue_size (int, optional)** The number of queued messages (see
+      :func:`BaseWorker.queue_msg`) sent at once as a composite message.
+
+    * **queue_timeout (float, optional)** If set, queued messages are sent
+      queue_timeout seconds after the oldest of them was queued.
+
+    * **memory_budget (int, optional)** If set, the number of bytes of tensor data
+      the worker aims to hold in memory (see :class:`.store.ObjectStore`).
+
+    * **spill_dir (string, optional)** The directory in which cold tensors are
+      spilled to memory-mapped files once memory_budget is exceeded.
+
     :Example:
 
     >>> from syft.core.hooks import TorchHook
@@ -73,11 +88,15 @@ class VirtualWorker(BaseWorker):
     """
 
     def __init__(self,  hook, id=0, is_client_worker=False, objects={},
-                 tmp_objects={}, known_workers={}, verbose=False, queue_size=0):
+                 tmp_objects={}, known_workers={}, verbose=False, queue_size=0,
+                 use_json=False, queue_timeout=None,
+                 memory_budget=None, spill_dir=None):
 
         super().__init__(hook=hook, id=id, is_client_worker=is_client_worker,
                          objects=objects, tmp_objects=tmp_objects,
-                         known_workers=known_workers, verbose=verbose, queue_size=queue_size)
+                         known_workers=known_workers, verbose=verbose, queue_size=queue_size,
+                         use_json=use_json, queue_timeout=queue_timeout,
+                         memory_budget=memory_budget, spill_dir=spill_dir)
 
     def _send_msg(self, message_wrapper_json_binary, recipient):
         """Sends a string message to another worker with message_type information
@@ -95,3 +114,12 @@ class VirtualWorker(BaseWorker):
         """
 
         return recipient.receive_msg(message_wrapper_json_binary)
+
+    async def _async_send_msg(self, message_wrapper_json_binary, recipient):
+        """Processes the message inline, on the event loop's thread. The
+        recipient runs in this process, so that processing its messages on
+        executor threads would only contend for the interpreter with the
+        event loop, and the responses would still be processed on the event
+        loop's thread. Messages to virtual workers therefore don't overlap."""
+        with self._send_lock_of(recipient):
+            return self._send_msg(message_wrapper_json_binary, recipient)
@@ -1,5 +1,7 @@
 import websockets
 import asyncio
+import itertools
+import struct
 import json
 
 from .. import utils
@@ -42,6 +44,27 @@ class WebSocketWorker(BaseWorker):
 
     * **verbose (bool, optional)** A flag for whether or not to print events to stdout.
 
+    * **persistent (bool, optional)** Only used by pointers (is_pointer=True). If set
+      to True (default), all messages to the remote worker share one long-lived
+      connection and are matched with their responses through request ids, so several
+      commands can be in flight at once. If set to False, a new connection is opened
+      for every message.
+
+    * **use_json (bool, optional)** If set to True, objects are serialized to JSON
+      instead of the binary wire format (slow, intended for debugging).
+
+    * **queue_size (int, optional)** The number of queued messages (see
+      :func:`BaseWorker.queue_msg`) sent at once as a composite message.
+
+    * **queue_timeout (float, optional)** If set, queued messages are sent
+      queue_timeout seconds after the oldest of them was queued.
+
+    * **memory_budget (int, optional)** If set, the number of bytes of tensor data
+      the worker aims to hold in memory (see :class:`.store.ObjectStore`).
+
+    * **spill_dir (string, optional)** The directory in which cold tensors are
+      spilled to memory-mapped files once memory_budget is exceeded.
+
 
     :Example Server:
 
@@ -92,11 +115,15 @@ class WebSocketWorker(BaseWorker):
 
     def __init__(self,  hook=None, hostname='localhost', port=8110, max_connections=5,
                  id=0, is_client_worker=True, objects={}, tmp_objects={},
-                 known_workers={}, verbose=True, is_pointer=False, queue_size=0):
+                 known_workers={}, verbose=True, is_pointer=False, queue_size=0,
+                 use_json=False, persistent=True, queue_timeout=None,
+                 memory_budget=None, spill_dir=None):
 
         super().__init__(hook=hook, id=id, is_client_worker=is_client_worker,
                          objects=objects, tmp_objects=tmp_objects,
-                         known_workers=known_workers, verbose=verbose, queue_size=queue_size)
+                         known_workers=known_workers, verbose=verbose, queue_size=queue_size,
+                         use_json=use_json, queue_timeout=queue_timeout,
+                         memory_budget=memory_budget, spill_dir=spill_dir)
 
         self.is_asyncronous = True
         self.hook = hook
@@ -106,28 +133,42 @@ class WebSocketWorker(BaseWorker):
 
         self.max_connections = max_connections
         self.is_pointer = is_pointer
+        self.persistent = persistent
+
+        # State of the long-lived connection used by pointers in persistent
+        # mode. It is opened lazily by the first message and responses are
+        # matched to the futures of their requests through the request id.
+        self._connection = None
+        self._response_reader = None
+        self._pending_requests = {}
+        self._request_ids = itertools.count()
 
         if (self.is_pointer):
             if (self.verbose):
                 print("Attaching Pointer to WebSocket Worker....")
             self.serversocket = None
-            clientsocket = websockets.client.connect(self.uri)
-            self.clientsocket = clientsocket
 
         else:
             if (self.verbose):
                 print("Starting a Websocket Worker....")
-                if (not is_client_worker or self.is_pointer):
+            if (not is_client_worker or self.is_pointer):
+                if (self.verbose):
                     print("Ready to recieve commands....")
-                    self.serversocket = websockets.serve(self._server_socket_listener,
-                                                            self.hostname, self.port)
+                self.serversocket = websockets.serve(self._server_socket_listener,
+                                                     self.hostname, self.port,
+                                                     max_size=None)
+                if (self.verbose):
                     print('Server Socket has been initialized')
-                    asyncio.get_event_loop().run_until_complete(self.serversocket)
-                    asyncio.get_event_loop().run_forever()
+                asyncio.get_event_loop().run_until_complete(self.serversocket)
+                asyncio.get_event_loop().run_forever()
 
-                else:
-                    print("Ready...")
+            elif (self.verbose):
+                print("Ready...")
 
+    # Persistent connections are opened on this path; every frame sent over
+    # them starts with the request id (packed with request_header).
+    multiplex_path = '/multiplex'
+    request_header = struct.Struct('!Q')
 
     async def _client_socket_connect(self, json_request):
         """
@@ -142,11 +183,79 @@ class WebSocketWorker(BaseWorker):
         """
 
 
-        async with websockets.connect(self.uri) as client_socket:
+        async with websockets.connect(self.uri, max_size=None) as client_socket:
             await client_socket.send(json_request)
             recieved_msg = await client_socket.recv()
             return recieved_msg
 
+    async def _client_socket_request(self, message_wrapper_json_binary):
+        """
+        Sends a message to the remote worker and waits for its response. In
+        persistent mode the message travels over the shared connection, tagged
+        with a fresh request id, so concurrent requests don't wait on each other's
+        connection setup.
+
+        :Parameters:
+
+        * **message_wrapper_json_binary (binary)** the message being sent
+
+        * **out (string or binary)** The response from the server.
+        """
+        if (not self.persistent):
+            return await self._client_socket_connect(message_wrapper_json_binary)
+
+        connection = await self._get_connection()
+        request_id = next(self._request_ids)
+        response = asyncio.get_event_loop().create_future()
+        self._pending_requests[request_id] = response
+        try:
+            await connection.send(self.request_header.pack(request_id) +
+                                  message_wrapper_json_binary)
+        except websockets.exceptions.ConnectionClosed:
+            del self._pending_requests[request_id]
+            raise
+        return await response
+
+    async def _get_connection(self):
+        """Returns the persistent connection to the remote worker, (re)opening it
+        and starting its response reader if needed."""
+        if (self._connection is None or not self._connection.open):
+            self._connection = await websockets.connect(self.uri + self.multiplex_path,
+                                                        max_size=None)
+            self._response_reader = asyncio.ensure_future(
+                self._read_responses(self._connection))
+        return self._connection
+
+    async def _read_responses(self, connection):
+        """Reads the responses arriving on a persistent connection and resolves
+        the futures of the matching requests."""
+        try:
+            while True:
+                frame = await connection.recv()
+                (request_id,) = self.request_header.unpack_from(frame)
+                response = self._pending_requests.pop(request_id, None)
+                if (response is not None and not response.done()):
+                    response.set_result(self._decode_response(
+                        memoryview(frame)[self.request_header.size:]))
+        except websockets.exceptions.ConnectionClosed as e:
+            pending, self._pending_requests = self._pending_requests, {}
+            for response in pending.values():
+                if (not response.done()):
+                    response.set_exception(e)
+
+    @classmethod
+    def _decode_response(cls, response):
+        """Binary objects are returned as is and JSON responses as strings"""
+        if (utils.is_blob(response)):
+            return response
+        return str(response, 'utf-8')
+
+    def close(self):
+        """Closes the persistent connection to the remote worker, if any."""
+        if (self._connection is not None):
+            asyncio.get_event_loop().run_until_complete(self._connection.close())
+            self._connection = None
+
     async def _server_socket_listener(self, websocket, path):
         """
         A listener for the server socket so whenever a message is sent by a client to the
@@ -159,13 +268,38 @@ class WebSocketWorker(BaseWorker):
         * **path** The path which messages are recieved from and sent to.
         """
 
+        if (path == self.multiplex_path):
+            await self._serve_persistent_connection(websocket)
+            return
+
         msg_wrapper_byte = await websocket.recv()
-        msg_wrapper_str = msg_wrapper_byte.decode('utf-8')
         if (self.verbose):
             print("Recieved Command From:", self.uri)
-        decoder = utils.PythonJSONDecoder(self)
-        msg_wrapper = decoder.decode(msg_wrapper_str)
-        await websocket.send(self.process_message_type(msg_wrapper))
+        # receive_msg handles both binary blobs and JSON messages
+        await websocket.send(self.receive_msg(msg_wrapper_byte))
+
+    async def _serve_persistent_connection(self, websocket):
+        """
+        Serves a persistent connection until the client closes it. Messages are
+        processed in the order they arrive and every response is tagged with the
+        request id of its message.
+
+        :Parameters:
+
+        * **websocket** The incoming socket, which messages are recieved from and sent to.
+        """
+        try:
+            while True:
+                frame = await websocket.recv()
+                header = frame[:self.request_header.size]
+                if (self.verbose):
+                    print("Recieved Command From:", self.uri)
+                response = self.receive_msg(memoryview(frame)[self.request_header.size:])
+                if (isinstance(response, str)):
+                    response = response.encode('utf-8')
+                await websocket.send(header + response)
+        except websockets.exceptions.ConnectionClosed:
+            pass
 
     def whoami(self):
         """
@@ -174,50 +308,25 @@ class WebSocketWorker(BaseWorker):
         """
         return json.dumps({"uri": self.uri, "id": self.id})
 
-    async def _send_msg(self, message_wrapper_json_binary, recipient):
-        response = await recipient._client_socket_listener(message_wrapper_json_binary)
+    def _send_msg(self, message_wrapper_json_binary, recipient):
+        """Sends a message to the remote worker and blocks until its response
+        arrives. See :func:`BaseWorker._send_msg`."""
+        response = recipient._client_socket_listener(message_wrapper_json_binary)
         response = self._process_buffer(response=response)
         return response
 
-
-    def send_msg(self, message, message_type, recipient):
-        """Sends a string message to another worker with message_type information
-        indicating how the message should be processed.
-
-        :Parameters:
-
-        * **recipient (** :class:`VirtualWorker` **)** the worker being sent a message.
-
-        * **message (string)** the message being sent
-
-        * **message_type (string)** the type of message being sent. This affects how
-          the message is processed by the recipient. The types of message are described
-          in :func:`receive_msg`.
-
-        * **out (object)** the response from the message being sent. This can be a variety
-          of object types. However, the object is typically only used during testing or
-          local development with :class:`VirtualWorker` workers.
-        """
-        message_wrapper = {}
-        message_wrapper['message'] = message
-        message_wrapper['type'] = message_type
-        self.message_queue.append(message_wrapper)
-        if self.queue_size:
-            if len(self.message_queue) > self.queue_size:
-                message_wrapper = self.compile_composite_message()
-            else:
-                return None
-
-        message_wrapper_json = json.dumps(message_wrapper) + "\n"
-
-        message_wrapper_json_binary = message_wrapper_json.encode()
-
-        self.message_queue = []
-        response = recipient._client_socket_listener(message_wrapper_json_binary)
+    async def _async_send_msg(self, message_wrapper_json_binary, recipient):
+        """Sends a message to the remote worker on the running event loop. With
+        persistent connections, messages to the same or to different workers
+        are all in flight at once."""
+        response = await recipient._client_socket_request(message_wrapper_json_binary)
         response = self._process_buffer(response=response)
         return response
 
     def _process_buffer(cls, response, delimiter="\n"):
+        # binary responses arrive as a single websocket frame
+        if not isinstance(response, str):
+            return response
         buffer = response
         buffering = True
         if delimiter in buffer:
@@ -228,7 +337,7 @@ class WebSocketWorker(BaseWorker):
 
     def _client_socket_listener(cls, message_wrapper_json_binary):
         response = asyncio.get_event_loop().run_until_complete(
-            cls._client_socket_connect(message_wrapper_json_binary))
+            cls._client_socket_request(message_wrapper_json_binary))
         return response
 
 
@@ -0,0 +1,4 @@
+from . import averaging
+from .averaging import FederatedAveraging
+
+__all__ = ['averaging', 'FederatedAveraging']
@@ -0,0 +1,131 @@
+import copy
+import time
+import concurrent.futures
+
+import torch.optim as optim
+
+
+def mse_loss(pred, target):
+    return ((pred - target)**2).sum()
+
+
+class FederatedAveraging(object):
+    r"""
+    Trains a model on data held by several workers with Federated Averaging:
+    each round, a copy of the model is sent to the owner of every dataset and
+    trained there for a few steps, and the model becomes the weighted average
+    of the trained copies.
+
+    The workers train concurrently: the training of each copy is driven by a
+    thread of its own, so that the commands sent to different workers (and
+    their computations) overlap. The threads share the registry, id
+    allocator and message queues of the local worker, which are safe to use
+    from several threads. The trained copies are fetched and averaged one at
+    a time as the workers finish, so that only the running average is held
+    besides the copy being added.
+
+    :Parameters:
+
+    * **model (torch.nn.Module)** the (local) model to train.
+
+    * **datasets (list of (data, target) tuples)** the datasets the model is
+      trained on: pointers to Variables of inputs and targets held by the
+      same worker.
+
+    * **weights (list of float, optional)** the weight of the copy trained on
+      each dataset in the average, e.g. the number of samples of the dataset.
+      If None, copies are averaged with equal weights.
+
+    * **optimizer (function, optional)** the function returning the optimizer
+      of the parameters of a copy. If None, SGD with learning rate lr is used.
+
+    * **loss_fn (function, optional)** the loss of the predictions of the
+      model and the targets. If None, the sum of squared errors is used.
+
+    * **local_steps (int, optional)** the number of optimizer steps taken by
+      each worker per round.
+
+    * **lr (float, optional)** the learning rate of the default optimizer.
+
+    :Example:
+
+    >>> trainer = FederatedAveraging(model, [(data_bob, target_bob),
+    ...                                      (data_alice, target_alice)])
+    >>> for _ in range(10):
+    ...     stats = trainer.round()
+    >>> stats['time'], stats['worker_times'], stats['losses']
+    """
+
+    def __init__(self, model, datasets, weights=None, optimizer=None, loss_fn=None,
+                 local_steps=1, lr=0.1):
+        if weights is not None and len(weights) != len(datasets):
+            raise ValueError('Expected one weight per dataset', len(weights), len(datasets))
+
+        self.model = model
+        self.datasets = list(datasets)
+        self.weights = list(weights) if weights is not None else [1.0] * len(self.datasets)
+        self.optimizer = optimizer or (lambda params: optim.SGD(params, lr=lr))
+        self.loss_fn = loss_fn or mse_loss
+        self.local_steps = local_steps
+
+        # the statistics of every round (see round)
+        self.history = []
+
+    def round(self):
+        """round() -> dict
+        Runs a round of training on every worker and averages the trained
+        copies into the model. Returns the statistics of the round: its wall
+        time ('time'), and per dataset, the id of its worker ('workers'), the
+        time the worker took from the start of the round until its copy was
+        fetched ('worker_times') and the loss of its last step ('losses').
+        """
+        start = time.time()
+        n = len(self.datasets)
+        worker_times, losses = [None] * n, [None] * n
+        average, total_weight = None, 0.0
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, n)) as executor:
+            futures = {executor.submit(self._train_copy, dataset): i
+                       for i, dataset in enumerate(self.datasets)}
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                params, losses[i] = future.result()
+                worker_times[i] = time.time() - start
+
+                weight = self.weights[i]
+                if average is None:
+                    average = [p.data * weight for p in params]
+                else:
+                    for a, p in zip(average, params):
+                        a.add_(weight, p.data)
+                total_weight += weight
+                del params
+
+        if average is not None:
+            for p, a in zip(self.model.parameters(), average):
+                p.data.copy_(a.div_(total_weight))
+
+        stats = {'time': time.time() - start,
+                 'workers': [getattr(data.owners[0], 'id', data.owners[0])
+                             for data, _ in self.datasets],
+                 'worker_times': worker_times,
+                 'losses': losses}
+        self.history.append(stats)
+        return stats
+
+    def _train_copy(self, dataset):
+        """Trains a copy of the model on dataset, on its worker, and returns
+        the parameters of the trained copy and the loss of the last step."""
+        data, target = dataset
+        model = copy.deepcopy(self.model)
+        model.send(data.owners[0])
+        opt = self.optimizer(model.parameters())
+
+        for _ in range(self.local_steps):
+            opt.zero_grad()
+            loss = self.loss_fn(model(data), target)
+            loss.backward()
+            opt.step()
+
+        model.get()
+        return list(model.parameters()), loss.get().data[0]
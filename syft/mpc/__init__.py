@@ -1,5 +1,7 @@
 from . import spdz
+from . import ring
 from . import shared_variable
+from . import triples
 from . import interface
 
-__all__ = ['spdz', 'shared_variable', 'interface']
+__all__ = ['spdz', 'ring', 'shared_variable', 'triples', 'interface']
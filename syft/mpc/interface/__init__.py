@@ -2,8 +2,10 @@ from . import base_interface
 from . import distributed_interface
 from . import grid_client_interface
 from . import grid_worker_interface
+from . import local_interface
 
 s = str(base_interface)
 s += str(distributed_interface)
 s += str(grid_client_interface)
 s += str(grid_worker_interface)
+s += str(local_interface)
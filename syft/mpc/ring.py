@@ -0,0 +1,108 @@
+"""SPDZ over the ring of the integers modulo 2**64.
+
+The protocols of :mod:`spdz`, run with the arithmetic of :class:`Ring`: a
+share is a LongTensor, and the arithmetic of the ring is the native int64
+arithmetic, which wraps around modulo 2**64. No modulo is taken on additions
+and multiplications, and products (in particular the sums of products of
+matmul) can't overflow, they wrap around like the shares. Negative values
+are encoded as themselves, in two's complement.
+
+The shares of both parties must come from this module: they aren't
+compatible with those of :mod:`spdz`. Triple pools used with these
+protocols must be created with engine=RING (see :class:`triples.TriplePool`).
+"""
+import functools
+
+import numpy as np
+import torch
+
+from . import spdz
+
+BASE = spdz.BASE
+
+# the ring is large enough for fractional precision, as long as the
+# encoded values stay far below 2**63 (see Ring.truncate)
+PRECISION_FRACTIONAL = 3
+
+_INT64_MIN = np.iinfo(np.int64).min
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+class Ring(object):
+    r"""
+    The arithmetic of the ring Z_2^64, as an engine of the protocols of
+    :mod:`spdz` (see :class:`spdz.Field`).
+    """
+
+    precision_fractional = PRECISION_FRACTIONAL
+
+    def reduce(self, x):
+        # int64 arithmetic already wraps around modulo 2**64
+        return x
+
+    def random_element(self, shape, prg=None):
+        """Returns a LongTensor of the given shape, uniformly random in the
+        ring, drawn from prg (a numpy RandomState) if given."""
+        prg = np.random if prg is None else prg
+        return torch.from_numpy(prg.randint(_INT64_MIN, _INT64_MAX, size=tuple(shape),
+                                            dtype=np.int64))
+
+    def truncate(self, x, interface, amount):
+        """Divides the shared tensor x by BASE**amount locally: party 0 divides
+        its share, and party 1 the opposite of its share. The result is off by
+        at most 1, unless the shares wrap around between the two divisions,
+        which happens with probability about |x| / 2**63."""
+        if amount == 0:
+            return x
+        if (interface.get_party() == 0):
+            return x / BASE**amount
+        return -((-x) / BASE**amount)
+
+
+RING = Ring()
+
+
+def random_ring_element(shape):
+    """Returns a LongTensor of the given shape, uniformly random in the ring."""
+    return RING.random_element(shape)
+
+
+def encode(rational, precision_fractional=PRECISION_FRACTIONAL):
+    return (rational * BASE**precision_fractional).long()
+
+
+def decode(ring_element, precision_fractional=PRECISION_FRACTIONAL):
+    return ring_element.float() / BASE**precision_fractional
+
+
+def truncate(x, interface, amount=PRECISION_FRACTIONAL):
+    return RING.truncate(x, interface, amount)
+
+
+swap_shares = spdz.swap_shares
+swap_shares_many = spdz.swap_shares_many
+public_add = spdz.public_add
+
+share = functools.partial(spdz.share, engine=RING)
+reconstruct = functools.partial(spdz.reconstruct, engine=RING)
+spdz_add = functools.partial(spdz.spdz_add, engine=RING)
+spdz_neg = functools.partial(spdz.spdz_neg, engine=RING)
+public_mul = functools.partial(spdz.public_mul, engine=RING)
+
+generate_mul_triple = functools.partial(spdz.generate_mul_triple, engine=RING)
+generate_mul_triple_communication = functools.partial(
+    spdz.generate_mul_triple_communication, engine=RING)
+generate_matmul_triple = functools.partial(spdz.generate_matmul_triple, engine=RING)
+generate_matmul_triple_communication = functools.partial(
+    spdz.generate_matmul_triple_communication, engine=RING)
+
+# the fractional precision of these defaults to PRECISION_FRACTIONAL
+spdz_mul = functools.partial(spdz.spdz_mul, engine=RING)
+spdz_mul_many = functools.partial(spdz.spdz_mul_many, engine=RING)
+spdz_matmul = functools.partial(spdz.spdz_matmul, engine=RING)
+spdz_powers = functools.partial(spdz.spdz_powers, engine=RING)
+spdz_poly = functools.partial(spdz.spdz_poly, engine=RING)
+spdz_sigmoid = functools.partial(spdz.spdz_sigmoid, engine=RING)
+spdz_tanh = functools.partial(spdz.spdz_tanh, engine=RING)
+spdz_exp = functools.partial(spdz.spdz_exp, engine=RING)
+spdz_reciprocal = functools.partial(spdz.spdz_reciprocal, engine=RING)
@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 
 BASE = 10
@@ -15,6 +16,46 @@ field = 2**31 - 1  # < 64 bits
 Q_MAXDEGREE = 1
 
 
+class Field(object):
+    r"""
+    The arithmetic of the shares of this module: the integers modulo field.
+
+    The protocols of this module take the arithmetic of their shares as an
+    engine, so that they also run on other rings (see :mod:`ring`). An
+    engine reduces tensors to the canonical representatives of their
+    elements, draws random elements and truncates shared tensors, and
+    gives the default fractional precision of the protocols
+    (precision_fractional=None).
+    """
+
+    precision_fractional = PRECISION_FRACTIONAL
+
+    def reduce(self, x):
+        return x % field
+
+    def random_element(self, shape, prg=None):
+        """Returns a LongTensor of the given shape, uniformly random in the
+        field, drawn from prg (a numpy RandomState) if given."""
+        if prg is None:
+            return torch.LongTensor(torch.Size(shape)).random_(field)
+        return torch.from_numpy(prg.randint(0, field, size=tuple(shape), dtype=np.int64))
+
+    def truncate(self, x, interface, amount):
+        """Divides the shared tensor x, reduced, by BASE**amount locally."""
+        if (interface.get_party() == 0):
+            return (x / BASE ** amount) % field
+        return (field - ((field - x) / BASE ** amount)) % field
+
+
+FIELD = Field()
+
+
+def _precision(precision_fractional, engine):
+    if precision_fractional is None:
+        return engine.precision_fractional
+    return precision_fractional
+
+
 def encode(rational, precision_fractional=PRECISION_FRACTIONAL):
     upscaled = (rational * BASE**precision_fractional).long()
     field_element = upscaled % field
@@ -23,22 +64,23 @@ def encode(rational, precision_fractional=PRECISION_FRACTIONAL):
 
 def decode(field_element, precision_fractional=PRECISION_FRACTIONAL):
     field_element = field_element
-    neg_values = field_element.gt(field)
+    # the elements of the upper half of the field encode negative values
+    neg_values = field_element.gt(field // 2)
     # pos_values = field_element.le(field)
     # upscaled = field_element*(neg_valuese+pos_values)
-    field_element[neg_values] = field-field_element[neg_values]
+    field_element[neg_values] = field_element[neg_values] - field
     rational = field_element.float() / BASE**precision_fractional
     return rational
 
 
-def share(secret):
-    first = torch.LongTensor(secret.shape).random_(field)
-    second = (secret - first) % field
+def share(secret, engine=FIELD):
+    first = engine.random_element(secret.shape)
+    second = engine.reduce(secret - first)
     return [first, second]
 
 
-def reconstruct(shares):
-    return sum(shares) % field
+def reconstruct(shares, engine=FIELD):
+    return engine.reduce(sum(shares))
 
 
 def swap_shares(share, interface):
@@ -52,10 +94,22 @@ def swap_shares(share, interface):
     return share_other
 
 
+def swap_shares_many(shares, interface):
+    """Exchanges several shares with the other party in one message each way
+    (a single round), instead of one round per share as swap_shares. The
+    shares of the other party must have the same shapes."""
+    flat = torch.cat([share.contiguous().view(-1) for share in shares])
+    flat_other = swap_shares(flat, interface)
+    shares_other = []
+    offset = 0
+    for share in shares:
+        shares_other.append(flat_other[offset:offset + share.numel()].view(share.size()))
+        offset += share.numel()
+    return shares_other
+
+
 def truncate(x, interface, amount=PRECISION_FRACTIONAL):
-    if (interface.get_party() == 0):
-        return (x / BASE ** amount) % field
-    return (field - ((field - x) / BASE ** amount)) % field
+    return FIELD.truncate(x, interface, amount)
 
 
 def public_add(x, y, interface):
@@ -65,94 +119,122 @@ def public_add(x, y, interface):
         return x
 
 
-def spdz_add(a, b):
-    return ((a + b) % field)
+def spdz_add(a, b, engine=FIELD):
+    return engine.reduce(a + b)
 
 
-def spdz_neg(a):
-    return (field - a) % field
+def spdz_neg(a, engine=FIELD):
+    return engine.reduce(-a)
 
 
-def generate_mul_triple(m, n):
-    r = torch.LongTensor(m, n).random_(field)
-    s = torch.LongTensor(m, n).random_(field)
-    t = r * s
+def generate_mul_triple(m, n, engine=FIELD):
+    r = engine.random_element((m, n))
+    s = engine.random_element((m, n))
+    t = engine.reduce(r * s)
     return r, s, t
 
 
-def generate_mul_triple_communication(m, n, interface):
+def generate_mul_triple_communication(m, n, interface, engine=FIELD):
     if (interface.get_party() == 0):
-        r, s, t = generate_mul_triple(m, n)
+        r, s, t = generate_mul_triple(m, n, engine)
 
-        r_alice, r_bob = share(r)
-        s_alice, s_bob = share(s)
-        t_alice, t_bob = share(t)
+        r_alice, r_bob = share(r, engine)
+        s_alice, s_bob = share(s, engine)
+        t_alice, t_bob = share(t, engine)
 
-        swap_shares(r_bob, interface)
-        swap_shares(s_bob, interface)
-        swap_shares(t_bob, interface)
+        swap_shares_many([r_bob, s_bob, t_bob], interface)
 
         triple_alice = [r_alice, s_alice, t_alice]
         return triple_alice
     elif (interface.get_party() == 1):
-        r_bob = swap_shares(torch.LongTensor(m, n).zero_(), interface)
-        s_bob = swap_shares(torch.LongTensor(m, n).zero_(), interface)
-        t_bob = swap_shares(torch.LongTensor(m, n).zero_(), interface)
-        triple_bob = [r_bob, s_bob, t_bob]
+        triple_bob = swap_shares_many([torch.LongTensor(m, n).zero_()] * 3, interface)
         return triple_bob
 
 
-def spdz_mul(x, y, interface):
+def _triple_pool(interface, engine):
+    """Returns the triple pool attached to interface (see
+    :class:`triples.TriplePool`), if any."""
+    pool = getattr(interface, 'triple_pool', None)
+    if pool is not None and pool.engine is not engine:
+        raise ValueError('The triple pool of the interface is for another engine')
+    return pool
+
+
+def spdz_mul(x, y, interface, precision_fractional=None, engine=FIELD):
     if x.shape != y.shape:
         raise ValueError()
     m, n = x.shape
-    triple = generate_mul_triple_communication(m, n, interface)
+    pool = _triple_pool(interface, engine)
+    if pool is not None:
+        triple = pool.mul_triple(x.shape)
+    else:
+        triple = generate_mul_triple_communication(m, n, interface, engine)
     a, b, c = triple
-    d = (x - a) % field
-    e = (y - b) % field
-
-    d_other = swap_shares(d, interface)
-    e_other = swap_shares(e, interface)
-    delta = (d + d_other) % field
-    epsilon = (e + e_other) % field
-    r = delta * epsilon
-    s = a * epsilon
-    t = b * delta
+    d = engine.reduce(x - a)
+    e = engine.reduce(y - b)
+
+    d_other, e_other = swap_shares_many([d, e], interface)
+    delta = engine.reduce(d + d_other)
+    epsilon = engine.reduce(e + e_other)
+    # the products are reduced before being added, so that the sum can't
+    # overflow int64
+    r = engine.reduce(delta * epsilon)
+    s = engine.reduce(a * epsilon)
+    t = engine.reduce(b * delta)
     share = s + t + c
-    share = public_add(share, r, interface)
-    share = truncate(share, interface)
+    # truncate expects reduced shares
+    share = engine.reduce(public_add(share, r, interface))
+    share = engine.truncate(share, interface, _precision(precision_fractional, engine))
     return share
 
 
-def generate_matmul_triple(m, n, k):
-    r = torch.LongTensor(m, k).random_(field)
-    s = torch.LongTensor(k, n).random_(field)
-    t = r @ s
+def spdz_mul_many(pairs, interface, precision_fractional=None, engine=FIELD):
+    """Multiplies the shared tensors of each (x, y) pair elementwise, with a
+    single run of the protocol of spdz_mul (and so in as many rounds as one
+    multiplication): the operands are flattened and concatenated into one
+    tensor, and the product split back. Returns the list of the products."""
+    for x, y in pairs:
+        if x.shape != y.shape:
+            raise ValueError()
+    xs = torch.cat([x.contiguous().view(-1) for x, _ in pairs])
+    ys = torch.cat([y.contiguous().view(-1) for _, y in pairs])
+    products = spdz_mul(xs.view(1, -1), ys.view(1, -1), interface,
+                        precision_fractional, engine).view(-1)
+
+    results = []
+    offset = 0
+    for x, _ in pairs:
+        results.append(products[offset:offset + x.numel()].view(x.size()))
+        offset += x.numel()
+    return results
+
+
+def generate_matmul_triple(m, n, k, engine=FIELD):
+    r = engine.random_element((m, k))
+    s = engine.random_element((k, n))
+    t = engine.reduce(r @ s)
     return r, s, t
 
 
-def generate_matmul_triple_communication(m, n, k, interface):
+def generate_matmul_triple_communication(m, n, k, interface, engine=FIELD):
     if(interface.get_party() == 0):
-        r, s, t = generate_matmul_triple(m, n, k)
-        r_alice, r_bob = share(r)
-        s_alice, s_bob = share(s)
-        t_alice, t_bob = share(t)
+        r, s, t = generate_matmul_triple(m, n, k, engine)
+        r_alice, r_bob = share(r, engine)
+        s_alice, s_bob = share(s, engine)
+        t_alice, t_bob = share(t, engine)
 
-        swap_shares(r_bob, interface)
-        swap_shares(s_bob, interface)
-        swap_shares(t_bob, interface)
+        swap_shares_many([r_bob, s_bob, t_bob], interface)
 
         triple_alice = [r_alice, s_alice, t_alice]
         return triple_alice
     elif (interface.get_party() == 1):
-        r_bob = swap_shares(torch.LongTensor(m, k).zero_(), interface)
-        s_bob = swap_shares(torch.LongTensor(k, n).zero_(), interface)
-        t_bob = swap_shares(torch.LongTensor(m, n).zero_(), interface)
-        triple_bob = [r_bob, s_bob, t_bob]
+        triple_bob = swap_shares_many([torch.LongTensor(m, k).zero_(),
+                                       torch.LongTensor(k, n).zero_(),
+                                       torch.LongTensor(m, n).zero_()], interface)
         return triple_bob
 
 
-def spdz_matmul(x, y, interface):
+def spdz_matmul(x, y, interface, precision_fractional=None, engine=FIELD):
     x_height = x.shape[0]
     if len(x.shape) != 1:
         x_width = x.shape[1]
@@ -165,21 +247,25 @@ def spdz_matmul(x, y, interface):
     else:
         y_width = 1
 
-    assert x_width == y_height, 'dimension mismatch: %r != %r' % (x_width, y_height)
+    if x_width != y_height:
+        raise ValueError('dimension mismatch: %r != %r' % (x_width, y_height))
 
-    r, s, t = generate_matmul_triple_communication(
-        x_height, y_width, x_width, interface)
+    pool = _triple_pool(interface, engine)
+    if pool is not None:
+        r, s, t = pool.matmul_triple(x_height, y_width, x_width)
+    else:
+        r, s, t = generate_matmul_triple_communication(
+            x_height, y_width, x_width, interface, engine)
 
-    rho_local = (x - r) % field
-    sigma_local = (y - s) % field
+    rho_local = engine.reduce(x - r)
+    sigma_local = engine.reduce(y - s)
 
     # Communication
-    rho_other = swap_shares(rho_local, interface)
-    sigma_other = swap_shares(sigma_local, interface)
+    rho_other, sigma_other = swap_shares_many([rho_local, sigma_local], interface)
 
     # They both add up the shares locally
-    rho = reconstruct([rho_local, rho_other])
-    sigma = reconstruct([sigma_local, sigma_other])
+    rho = reconstruct([rho_local, rho_other], engine)
+    sigma = reconstruct([sigma_local, sigma_other], engine)
 
     r_sigma = r @ sigma
     rho_s = rho @ s
@@ -188,51 +274,110 @@ def spdz_matmul(x, y, interface):
 
     rs = rho @ sigma
 
-    share = public_add(share, rs, interface)
-    share = truncate(share, interface)
+    share = engine.reduce(public_add(share, rs, interface))
+    share = engine.truncate(share, interface, _precision(precision_fractional, engine))
     return share
 
 
-def generate_sigmoid_shares_communication(x, interface):
-    if (interface.get_party() == 0):
-        W0 = encode(torch.FloatTensor(x.shape).one_()*1/2)
-        W1 = encode(torch.FloatTensor(x.shape).one_()*1/4)
-        W3 = encode(torch.FloatTensor(x.shape).one_()*-1/48)
-        W5 = encode(torch.FloatTensor(x.shape).one_()*1/480)
-
-        W0_alice, W0_bob = share(W0)
-        W1_alice, W1_bob = share(W1)
-        W3_alice, W3_bob = share(W3)
-        W5_alice, W5_bob = share(W5)
-
-        swap_shares(W0_bob, interface)
-        swap_shares(W1_bob, interface)
-        swap_shares(W3_bob, interface)
-        swap_shares(W5_bob, interface)
-
-        quad_alice = [W0_alice, W1_alice, W3_alice, W5_alice]
-        return quad_alice
-    elif (interface.get_party() == 1):
-        W0_bob = swap_shares(torch.LongTensor(
-            x.shape).zero_(), interface)
-        W1_bob = swap_shares(torch.LongTensor(
-            x.shape).zero_(), interface)
-        W3_bob = swap_shares(torch.LongTensor(
-            x.shape).zero_(), interface)
-        W5_bob = swap_shares(torch.LongTensor(
-            x.shape).zero_(), interface)
-        quad_bob = [W0_bob, W1_bob, W3_bob, W5_bob]
-        return quad_bob
-
-
-def spdz_sigmoid(x, interface):
-    W0, W1, W3, W5 = generate_sigmoid_shares_communication(x, interface)
-    x2 = spdz_mul(x, x, interface)
-    x3 = spdz_mul(x, x2, interface)
-    x5 = spdz_mul(x3, x2, interface)
-    temp5 = spdz_mul(x5, W5, interface)
-    temp3 = spdz_mul(x3, W3, interface)
-    temp1 = spdz_mul(x, W1, interface)
-    temp53 = spdz_add(temp5, temp3)
-    temp531 = spdz_add(temp53, temp1)
-    return spdz_add(W0, temp531)
+# Coefficients of the polynomial approximations of activations (the
+# coefficient of x**k at index k), see spdz_poly
+SIGMOID_COEFFS = [1 / 2, 1 / 4, 0, -1 / 48, 0, 1 / 480]
+TANH_COEFFS = [0, 1, 0, -1 / 3, 0, 2 / 15]
+EXP_COEFFS = [1, 1, 1 / 2, 1 / 6, 1 / 24, 1 / 120]
+
+
+def reciprocal_coeffs(center, degree=4):
+    """Returns the coefficients of the Taylor expansion of 1 / x around
+    center, of the given degree: sum of (center - x)**j / center**(j + 1)
+    for j up to degree, expanded in powers of x."""
+    coeffs = [0.0] * (degree + 1)
+    for j in range(degree + 1):
+        # (center - x)**j = sum of binomial(j, k) * center**(j - k) * (-x)**k
+        binomial = 1
+        for k in range(j + 1):
+            coeffs[k] += binomial * center**(j - k) * (-1)**k / center**(j + 1)
+            binomial = binomial * (j - k) // (k + 1)
+    return coeffs
+
+
+def public_mul(x, c, interface, precision_fractional=None, engine=FIELD):
+    """Multiplies the shared tensor x by the public scalar c locally, without
+    any communication."""
+    precision_fractional = _precision(precision_fractional, engine)
+    scaled = int(round(c * BASE**precision_fractional))
+    if scaled % BASE**precision_fractional == 0:
+        # multiplying by an integer doesn't need a truncation
+        return engine.reduce(x * (scaled // BASE**precision_fractional))
+    return engine.truncate(engine.reduce(x * scaled), interface, precision_fractional)
+
+
+def spdz_powers(x, exponents, interface, precision_fractional=None, engine=FIELD):
+    """Returns the powers of the shared tensor x with the given exponents
+    (and those they are computed from), by exponent. x**k is computed in
+    round ceil(log2(k)) as the product of x**h, h the largest power of 2
+    below k, and x**(k - h), and the products of a round are done together
+    (see spdz_mul_many)."""
+    powers = {1: x}
+    needed = set()
+    exponents = list(exponents)
+    while exponents:
+        k = exponents.pop()
+        if k > 1 and k not in needed:
+            needed.add(k)
+            h = 1 << ((k - 1).bit_length() - 1)
+            exponents += [h, k - h]
+
+    rounds = {}
+    for k in needed:
+        rounds.setdefault((k - 1).bit_length(), []).append(k)
+    for depth in sorted(rounds):
+        ks = rounds[depth]
+        pairs = []
+        for k in ks:
+            h = 1 << ((k - 1).bit_length() - 1)
+            pairs.append((powers[h], powers[k - h]))
+        products = spdz_mul_many(pairs, interface, precision_fractional, engine)
+        for k, power in zip(ks, products):
+            powers[k] = power
+    return powers
+
+
+def spdz_poly(x, coeffs, interface, precision_fractional=None, engine=FIELD):
+    """Evaluates the polynomial with the public coefficients coeffs
+    (coeffs[k] is the coefficient of x**k) on the shared tensor x, encoded
+    with the given fractional precision. The coefficients are neither shared
+    nor multiplied with triples, but multiplied locally, and the powers of x
+    are computed in ceil(log2(degree)) rounds (see spdz_powers). The powers
+    whose coefficient is 0 once encoded are not computed."""
+    precision_fractional = _precision(precision_fractional, engine)
+    scale = BASE**precision_fractional
+    exponents = [k for k, c in enumerate(coeffs) if k > 0 and int(round(c * scale)) != 0]
+    powers = spdz_powers(x, exponents, interface, precision_fractional, engine)
+
+    result = engine.reduce(x * 0)
+    for k in exponents:
+        result = spdz_add(result, public_mul(powers[k], coeffs[k], interface,
+                                             precision_fractional, engine), engine)
+    if coeffs and int(round(coeffs[0] * scale)) != 0:
+        constant = int(round(coeffs[0] * scale))
+        result = engine.reduce(public_add(result, constant, interface))
+    return result
+
+
+def spdz_sigmoid(x, interface, precision_fractional=None, engine=FIELD):
+    return spdz_poly(x, SIGMOID_COEFFS, interface, precision_fractional, engine)
+
+
+def spdz_tanh(x, interface, precision_fractional=None, engine=FIELD):
+    return spdz_poly(x, TANH_COEFFS, interface, precision_fractional, engine)
+
+
+def spdz_exp(x, interface, precision_fractional=None, engine=FIELD):
+    return spdz_poly(x, EXP_COEFFS, interface, precision_fractional, engine)
+
+
+def spdz_reciprocal(x, interface, center=1, degree=4, precision_fractional=None,
+                    engine=FIELD):
+    """Approximates 1 / x, for x close to center (see reciprocal_coeffs)."""
+    return spdz_poly(x, reciprocal_coeffs(center, degree), interface, precision_fractional,
+                     engine)
@@ -0,0 +1,245 @@
+import random
+import threading
+
+import numpy as np
+import torch
+
+from . import spdz
+
+# The codes of the kinds of triples in the seeds of their generators
+KINDS = {'mul': 0, 'matmul': 1}
+
+_UINT32 = 2**32 - 1
+
+
+class TriplePool(object):
+    r"""
+    Beaver triples for :func:`spdz.spdz_mul` and :func:`spdz.spdz_matmul`,
+    generated ahead of time (offline), so that multiplications (online) only
+    consume them.
+
+    As in :func:`spdz.generate_mul_triple_communication`, party 0 deals the
+    triples: it knows them. But the shares of party 1 are drawn from a
+    pseudo-random generator seeded by a seed party 0 sends it once, when the
+    pool is created, so that each party generates its shares of the triples
+    locally, without any communication.
+
+    Triples are generated by blocks of high_watermark triples (that of party
+    0, which it sends along with the seed): the shares of a whole block are
+    drawn from the generator at once, and its products computed as a batch.
+    The i-th triple of a shape only depends on the seed and i, so that both
+    parties use the same triples however far ahead each of them generated
+    them.
+
+    A background thread keeps between low_watermark and high_watermark
+    triples ready for every shape used so far (or announced with
+    :func:`expect`): whenever fewer than low_watermark are left, it generates
+    blocks until at least high_watermark are ready. A triple which isn't
+    ready when it is needed is generated on the spot, and counted as a miss;
+    the rest of its block is kept ready.
+
+    Both parties must create their pool at the same point of the protocol,
+    with the same engine. The pool is used by the spdz functions given its
+    interface, when they run with its engine.
+
+    :Parameters:
+
+    * **interface (BaseInterface)** the interface of the party.
+
+    * **low_watermark (int, optional)** the number of triples of a shape left
+      below which they are refilled.
+
+    * **high_watermark (int, optional)** the number of triples of a shape
+      ready after a refill.
+
+    * **background (bool, optional)** whether triples are refilled by a
+      background thread. If False, they are only generated ahead of time by
+      :func:`refill`.
+
+    * **engine (optional)** the arithmetic of the shares: :data:`spdz.FIELD`
+      or :data:`ring.RING` (see :class:`spdz.Field`).
+    """
+
+    def __init__(self, interface, low_watermark=2, high_watermark=8, background=True,
+                 engine=spdz.FIELD):
+        self.interface = interface
+        self.engine = engine
+        self.party = interface.get_party()
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+
+        seed = random.SystemRandom().getrandbits(62) if self.party == 0 else 0
+        other_seed, other_block_size = spdz.swap_shares(
+            torch.LongTensor([seed, high_watermark]), interface)
+        if self.party == 0:
+            self._seed = seed
+            self._block_size = max(1, high_watermark)
+            # the seed of the shares of party 0, which party 1 never learns
+            self._own_seed = random.SystemRandom().getrandbits(62)
+        else:
+            self._seed = int(other_seed)
+            self._block_size = max(1, int(other_block_size))
+
+        self.hits = 0
+        self.misses = 0
+        # per key (kind, shape): the index of the next triple to use, of the
+        # next triple to generate (the start of a block) and the triples
+        # ready, by index
+        self._consumed = {}
+        self._generated = {}
+        self._ready = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._refill_loop)
+            self._thread.daemon = True
+            self._thread.start()
+
+        interface.triple_pool = self
+
+    def expect(self, kind, shape):
+        """Announces that triples of the given kind ('mul' or 'matmul') and
+        shape (the shape of the operands of 'mul', or (m, n, k) for the
+        product of a m x k and a k x n matrix) will be needed, so that they
+        are generated ahead of time."""
+        with self._cond:
+            self._add_key((kind, tuple(shape)))
+            self._cond.notify()
+
+    def mul_triple(self, shape):
+        """Returns the shares of the next triple for the product of two
+        tensors of the given shape."""
+        return self._get(('mul', tuple(shape)))
+
+    def matmul_triple(self, m, n, k):
+        """Returns the shares of the next triple for the product of a m x k
+        and a k x n matrix."""
+        return self._get(('matmul', (m, n, k)))
+
+    def refill(self, below=None):
+        """Generates blocks of triples until at least high_watermark are ready
+        for every shape with fewer than below (by default, high_watermark)
+        triples ready."""
+        below = self.high_watermark if below is None else below
+        with self._cond:
+            keys = [key for key in self._ready if len(self._ready[key]) < below]
+        for key in keys:
+            while True:
+                with self._cond:
+                    if self._closed or len(self._ready[key]) >= self.high_watermark:
+                        break
+                    start = max(self._generated[key], self._consumed[key])
+                    block = start // self._block_size
+                    self._generated[key] = (block + 1) * self._block_size
+                triples = self._generate(key, block)
+                with self._cond:
+                    self._add_ready(key, block, triples, start)
+                    self._cond.notify_all()
+
+    def stats(self):
+        """Returns the number of triples used which were ready (hits), which
+        weren't (misses), and the number of triples ready."""
+        with self._cond:
+            ready = sum(len(triples) for triples in self._ready.values())
+            return dict(hits=self.hits, misses=self.misses, ready=ready)
+
+    def close(self):
+        """Stops the background thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        if getattr(self.interface, 'triple_pool', None) is self:
+            self.interface.triple_pool = None
+
+    def _add_key(self, key):
+        if key not in self._ready:
+            self._consumed[key] = 0
+            self._generated[key] = 0
+            self._ready[key] = {}
+
+    def _add_ready(self, key, block, triples, start):
+        """Adds the triples of block from the index start on, except those
+        already used."""
+        first = block * self._block_size
+        for index in range(max(start, self._consumed[key]), first + len(triples)):
+            self._ready[key][index] = triples[index - first]
+
+    def _get(self, key):
+        with self._cond:
+            self._add_key(key)
+            index = self._consumed[key]
+            self._consumed[key] = index + 1
+            triple = self._ready[key].pop(index, None)
+            if triple is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._cond.notify()
+        if triple is None:
+            block = index // self._block_size
+            triples = self._generate(key, block)
+            triple = triples[index - block * self._block_size]
+            with self._cond:
+                # keep the rest of the block, unless a refill is generating it
+                if self._generated[key] <= index:
+                    self._generated[key] = (block + 1) * self._block_size
+                    self._add_ready(key, block, triples, index + 1)
+        return triple
+
+    def _needs_refill(self):
+        return any(len(triples) < self.low_watermark for triples in self._ready.values())
+
+    def _refill_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._needs_refill():
+                    self._cond.wait()
+                if self._closed:
+                    return
+            self.refill(below=self.low_watermark)
+
+    def _generate(self, key, block):
+        """Returns the shares of the party of the triples of the block-th
+        block of key, as a list of [r, s, t] triples."""
+        kind, shape = key
+        if kind == 'mul':
+            shapes = [shape, shape, shape]
+        else:
+            m, n, k = shape
+            shapes = [(m, k), (k, n), (m, n)]
+
+        r1, s1, t1 = self._draw(self._prg_seed(self._seed, key, block), shapes)
+        if self.party == 0:
+            r0, s0 = self._draw(self._prg_seed(self._own_seed, key, block), shapes[:2])
+            r = self.engine.reduce(r0 + r1)
+            s = self.engine.reduce(s0 + s1)
+            if kind == 'mul':
+                t = r * s
+            else:
+                t = torch.from_numpy(np.matmul(r.numpy(), s.numpy()))
+            r1, s1, t1 = r0, s0, self.engine.reduce(t - t1)
+        return [[r1[i], s1[i], t1[i]] for i in range(self._block_size)]
+
+    def _draw(self, prg_seed, shapes):
+        """Draws a block of random elements of each shape at once from the
+        generator seeded with prg_seed, and returns them as tensors of shape
+        (block size,) + shape."""
+        sizes = [self._block_size * int(np.prod(shape)) for shape in shapes]
+        prg = np.random.RandomState(prg_seed)
+        flat = self.engine.random_element((sum(sizes),), prg)
+        tensors = []
+        offset = 0
+        for shape, size in zip(shapes, sizes):
+            tensors.append(flat[offset:offset + size].view(self._block_size, *shape))
+            offset += size
+        return tensors
+
+    @staticmethod
+    def _prg_seed(seed, key, block):
+        kind, shape = key
+        return ([seed & _UINT32, seed >> 32, KINDS[kind]] + list(shape) +
+                [block & _UINT32, block >> 32])
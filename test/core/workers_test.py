@@ -1,6 +1,48 @@
 from unittest import TestCase
+import socket
+import threading
+
+from syft.core.workers import SocketWorker
 
 
 class TestSample(TestCase):
     def test_true(self):
         assert True
+
+
+class TestSocketWorkerFraming(TestCase):
+
+    def test_frames_with_newlines_and_binary_payloads(self):
+        left, right = socket.socketpair()
+        try:
+            messages = [b'{"type": "obj"}\n', b'a\nb\nc', bytes(range(256)), b'']
+            for message in messages:
+                SocketWorker._send_frame(left, message)
+            for message in messages:
+                assert SocketWorker._recv_frame(right) == message
+
+            SocketWorker._send_frame(left, 'unicode str é')
+            assert SocketWorker._recv_frame(right).decode('utf-8') == 'unicode str é'
+        finally:
+            left.close()
+            right.close()
+
+    def test_large_frame(self):
+        left, right = socket.socketpair()
+        message = bytearray(b'\n' * (8 * 1024 * 1024 + 3))
+        sender = threading.Thread(target=SocketWorker._send_frame, args=(left, message))
+        sender.start()
+        try:
+            received = SocketWorker._recv_frame(right)
+            assert len(received) == len(message)
+            assert received == message
+        finally:
+            sender.join()
+            left.close()
+            right.close()
+
+    def test_closed_connection(self):
+        left, right = socket.socketpair()
+        left.close()
+        assert SocketWorker._recv_frame(right) is None
+        right.close()
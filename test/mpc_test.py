@@ -0,0 +1,350 @@
+from unittest import TestCase
+import threading
+
+import torch
+
+from syft.mpc import spdz
+from syft.mpc import ring
+from syft.mpc.triples import TriplePool
+from syft.mpc.interface.local_interface import LocalInterface
+
+
+def run_parties(protocol, *args):
+    """Runs protocol(interface, party_args...) for both parties, in two
+    threads, and returns their results. args are the pairs of arguments of
+    party 0 and party 1."""
+    interfaces = LocalInterface.pair()
+    results = [None, None]
+    errors = []
+
+    def run(party):
+        try:
+            results[party] = protocol(interfaces[party], *[arg[party] for arg in args])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(party,)) for party in (0, 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def share_pairs(*secrets, precision_fractional=spdz.PRECISION_FRACTIONAL):
+    """Secret-shares the encodings of secrets, as (share of party 0, share of
+    party 1) pairs."""
+    return [spdz.share(spdz.encode(secret, precision_fractional)) for secret in secrets]
+
+
+class TestSPDZ(TestCase):
+
+    def test_mul(self):
+        x = torch.FloatTensor([[1, 2], [3, 4]])
+        y = torch.FloatTensor([[5, 6], [7, 8]])
+
+        results = run_parties(lambda interface, x_sh, y_sh: spdz.spdz_mul(x_sh, y_sh, interface),
+                              *share_pairs(x, y))
+        assert torch.equal(spdz.decode(spdz.reconstruct(results)), x * y)
+
+    def test_mul_rounds(self):
+        x = torch.FloatTensor([[1, 2], [3, 4]])
+
+        def protocol(interface, x_sh):
+            sent = []
+            for _ in range(2):
+                start = interface.sent
+                result = spdz.spdz_mul(x_sh, x_sh, interface)
+                sent.append(interface.sent - start)
+                TriplePool(interface, background=False)
+            return result, sent
+
+        (result_0, sent_0), (result_1, sent_1) = run_parties(protocol, *share_pairs(x))
+        # the triple and the masked operands each take one round, and only
+        # the masked operands once triples are preprocessed
+        assert sent_0 == sent_1 == [2, 1]
+        assert torch.equal(spdz.decode(spdz.reconstruct([result_0, result_1])), x * x)
+
+    def test_mul_many(self):
+        xs = [torch.FloatTensor([[1, 2], [3, 4]]), torch.FloatTensor([[5, 6, 7]]),
+              torch.FloatTensor([[8], [9]])]
+        ys = [torch.FloatTensor([[4, 3], [2, 1]]), torch.FloatTensor([[0, 1, 2]]),
+              torch.FloatTensor([[3], [3]])]
+
+        def protocol(interface, x_shs, y_shs):
+            start = interface.sent
+            products = spdz.spdz_mul_many(list(zip(x_shs, y_shs)), interface)
+            return products, interface.sent - start
+
+        x_pairs, y_pairs = share_pairs(*xs), share_pairs(*ys)
+        (products_0, sent_0), (products_1, sent_1) = run_parties(
+            protocol, list(zip(*x_pairs)), list(zip(*y_pairs)))
+
+        # as many rounds as a single multiplication
+        assert sent_0 == sent_1 == 2
+        for product_0, product_1, x, y in zip(products_0, products_1, xs, ys):
+            assert torch.equal(spdz.decode(spdz.reconstruct([product_0, product_1])), x * y)
+
+    def test_triple_pool(self):
+        x = torch.FloatTensor([[1, 2, 3], [4, 5, 6]])
+        y = torch.FloatTensor([[1, 0, 2], [3, 1, 1]])
+
+        def protocol(interface, x_sh, y_sh):
+            pool = TriplePool(interface, low_watermark=2, high_watermark=4, background=False)
+            pool.expect('mul', x_sh.shape)
+            pool.refill()
+            assert pool.stats() == dict(hits=0, misses=0, ready=4)
+
+            triples = [pool.mul_triple(x_sh.shape) for _ in range(3)]
+            results = [spdz.spdz_mul(x_sh, y_sh, interface) for _ in range(3)]
+            stats = pool.stats()
+            pool.close()
+            return triples, results, stats
+
+        (triples_0, results_0, stats_0), (triples_1, results_1, stats_1) = run_parties(
+            protocol, *share_pairs(x, y))
+
+        # the block of 4 triples was ready, the 5th product missed and
+        # generated the next block, which the last product used
+        assert stats_0 == stats_1 == dict(hits=5, misses=1, ready=2)
+        for (a0, b0, c0), (a1, b1, c1) in zip(triples_0, triples_1):
+            a, b = spdz.reconstruct([a0, a1]), spdz.reconstruct([b0, b1])
+            assert torch.equal((a * b) % spdz.field, spdz.reconstruct([c0, c1]))
+
+        for result_0, result_1 in zip(results_0, results_1):
+            assert torch.equal(spdz.decode(spdz.reconstruct([result_0, result_1])), x * y)
+
+    def test_triple_pool_background_refill(self):
+        x = torch.FloatTensor([[1, 2], [3, 4]])
+
+        def protocol(interface, x_sh):
+            pool = TriplePool(interface, low_watermark=3, high_watermark=6)
+            pool.expect('mul', x_sh.shape)
+            ready = pool._ready[('mul', tuple(x_sh.shape))]
+            with pool._cond:
+                assert pool._cond.wait_for(lambda: len(ready) >= 6, timeout=10)
+            results = [spdz.spdz_mul(x_sh, x_sh, interface) for _ in range(20)]
+            pool.close()
+            return results, pool.stats()
+
+        (results_0, stats_0), (results_1, stats_1) = run_parties(protocol, *share_pairs(x))
+        for stats in (stats_0, stats_1):
+            assert stats['hits'] + stats['misses'] == 20
+            # the triples generated in the background were used
+            assert stats['hits'] >= 6
+        for result_0, result_1 in zip(results_0, results_1):
+            assert torch.equal(spdz.decode(spdz.reconstruct([result_0, result_1])), x * x)
+
+    def test_poly(self):
+        x = torch.FloatTensor([[0, 1], [2, 3]])
+
+        # 3 + 2 x**2 + x**3
+        results = run_parties(lambda interface, x_sh: spdz.spdz_poly(x_sh, [3, 0, 2, 1], interface),
+                              *share_pairs(x))
+        assert torch.equal(spdz.decode(spdz.reconstruct(results)), 3 + 2 * x**2 + x**3)
+
+    def test_poly_rounds(self):
+        x = torch.FloatTensor([[1, 2], [3, 0]])
+
+        def protocol(interface, x_sh):
+            TriplePool(interface, background=False)
+            start = interface.sent
+            result = spdz.spdz_poly(x_sh, [0, 1, 1, 1, 1, 1], interface)
+            return result, interface.sent - start
+
+        (result_0, sent_0), (result_1, sent_1) = run_parties(protocol, *share_pairs(x))
+        # x**2, then x**3 and x**4, then x**5
+        assert sent_0 == sent_1 == 3
+        assert torch.equal(spdz.decode(spdz.reconstruct([result_0, result_1])),
+                           x + x**2 + x**3 + x**4 + x**5)
+
+    def test_poly_skips_vanishing_coeffs(self):
+        x = torch.FloatTensor([[0.5, -1.25]])
+
+        def protocol(interface, x_sh):
+            start = interface.sent
+            # the coefficient of x**5 is 0 with 3 fractional digits
+            result = spdz.spdz_poly(x_sh, [0, 2, 0, 0, 0, 1e-4], interface,
+                                    precision_fractional=3)
+            return result, interface.sent - start
+
+        (result_0, sent_0), (result_1, sent_1) = run_parties(
+            protocol, *share_pairs(x, precision_fractional=3))
+        assert sent_0 == sent_1 == 0
+        assert torch.equal(spdz.decode(spdz.reconstruct([result_0, result_1]), 3), 2 * x)
+
+    def assert_activation(self, activation, x, expected, tolerance=1e-2, **options):
+        # small values: truncations in the field fail with a probability
+        # proportional to the value truncated
+        torch.manual_seed(0)
+        results = run_parties(
+            lambda interface, x_sh: activation(x_sh, interface, precision_fractional=3,
+                                               **options),
+            *share_pairs(x, precision_fractional=3))
+        result = spdz.decode(spdz.reconstruct(results), 3)
+        assert (result - expected).abs().max() < tolerance
+
+    def test_sigmoid(self):
+        x = torch.FloatTensor([[-0.5, -0.25, 0, 0.25, 0.5]])
+        self.assert_activation(spdz.spdz_sigmoid, x, 1 / (1 + torch.exp(-x)))
+
+    def test_tanh(self):
+        x = torch.FloatTensor([[-0.5, -0.25, 0, 0.25, 0.5]])
+        self.assert_activation(spdz.spdz_tanh, x, torch.tanh(x))
+
+    def test_exp(self):
+        x = torch.FloatTensor([[-0.5, -0.25, 0, 0.25, 0.5]])
+        self.assert_activation(spdz.spdz_exp, x, torch.exp(x))
+
+    def test_reciprocal(self):
+        x = torch.FloatTensor([[0.875, 1, 1.125]])
+        self.assert_activation(spdz.spdz_reciprocal, x, 1 / x, tolerance=2e-2, degree=3)
+
+    def test_reciprocal_coeffs(self):
+        coeffs = spdz.reciprocal_coeffs(2, degree=6)
+        for x in [1.6, 2, 2.4]:
+            assert abs(sum(c * x**k for k, c in enumerate(coeffs)) - 1 / x) < 1e-4
+
+
+def ring_share_pairs(*secrets, precision_fractional=ring.PRECISION_FRACTIONAL):
+    """Secret-shares the encodings of secrets in the ring, as (share of party
+    0, share of party 1) pairs."""
+    return [ring.share(ring.encode(secret, precision_fractional)) for secret in secrets]
+
+
+class TestRing(TestCase):
+
+    def assert_close(self, shares, expected, precision_fractional=ring.PRECISION_FRACTIONAL):
+        # truncation may be off by one unit of the last fractional digit
+        result = ring.decode(ring.reconstruct(shares), precision_fractional)
+        assert (result - expected).abs().max() <= 1.5 / ring.BASE**precision_fractional
+
+    def test_share_reconstruct(self):
+        secret = torch.LongTensor([[0, -1, 2**62], [-2**63, 2**63 - 1, 12345]])
+        assert torch.equal(ring.reconstruct(ring.share(secret)), secret)
+
+        x = torch.FloatTensor([[1.5, -2.25, 0]])
+        assert torch.equal(ring.decode(ring.reconstruct(ring.share(ring.encode(x)))), x)
+
+    def test_add_neg(self):
+        x = torch.FloatTensor([[1.5, -2.25], [0.125, 3]])
+        y = torch.FloatTensor([[-2, 4], [8, -0.5]])
+        (x0, x1), (y0, y1) = ring_share_pairs(x, y)
+
+        total = ring.reconstruct([ring.spdz_add(x0, y0), ring.spdz_add(x1, y1)])
+        assert torch.equal(ring.decode(total), x + y)
+        negated = ring.reconstruct([ring.spdz_neg(x0), ring.spdz_neg(x1)])
+        assert torch.equal(ring.decode(negated), -x)
+
+    def test_mul(self):
+        x = torch.FloatTensor([[1.5, -2.25], [0.125, 3]])
+        y = torch.FloatTensor([[-2, 4], [8, -0.5]])
+
+        results = run_parties(lambda interface, x_sh, y_sh: ring.spdz_mul(x_sh, y_sh, interface),
+                              *ring_share_pairs(x, y))
+        self.assert_close(results, x * y)
+
+    def test_mul_many(self):
+        xs = [torch.FloatTensor([[1.5, -2]]), torch.FloatTensor([[3], [-0.25]])]
+        ys = [torch.FloatTensor([[-4, -2.5]]), torch.FloatTensor([[0.5], [6]])]
+
+        def protocol(interface, x_shs, y_shs):
+            start = interface.sent
+            products = ring.spdz_mul_many(list(zip(x_shs, y_shs)), interface)
+            return products, interface.sent - start
+
+        (products_0, sent_0), (products_1, sent_1) = run_parties(
+            protocol, list(zip(*ring_share_pairs(*xs))), list(zip(*ring_share_pairs(*ys))))
+
+        assert sent_0 == sent_1 == 2
+        for product_0, product_1, x, y in zip(products_0, products_1, xs, ys):
+            self.assert_close([product_0, product_1], x * y)
+
+    def test_matmul(self):
+        # large enough for the products of the field (and their sums) to
+        # overflow int64, exact in the ring
+        x = torch.LongTensor([[1000000, -3, 7], [-250000, 42, 999999]])
+        y = torch.LongTensor([[123456, -1], [-654321, 2], [1000, 3000000]])
+
+        def protocol(interface, x_sh, y_sh):
+            return ring.spdz_matmul(x_sh, y_sh, interface, precision_fractional=0)
+
+        results = run_parties(protocol, ring.share(x), ring.share(y))
+        assert torch.equal(ring.reconstruct(results), x @ y)
+
+    def test_matmul_fractional(self):
+        x = torch.FloatTensor([[1.5, -2.25, 0.5], [0.125, 3, -1]])
+        y = torch.FloatTensor([[-2, 4], [8, -0.5], [0.25, 1]])
+
+        results = run_parties(
+            lambda interface, x_sh, y_sh: ring.spdz_matmul(x_sh, y_sh, interface),
+            *ring_share_pairs(x, y))
+        self.assert_close(results, x @ y)
+
+    def test_matmul_dimension_mismatch(self):
+        x, y = ring.share(torch.LongTensor(2, 3).zero_()), ring.share(torch.LongTensor(2, 3).zero_())
+        with self.assertRaises(ValueError):
+            ring.spdz_matmul(x[0], y[0], LocalInterface.pair()[0])
+
+    def test_public_mul(self):
+        x = torch.FloatTensor([[1.5, -2.25], [0.125, 3]])
+        (x0, x1), = ring_share_pairs(x)
+        interfaces = LocalInterface.pair()
+
+        results = [ring.public_mul(x0, -0.5, interfaces[0]),
+                   ring.public_mul(x1, -0.5, interfaces[1])]
+        self.assert_close(results, x * -0.5)
+
+    def test_triple_pool(self):
+        x = torch.FloatTensor([[1.5, -2.25], [0.125, 3]])
+        y = torch.FloatTensor([[-2, 4], [8, -0.5]])
+
+        def protocol(interface, x_sh, y_sh):
+            pool = TriplePool(interface, high_watermark=4, background=False, engine=ring.RING)
+            pool.expect('mul', x_sh.shape)
+            pool.refill()
+            results = [ring.spdz_mul(x_sh, y_sh, interface) for _ in range(3)]
+            triple = pool.matmul_triple(2, 2, 3)
+            stats = pool.stats()
+            pool.close()
+            return results, triple, stats
+
+        (results_0, triple_0, stats_0), (results_1, triple_1, stats_1) = run_parties(
+            protocol, *ring_share_pairs(x, y))
+
+        assert stats_0 == stats_1 == dict(hits=3, misses=1, ready=4)
+        for result_0, result_1 in zip(results_0, results_1):
+            self.assert_close([result_0, result_1], x * y)
+        # the products of matmul triples wrap around, like the shares
+        a, b, c = [ring.reconstruct(shares) for shares in zip(triple_0, triple_1)]
+        assert torch.equal(a @ b, c)
+
+    def test_triple_pool_other_engine(self):
+        x = torch.FloatTensor([[1, 2]])
+
+        def protocol(interface, x_sh):
+            pool = TriplePool(interface, background=False)
+            with self.assertRaises(ValueError):
+                ring.spdz_mul(x_sh, x_sh, interface)
+            pool.close()
+
+        run_parties(protocol, *ring_share_pairs(x))
+
+    def assert_poly(self, activation, coeffs, x, **options):
+        results = run_parties(lambda interface, x_sh: activation(x_sh, interface, **options),
+                              *ring_share_pairs(x))
+        expected = sum(c * x**k for k, c in enumerate(coeffs))
+        assert (ring.decode(ring.reconstruct(results)) - expected).abs().max() < 3e-2
+
+    def test_activations(self):
+        x = torch.FloatTensor([[-1, -0.5, 0, 0.25, 1]])
+        self.assert_poly(ring.spdz_sigmoid, spdz.SIGMOID_COEFFS, x)
+        self.assert_poly(ring.spdz_tanh, spdz.TANH_COEFFS, x)
+        self.assert_poly(ring.spdz_exp, spdz.EXP_COEFFS, x)
+
+        x = torch.FloatTensor([[0.75, 1, 1.25]])
+        self.assert_poly(ring.spdz_reciprocal, spdz.reciprocal_coeffs(1, 4), x)
+        assert (x.reciprocal() - sum(c * x**k for k, c in
+                                     enumerate(spdz.reciprocal_coeffs(1, 4)))).abs().max() < 2e-3
@@ -1,7 +1,8 @@
 from unittest import TestCase
 from syft.core.hooks import TorchHook
-from syft.core.workers import VirtualWorker
+from syft.core.workers import BaseWorker, VirtualWorker, SocketWorker, WebSocketWorker
 from syft.core import utils
+import syft
 
 import torch
 from torch.autograd import Variable as Var
@@ -10,6 +11,12 @@ import torch.optim as optim
 import torch.nn as nn
 
 import json
+import time
+import struct
+import asyncio
+import threading
+import tempfile
+import gc
 
 
 class TestTorchTensor(TestCase):
@@ -24,6 +31,206 @@ class TestTorchTensor(TestCase):
         x = torch.FloatTensor([1, 2, 3, 4, 5])
         assert x.__repr__() == '\n 1\n 2\n 3\n 4\n 5\n[torch.FloatTensor of size 5]\n'
 
+    def test_hooks_share_overload_tables(self):
+
+        hook = TorchHook(verbose=False)
+        other_hook = TorchHook(verbose=False)
+        assert hook.tensorvar_methods is other_hook.tensorvar_methods
+        assert hook.torch_funcs is other_hook.torch_funcs
+
+        # the tables are computed before torch is hooked, so the methods
+        # added by the hook can't be called remotely
+        assert 'send' not in other_hook.tensorvar_methods
+        assert not any(method.startswith('old_') for method in other_hook.tensorvar_methods)
+
+    def test_local_results_registered_lazily(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = VirtualWorker(id=1, hook=hook)
+        local.add_worker(remote)
+
+        x = torch.FloatTensor([1, 2, 3])
+        y = x.add(x) * 2
+        assert not y.is_pointer and not hasattr(y, '_id')
+
+        # reading the id registers the result
+        assert isinstance(y.id, int) and len(y.owners) == 1
+        assert hasattr(y, '_id')
+
+        z = Var(torch.FloatTensor([1, 2])) + 1
+        assert not hasattr(z, '_id')
+        z.send(remote)
+        assert z.id in remote._objects
+        assert torch.equal(z.get().data, torch.FloatTensor([2, 3]))
+
+    def test_created_tensors_registered_on_demand(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = VirtualWorker(id=1, hook=hook)
+        local.add_worker(remote)
+
+        n_objects = len(local._objects) + len(local._tmp_objects)
+        tensors = [torch.FloatTensor([i, i + 1]) for i in range(10)]
+        var = Var(torch.FloatTensor([1, 2]))
+        assert not any(hasattr(t, '_id') for t in tensors + [var])
+        assert len(local._objects) + len(local._tmp_objects) == n_objects
+
+        # sending a tensor registers it
+        x = tensors[0].send(remote)
+        assert x.id in remote._objects
+        assert not any(hasattr(t, '_id') for t in tensors[1:])
+
+    def test_id_allocator_no_collisions(self):
+
+        ids = utils.IdAllocator(block_size=1000)
+        other = utils.IdAllocator()
+        assert ids.prefix != other.prefix
+
+        allocated = [[] for _ in range(4)]
+
+        def allocate(out):
+            for i in range(500000):
+                out.append(ids.new_id())
+            for i in range(100):
+                out.extend(ids.reserve(1000))
+
+        threads = [threading.Thread(target=allocate, args=(out,)) for out in allocated]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # each thread got increasing ids, and threads running out of a block
+        # at the same time didn't reserve (and waste) a block each
+        assert all(out == sorted(out) for out in allocated)
+        assert ids._next == 2400000
+
+        allocated = [i for out in allocated for i in out]
+        allocated.extend(other.new_id() for _ in range(1000))
+        assert len(allocated) == len(set(allocated)) == 2401000
+        assert all(0 <= i < 2**63 for i in allocated)
+
+        # ids are monotonic and move to a new prefix once a prefix runs out
+        prefix = ids.prefix
+        last = ids.reserve(2**utils.ID_COUNTER_BITS - ids._next)[-1]
+        first = ids.reserve(1)[0]
+        assert last >> utils.ID_COUNTER_BITS == prefix
+        assert first >> utils.ID_COUNTER_BITS == ids.prefix != prefix
+        self.assertRaises(ValueError, utils.IdAllocator, prefix=ids.prefix)
+
+    def test_id_allocator_worker_prefix(self):
+
+        hook = TorchHook(verbose=False)
+        worker_id = 'id-allocator-test'
+        prefix = utils.IdAllocator.worker_id_prefix(worker_id)
+        assert 0 <= prefix < 2**utils.ID_PREFIX_BITS
+
+        # the prefix of a named worker is derived from its id, the same in
+        # every process
+        remote = VirtualWorker(id=worker_id, hook=hook, verbose=False)
+        assert remote.ids.prefix == prefix
+        assert remote.ids.new_id() >> utils.ID_COUNTER_BITS == prefix
+
+        # a second worker with the same id in the process, or an anonymous
+        # one, draws a prefix at random
+        other = VirtualWorker(id=worker_id, hook=hook, verbose=False)
+        anonymous = VirtualWorker(hook=hook, verbose=False)
+        assert len(set([remote.ids.prefix, other.ids.prefix, anonymous.ids.prefix])) == 3
+
+    def test_registered_ids_unique(self):
+
+        hook = TorchHook(verbose=False)
+        remote = VirtualWorker(id=1, hook=hook)
+        # fresh objects, over many blocks of ids
+        remote.ids.block_size = 16
+        xs = [remote.register_object(torch.FloatTensor([i])) for i in range(100000)]
+        ids = [x.id for x in xs]
+        assert len(set(ids)) == 100000 and ids == sorted(ids)
+        assert len(remote._objects) >= 100000
+        assert all(remote.get_obj(x.id) is x for x in xs[::1000])
+
+    def test_worker_memory_budget(self):
+
+        hook = TorchHook(verbose=False)
+        remote = VirtualWorker(id=1, hook=hook, memory_budget=3 * 4000)
+        hook.local_worker.add_worker(remote)
+
+        x = torch.FloatTensor(1000).zero_().send(remote)
+        a = x + 1
+        b = x + 2
+        c = x + 3
+
+        # results the client still points to are kept, whatever the budget
+        stats = remote.memory_stats()
+        assert stats['bytes'] > 3 * 4000 and stats['evictions'] == 0
+        assert torch.equal(a.get(), torch.FloatTensor(1000).fill_(1))
+
+        # released results are evicted, from the least recently used one
+        remote.release_obj(b.id)
+        remote.release_obj(c.id)
+        d = x + 4
+        stats = remote.memory_stats()
+        assert stats['bytes'] <= 3 * 4000 and stats['evictions'] == 1
+        assert b.id not in remote._objects and c.id in remote._objects
+        assert torch.equal(d.get(), torch.FloatTensor(1000).fill_(4))
+
+    def test_worker_spill_to_disk(self):
+
+        hook = TorchHook(verbose=False)
+        spill_dir = tempfile.mkdtemp()
+        remote = VirtualWorker(id=1, hook=hook, memory_budget=4000, spill_dir=spill_dir)
+        hook.local_worker.add_worker(remote)
+
+        xs = [torch.FloatTensor(1000).fill_(i).send(remote) for i in range(3)]
+        stats = remote.memory_stats()
+        assert stats['bytes'] <= 4000
+        assert stats['spilled'] == 2 and stats['spilled_bytes'] == 2 * 4000
+
+        # spilled tensors can still be used
+        assert torch.equal((xs[0] + xs[1]).get(), torch.FloatTensor(1000).fill_(1))
+        assert torch.equal(xs[1].get(), torch.FloatTensor(1000).fill_(1))
+
+    def test_remote_garbage_collection(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = VirtualWorker(id=1, hook=hook)
+        local.add_worker(remote)
+
+        x = torch.FloatTensor([1, 2, 3]).send(remote)
+        n_objects = len(remote._objects)
+        max_objects = 0
+        for i in range(1000):
+            y = x + i
+            if i % 10 == 0:
+                gc.collect()
+            max_objects = max(max_objects, len(remote._objects))
+        gc.collect()
+        hook.flush(remote)
+
+        # objects are deleted by batches of delete_batch_size
+        assert max_objects <= n_objects + local.delete_batch_size + 11
+
+        # only the objects still pointed to are left
+        assert len(remote._objects) == n_objects + 1
+        assert x.id in remote._objects and y.id in remote._objects
+
+        # several pointers to the same object
+        z = x.add_(1)
+        del z
+        gc.collect()
+        hook.flush(remote)
+        assert x.id in remote._objects
+        assert torch.equal(y.get(), torch.FloatTensor([1000, 1001, 1002]))
+
+        x_id = x.id
+        del x
+        gc.collect()
+        hook.flush()
+        assert x_id not in remote._objects
+
     def test_send_tensor(self):
 
         hook = TorchHook(verbose=False)
@@ -69,6 +276,358 @@ class TestTorchTensor(TestCase):
         # has not been registered
         assert unregistered_tensor.id != 9756847736
 
+    def test_ser_deser_tensor_binary(self):
+
+        hook = TorchHook(verbose=False)
+
+        x = torch.FloatTensor([[1, 2, 3], [4, 5, 6]])
+        blob = x.ser()
+        assert utils.is_blob(blob)
+
+        message_obj, segments = utils.unpack_blob(blob)
+        assert message_obj['torch_type'] == 'torch.FloatTensor'
+        assert message_obj['shape'] == [2, 3]
+        assert message_obj['id'] == x.id
+
+        y = torch.FloatTensor.deser(torch.FloatTensor, message_obj, segments)
+        assert torch.equal(x, y)
+
+        # non contiguous tensors are serialized by value
+        z = torch.LongTensor([[1, 2], [3, 4]]).t()
+        message_obj, segments = utils.unpack_blob(z.ser())
+        w = torch.LongTensor.deser(torch.LongTensor, message_obj, segments)
+        assert torch.equal(z, w)
+
+    def test_deser_tensor_zero_copy(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = VirtualWorker(id=1, hook=hook)
+        local.add_worker(remote)
+
+        x = torch.FloatTensor([[1, 2], [3, 4]])
+        message_obj, segments = utils.unpack_blob(x.ser())
+        copies = hook.deser_stats['copies']
+        y = torch.FloatTensor.deser(torch.FloatTensor, message_obj, segments)
+        assert hook.deser_stats['copies'] == copies
+        assert torch.equal(x, y)
+
+        # the tensor shares memory with the received buffer
+        y[0][0] = 10
+        assert struct.unpack('f', bytes(segments[0][:4]))[0] == 10
+
+        # a full send/get round trip does not copy on the receiving side either
+        stats = dict(hook.deser_stats)
+        x = torch.FloatTensor([1, 2, 3, 4, 5]).send(remote)
+        assert torch.equal(x.get(), torch.FloatTensor([1, 2, 3, 4, 5]))
+        assert hook.deser_stats['tensors'] == stats['tensors'] + 2
+        assert hook.deser_stats['copies'] == stats['copies']
+
+        # read-only buffers can't be shared and are copied
+        message_obj, segments = utils.unpack_blob(bytes(x.ser()))
+        y = torch.FloatTensor.deser(torch.FloatTensor, message_obj, segments)
+        assert hook.deser_stats['copies'] == stats['copies'] + 1
+        assert torch.equal(x, y)
+
+    def test_send_get_tensor_json_fallback(self):
+
+        hook = TorchHook(verbose=False)
+        hook.local_worker.use_json = True
+        remote = VirtualWorker(id=1, hook=hook, use_json=True)
+
+        x = torch.FloatTensor([1, 2, 3, 4, 5])
+        assert not utils.is_blob(x.ser(as_json=True))
+
+        x = x.send_(remote)
+        assert x.id in remote._objects
+        assert (x.get_() == torch.FloatTensor([1, 2, 3, 4, 5])).all()
+        hook.local_worker.use_json = False
+
+    def test_socket_framing_partial_reads(self):
+
+        class ChunkedSocket(object):
+            """Hands the bytes sent to it back at most chunk_size at a time."""
+            def __init__(self, chunk_size):
+                self.chunk_size = chunk_size
+                self.buffer = bytearray()
+
+            def sendall(self, data):
+                self.buffer += data
+
+            def recv_into(self, view):
+                n = min(len(view), self.chunk_size, len(self.buffer))
+                view[:n] = self.buffer[:n]
+                del self.buffer[:n]
+                return n
+
+        # the frames of two streams, interleaved, one larger than a coalesced frame
+        stream_a = [b'a' * 5, b'{"a": 1}\n', b'a' * (SocketWorker.frame_coalesce_size + 3)]
+        stream_b = [b'', bytes(range(256)), b'b\nb']
+        frames = [frame for pair in zip(stream_a, stream_b) for frame in pair]
+
+        for chunk_size in [1, 3, 7, 4096]:
+            sock = ChunkedSocket(chunk_size)
+            for frame in frames:
+                SocketWorker._send_frame(sock, frame)
+            received = [bytes(SocketWorker._recv_frame(sock)) for _ in frames]
+            assert received[0::2] == stream_a and received[1::2] == stream_b
+            assert SocketWorker._recv_frame(sock) is None
+
+        # a frame cut short is an error, not a message
+        sock = ChunkedSocket(2)
+        SocketWorker._send_frame(sock, b'truncated')
+        del sock.buffer[-1]
+        self.assertRaises(ConnectionError, SocketWorker._recv_frame, sock)
+
+    def test_websocket_multiplexed_responses(self):
+
+        class FakeConnection(object):
+            """Returns the given frames, then waits forever."""
+            def __init__(self, frames):
+                self.frames = list(frames)
+
+            async def recv(self):
+                if self.frames:
+                    return self.frames.pop(0)
+                await asyncio.get_event_loop().create_future()
+
+        hook = TorchHook(verbose=False)
+        remote = WebSocketWorker(hook=hook, id=3, is_pointer=True, verbose=False)
+        header = WebSocketWorker.request_header
+        loop = asyncio.get_event_loop()
+
+        # the responses of two requests in flight arrive out of order
+        requests = {0: loop.create_future(), 1: loop.create_future()}
+        remote._pending_requests.update(requests)
+        blob = bytes(utils.pack_blob({'id': 1}, [b'12345678']))
+        frames = [header.pack(1) + blob, header.pack(0) + b'"response 0"\n']
+
+        reader = asyncio.ensure_future(remote._read_responses(FakeConnection(frames)))
+        responses = loop.run_until_complete(asyncio.gather(requests[0], requests[1]))
+        reader.cancel()
+
+        assert responses[0] == '"response 0"\n'
+        assert utils.is_blob(responses[1]) and bytes(responses[1]) == blob
+        assert remote._pending_requests == {}
+
+    def test_async_remote_calls(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        bob = VirtualWorker(id=1, hook=hook)
+        alice = VirtualWorker(id=2, hook=hook)
+        local.add_worker(bob)
+        local.add_worker(alice)
+
+        x = torch.FloatTensor([1, 2, 3]).send(bob)
+        y = torch.FloatTensor([4, 5, 6]).send(alice)
+
+        async def round_trip():
+            x2, y2 = await asyncio.gather(x.async_call('add', x), y.async_call('mul', y))
+            return await asyncio.gather(x2.async_get(), y2.async_get())
+
+        x2, y2 = asyncio.get_event_loop().run_until_complete(round_trip())
+        assert torch.equal(x2, torch.FloatTensor([2, 4, 6]))
+        assert torch.equal(y2, torch.FloatTensor([16, 25, 36]))
+
+    def test_async_messages_overlap_across_workers(self):
+
+        class NetworkWorker(VirtualWorker):
+            """Talks to its recipients as if they were remote processes: the
+            transport runs on the executor, and messages only reach their
+            recipient once all of them are in flight."""
+            in_flight = threading.Barrier(3, timeout=10)
+            processing = threading.Lock()
+
+            _async_send_msg = BaseWorker._async_send_msg
+
+            def _send_msg(self, message_wrapper_json_binary, recipient):
+                self.in_flight.wait()
+                with self.processing:
+                    return super()._send_msg(message_wrapper_json_binary, recipient)
+
+        hook = TorchHook(verbose=False)
+        client = NetworkWorker(id=10, hook=hook)
+        workers = [VirtualWorker(id=i, hook=hook) for i in range(1, 4)]
+        xs = [torch.FloatTensor([i]) for i in range(3)]
+        for x, worker in zip(xs, workers):
+            worker.register_object(x)
+
+        async def request_all():
+            return await asyncio.gather(*[client.async_send_msg(x.id, 'req_obj', worker)
+                                          for x, worker in zip(xs, workers)])
+
+        # the barrier breaks (and the test fails) unless the requests to the
+        # three workers are in flight at the same time
+        responses = asyncio.get_event_loop().run_until_complete(request_all())
+        for x, response in zip(xs, responses):
+            assert torch.equal(client.receive_obj(response), x)
+
+    def test_async_messages_virtual_workers_inline(self):
+
+        threads = []
+
+        class RecordingWorker(VirtualWorker):
+            def receive_msg(self, message_wrapper_json, is_binary=True):
+                threads.append(threading.current_thread())
+                return super().receive_msg(message_wrapper_json, is_binary)
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        workers = [RecordingWorker(id=i, hook=hook) for i in range(1, 4)]
+        for worker in workers:
+            local.add_worker(worker)
+
+        async def request_all(pointers):
+            return await asyncio.gather(*[p.async_get() for p in pointers])
+
+        pointers = [torch.FloatTensor([i]).send(w) for i, w in enumerate(workers)]
+        del threads[:]
+        results = asyncio.get_event_loop().run_until_complete(request_all(pointers))
+        # workers of this process process messages on the event loop's thread
+        assert threads and all(t is threading.current_thread() for t in threads)
+        for i, result in enumerate(results):
+            assert torch.equal(result, torch.FloatTensor([i]))
+
+    def test_async_get_multiple_owners(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        bob = VirtualWorker(id=1, hook=hook, verbose=False)
+        alice = VirtualWorker(id=2, hook=hook, verbose=False)
+        local.add_worker(bob)
+        local.add_worker(alice)
+
+        x = torch.FloatTensor([1, 2]).send([bob, alice])
+        alice._objects[x.id].add_(2)
+        y = torch.FloatTensor([3, 4]).send([bob, alice])
+
+        async def get_both():
+            return await asyncio.gather(x.async_get(), y.async_get(reduce='sum'))
+
+        x, y = asyncio.get_event_loop().run_until_complete(get_both())
+        assert torch.equal(x, torch.FloatTensor([2, 3]))
+        assert torch.equal(y, torch.FloatTensor([6, 8]))
+        assert x.owners == y.owners == [local.id]
+
+    def test_deferred_remote_calls(self):
+
+        class CountingWorker(VirtualWorker):
+            def receive_msg(self, message_wrapper_json, is_binary=True):
+                self.messages += 1
+                return super().receive_msg(message_wrapper_json, is_binary)
+
+            def process_message_type(self, message_wrapper):
+                self.received.append(message_wrapper['type'])
+                return super().process_message_type(message_wrapper)
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = CountingWorker(id=2, hook=hook, verbose=False)
+        local.add_worker(remote)
+
+        x = torch.FloatTensor([1, 2, 3, 4, 5]).send(remote)
+        x2 = torch.FloatTensor([1, 1, 1, 1, 1]).send(remote)
+        remote.messages, remote.received = 0, []
+
+        with hook.deferred_execution():
+            y = x + x2 + x
+            z = (y * 2).view(5, 1)
+            # nothing is sent until a result is needed
+            assert remote.messages == 0
+            assert z.is_pointer and z.id not in remote._objects
+            # each pointer holds the future of the command computing it
+            assert not (y._deferred_result.done() or z._deferred_result.done())
+
+            # the whole chain runs with a single message
+            assert torch.equal(z.get(), torch.FloatTensor([[6], [10], [14], [18], [22]]))
+            assert remote.messages == 2
+            assert y._deferred_result.done()
+            # (the intermediate results let go of may be deleted along)
+            received = [t for t in remote.received if t != 'delete']
+            assert received == ['composite'] + ['torch_cmd'] * 4 + ['req_obj']
+
+            # commands which can't be queued are sent after the queued ones
+            w = y + x
+            assert float(w.sum()) == 50
+            assert remote.messages == 4
+
+        assert torch.equal(y.get(), torch.FloatTensor([3, 5, 7, 9, 11]))
+
+    def test_queued_messages_responses(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = VirtualWorker(id=2, hook=hook, verbose=False)
+        local.add_worker(remote)
+
+        x = torch.FloatTensor([1, 2, 3]).send(remote)
+        command, _ = hook._compile_command(utils.pass_method_args(
+            torch.FloatTensor.old_add)(x, 1), has_self=True)
+        responses = [local.queue_msg(message=command, message_type='torch_cmd',
+                                     recipient=remote),
+                     local.queue_msg(message=x.id, message_type='req_obj', recipient=remote)]
+        assert not any(response.done() for response in responses)
+
+        # each response of the composite message goes to its own future
+        registration, torch_type, _, _ = local.process_response(responses[0].result())
+        assert torch_type == 'torch.FloatTensor' and registration['id'] in remote._objects
+        assert all(response.done() for response in responses)
+        assert torch.equal(local.receive_obj(responses[1].result()), torch.FloatTensor([1, 2, 3]))
+
+    def test_batched_remote_calls(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = VirtualWorker(id=2, hook=hook, verbose=False)
+        local.add_worker(remote)
+
+        x = torch.FloatTensor([1, 2, 3]).send(remote)
+        local.queue_size, local.queue_timeout = 3, 0.05
+        try:
+            y = x + 1
+            z = y + 1
+            assert y.id not in remote._objects
+            # the queue is sent once full
+            w = z + 1
+            assert w.id in remote._objects
+
+            # or once it timed out, without any other command queued
+            v = w + 1
+            assert v.id not in remote._objects
+            time.sleep(0.2)
+            assert v.id in remote._objects
+            assert not local._queue_timers
+        finally:
+            local.queue_size, local.queue_timeout = 0, None
+
+        assert torch.equal(v.get(), torch.FloatTensor([5, 6, 7]))
+
+    def test_queued_command_errors(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = VirtualWorker(id=2, hook=hook, verbose=False)
+        local.add_worker(remote)
+
+        x = torch.FloatTensor([1, 2, 3]).send(remote)
+        m = torch.FloatTensor([[1, 2], [3, 4]]).send(remote)
+
+        # the error of a queued command is raised when the queue is flushed
+        with self.assertRaises(RuntimeError):
+            with hook.deferred_execution():
+                y = x + 1
+                bad = x.mm(m)
+                z = y + 1
+        # without stopping the commands queued after it
+        assert y.id in remote._objects and z.id in remote._objects
+        assert bad.id not in remote._objects
+
+        # errors are raised once, and by the pointer to the failed result
+        hook.flush()
+        self.assertRaises(RuntimeError, bad.get)
+        assert torch.equal(z.get(), torch.FloatTensor([3, 4, 5]))
+
     def test_fixed_prec_ops(self):
         hook = TorchHook(verbose=False)
 
@@ -356,6 +915,107 @@ class TestTorchTensor(TestCase):
         assert (z.get() == torch.FloatTensor([[1, 0, 0], [0, 1, 0], [0, 0, 1]])).all()
 
 
+    def test_multi_owner_get_reduce(self):
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        workers = [VirtualWorker(id=i, hook=hook, verbose=False) for i in range(1, 6)]
+        for worker in workers:
+            local.add_worker(worker)
+
+        for reduce, expected in [('mean', [3, 4]), ('sum', [15, 20]),
+                                 (lambda result, x: torch.max(result, x), [5, 6])]:
+            x = torch.FloatTensor([0, 1]).send(workers)
+            assert len(x.owners) == 5
+            for i, worker in enumerate(workers):
+                worker._objects[x.id].add_(i + 1)
+
+            x.get(reduce=reduce, max_in_flight=2)
+            assert torch.equal(x, torch.FloatTensor(expected))
+            assert x.owners == [local.id]
+            for worker in workers:
+                assert x.id not in worker._objects
+
+
+    def test_move_between_workers(self):
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        bob = VirtualWorker(id=1, hook=hook, verbose=False)
+        alice = VirtualWorker(id=2, hook=hook, verbose=False)
+        local.add_worker(bob)
+        local.add_worker(alice)
+        bob.add_worker(alice)
+
+        x = torch.FloatTensor([1, 2, 3]).send(bob)
+        x.move(alice)
+        assert x.id not in bob._objects and x.id in alice._objects
+        assert x.owners == [alice]
+        assert torch.equal(x.get(), torch.FloatTensor([1, 2, 3]))
+
+        # the data and grad of a Variable move along with it
+        v = Var(torch.FloatTensor([1, 2]), requires_grad=True)
+        v.sum().backward()
+        v.send(bob)
+        v.move(alice)
+        assert v.id not in bob._objects and v.id in alice._objects
+        for pointer in [v, v.data, v.grad, v.grad.data]:
+            assert pointer.is_pointer and pointer.owners == [alice]
+        assert torch.equal((v.data + 1).get(), torch.FloatTensor([2, 3]))
+        assert torch.equal(v.grad.data.get(), torch.FloatTensor([1, 1]))
+
+    def test_all_reduce_between_workers(self):
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        workers = [VirtualWorker(id=i, hook=hook, verbose=False) for i in range(1, 6)]
+        for worker in workers:
+            local.add_worker(worker)
+            for other in workers:
+                if other is not worker:
+                    worker.add_worker(other)
+
+        for algorithm in ['ring', 'tree']:
+            for reduce, expected in [('sum', [15, 20, 25, 30, 35, 40, 45]),
+                                     ('mean', [3, 4, 5, 6, 7, 8, 9])]:
+                x = torch.FloatTensor([0, 1, 2, 3, 4, 5, 6]).send(workers)
+                for i, worker in enumerate(workers):
+                    worker._objects[x.id].add_(i + 1)
+
+                x.all_reduce(reduce, algorithm)
+                for worker in workers:
+                    assert torch.equal(worker._objects[x.id], torch.FloatTensor(expected))
+
+    def test_all_reduce_steps_overlap(self):
+
+        class NetworkWorker(VirtualWorker):
+            """Only lets its messages reach their recipient once four of
+            them are in flight."""
+            in_flight = threading.Barrier(4, timeout=10)
+
+            def _send_msg(self, message_wrapper_json_binary, recipient):
+                self.in_flight.wait()
+                return super()._send_msg(message_wrapper_json_binary, recipient)
+
+        hook = TorchHook(verbose=False)
+        client = NetworkWorker(id=10, hook=hook, verbose=False)
+        workers = [VirtualWorker(id=i, hook=hook, verbose=False) for i in range(1, 5)]
+        for worker in workers:
+            for other in workers:
+                if other is not worker:
+                    worker.add_worker(other)
+
+        obj_id = client.ids.new_id()
+        for i, worker in enumerate(workers):
+            worker.register_object(torch.FloatTensor([i, 1, 2 * i, 3, i * i, 5, 6, 7]),
+                                   id=obj_id)
+
+        # the barrier breaks (and the test fails) unless the four messages of
+        # every step of the ring are in flight at the same time, their
+        # recipients forwarding chunks to each other from the pool's threads
+        client.all_reduce(obj_id, workers, 'sum', 'ring')
+        for worker in workers:
+            assert torch.equal(worker._objects[obj_id],
+                               torch.FloatTensor([6, 4, 12, 12, 14, 20, 24, 28]))
+
+
 class TestTorchVariable(TestCase):
 
     def test_remote_backprop(self):
@@ -449,6 +1109,94 @@ class TestTorchVariable(TestCase):
         dec2 = decoder.decode(enc)
         assert dec1 == dec2
 
+    def test_decode_json_python_types(self):
+
+        hook = TorchHook(verbose=False)
+        remote = VirtualWorker(id=1, hook=hook)
+        hook.local_worker.add_worker(remote)
+
+        x = torch.FloatTensor([1, 2]).send(remote)
+        obj = [range(2, 9, 3), range(0), {1, 2}, bytearray(b'ab'), (x, [slice(1, None, 2)]),
+               {'__init__': 1, 'b': 2}, {'__unknown__': 3}]
+        enc = json.dumps(utils.PythonEncoder().encode(obj))
+        dec = utils.PythonJSONDecoder(remote).decode(enc)
+        assert dec[:4] == [range(2, 9, 3), range(0), {1, 2}, bytearray(b'ab')]
+        assert dec[4][0] is remote._objects[x.id] and dec[4][1] == [slice(1, None, 2)]
+        # dicts which weren't created by the encoder are left alone
+        assert dec[5:] == [{'__init__': 1, 'b': 2}, {'__unknown__': 3}]
+
+    def test_encode_decode_command(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = VirtualWorker(id=1, hook=hook)
+        local.add_worker(remote)
+
+        x = Var(torch.FloatTensor([[1, -1], [0, 1]]))
+        x.send(remote)
+        y = torch.LongTensor([1, 2])
+        y.send(remote)
+
+        args = [[x, (1, [1.3], y)], slice(0, 2, None), None, range(3)]
+        command, tensorvars = hook.command_encoder.encode('index_select', True, x, args,
+                                                          {'dim': 0, 'index': y})
+        assert tensorvars == [x, x, y, y]
+        # command names are sent as integer opcodes and tensors as typed ids
+        assert isinstance(command[utils.CMD_NAME], int)
+        assert command[utils.CMD_SELF] == [utils.CMD_TAG_TENSORVAR, 0, x.id]
+
+        command = json.loads(json.dumps(command))
+        decoded = utils.CommandDecoder(hook.command_names, remote).decode(command)
+        assert decoded['command'] == 'index_select'
+        assert decoded['self'] is remote._objects[x.id]
+        assert decoded['args'] == [[remote._objects[x.id], (1, [1.3], remote._objects[y.id])],
+                                   slice(0, 2, None), None, range(3)]
+        assert decoded['kwargs'] == {'dim': 0, 'index': remote._objects[y.id]}
+        assert len(decoded['tensorvars']) == 4
+
+        # unknown commands are sent by name
+        command, _ = hook.command_encoder.encode('not_a_torch_command', False, None, [], {})
+        assert command[utils.CMD_NAME] == 'not_a_torch_command'
+
+    def test_send_get_var_with_gradient_binary(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        local.verbose = False
+        remote = VirtualWorker(id=1, hook=hook, verbose=False)
+        local.add_worker(remote)
+
+        model = Var(torch.FloatTensor([[1, 2], [3, 4]]), requires_grad=True)
+        model.sum().backward()
+
+        blob = model.ser()
+        message_obj, segments = utils.unpack_blob(blob)
+        assert len(segments) == 2
+        assert message_obj['grad'] is not None
+
+        model.send_(remote)
+        assert model.id in remote._objects
+        model.get_()
+        assert torch.equal(model.data, torch.FloatTensor([[1, 2], [3, 4]]))
+        assert torch.equal(model.grad.data, torch.ones(2, 2))
+
+    def test_deferred_remote_var_calls(self):
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        local.verbose = False
+        remote = VirtualWorker(id=1, hook=hook, verbose=False)
+        local.add_worker(remote)
+
+        x = Var(torch.FloatTensor([1, 2, 3, 4])).send(remote)
+        with hook.deferred_execution():
+            y = (x * x + x).sigmoid()
+            assert y.data.is_pointer and y.data.id not in remote._objects
+        assert y.id in remote._objects and y.data.id in remote._objects
+
+        expected = (Var(torch.FloatTensor([2, 6, 12, 20]))).sigmoid()
+        assert torch.equal(y.get(), expected)
+
     def test_var_gradient_keeps_id_during_send_(self):
         # PyTorch has a tendency to delete var.grad python objects
         # and re-initialize them (resulting in new/random ids)
@@ -586,6 +1334,110 @@ class TestTorchVariable(TestCase):
 
         assert (self.assertAlmostEqual(X,Y) for X,Y in zip(x,y))
 
+    def test_module_send_get_single_message(self):
+
+        class CountingWorker(VirtualWorker):
+            def process_message_type(self, message_wrapper):
+                self.received.append(message_wrapper['type'])
+                return super().process_message_type(message_wrapper)
+
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = CountingWorker(id=3, hook=hook, verbose=False)
+        local.add_worker(remote)
+
+        model = nn.Sequential(*[nn.Linear(4, 4) for _ in range(10)])
+        values = [p.data.clone() for p in model.parameters()]
+
+        remote.received = []
+        model.send(remote)
+        assert [t for t in remote.received if t not in ('composite', 'delete')] == ['objs']
+        for p in model.parameters():
+            assert p.is_pointer and p.id in remote._objects
+            assert p.grad is not None and p.grad.id in remote._objects
+        remote_ids = [i for p in model.parameters()
+                      for i in (p.id, p.data.id, p.grad.id, p.grad.data.id)]
+        assert all(i in remote._objects for i in remote_ids)
+
+        remote.received = []
+        model.get()
+        assert [t for t in remote.received if t not in ('composite', 'delete')] == ['req_objs']
+        for p, value in zip(model.parameters(), values):
+            assert not p.is_pointer and torch.equal(p.data, value)
+        # the children of the parameters are not left behind on the remote worker
+        assert not any(i in remote._objects for i in remote_ids)
+
+    def test_module_get_delta(self):
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        remote = VirtualWorker(id=3, hook=hook, verbose=False)
+        local.add_worker(remote)
+
+        torch.manual_seed(0)
+        model = nn.Linear(100, 10)
+        received = {}
+        for compression in [None, 'float16', 'topk', 'quantize']:
+            values = [p.data.clone() for p in model.parameters()]
+            model.send(remote, delta=True)
+            assert model.wire_stats['sent'] > 0
+            # "train" the model remotely
+            updates = []
+            for p in model.parameters():
+                update = torch.randn(p.data.size())
+                remote._objects[p.id].data += update
+                updates.append(update)
+
+            model.get(delta=True, compression=compression, error_feedback=False,
+                      topk_ratio=0.1)
+            received[compression] = model.wire_stats['received']
+            for p, value, update in zip(model.parameters(), values, updates):
+                assert not p.is_pointer and p.id not in remote._objects
+                expected = value + update
+                if compression is None:
+                    assert torch.equal(p.data, expected)
+                elif compression == 'float16':
+                    assert (p.data - expected).abs().max() < 1e-2
+                elif compression == 'topk':
+                    # the largest 10% of the changes are exact, the rest is dropped
+                    kept = (p.data - value).ne(0)
+                    assert kept.sum() == max(1, int(0.1 * p.data.numel()))
+                    assert (p.data - expected).abs()[kept].max() < 1e-5
+                else:
+                    scale = (update.max() - update.min()) / 255
+                    assert (p.data - expected).abs().max() <= scale / 2 + 1e-5
+
+        assert received['float16'] < received[None]
+        assert received['topk'] < received[None]
+        assert received['quantize'] < received['float16']
+
+        # with error feedback, the changes dropped by topk are sent in the next rounds
+        values = [p.data.clone() for p in model.parameters()]
+        model.send(remote, delta=True)
+        for p in model.parameters():
+            remote._objects[p.id].data += 1
+        model.get(delta=True, compression='topk', topk_ratio=0.5)
+        model.send(remote, delta=True)
+        model.get(delta=True, compression='topk', topk_ratio=0.5)
+        for p, value in zip(model.parameters(), values):
+            assert (p.data - value - 1).abs().max() < 1e-5
+            # the grads come back zeroed, and nothing is left on the remote worker
+            assert p.grad.data.abs().sum() == 0
+            assert p.grad.id not in remote._objects and p.data.id not in remote._objects
+
+        # the compression errors are kept across rounds, until the model is sent
+        # without delta or deleted
+        ids = [p.id for p in model.parameters()]
+        assert all(i in remote._update_residuals for i in ids)
+        model.send(remote)
+        assert not any(i in remote._update_residuals for i in ids)
+        model.get()
+        model.send(remote, delta=True)
+        model.get(delta=True, compression='topk', topk_ratio=0.5)
+        assert all(i in remote._update_residuals for i in ids)
+        for i in ids:
+            remote.rm_obj(i)
+        assert not remote._update_residuals
+
     def test_federated_learning(self):
 
         torch.manual_seed(42)
@@ -634,6 +1486,140 @@ class TestTorchVariable(TestCase):
 
         assert round(final_loss, 2) == 0.18
 
+    def test_multi_owner_variable_get_averages_grads(self):
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        bob = VirtualWorker(id=1, hook=hook, verbose=False)
+        alice = VirtualWorker(id=2, hook=hook, verbose=False)
+        local.add_worker(bob)
+        local.add_worker(alice)
+
+        x = Var(torch.FloatTensor([1, 2]), requires_grad=True)
+        x.sum().backward()
+        x.send([bob, alice])
+        alice._objects[x.id].data.add_(2)
+        alice._objects[x.id].grad.data.mul_(3)
+
+        x.get()
+        assert torch.equal(x.data, torch.FloatTensor([2, 3]))
+        assert torch.equal(x.grad.data, torch.FloatTensor([2, 2]))
+
+    def test_multi_owner_get_registers_only_result(self):
+        hook = TorchHook(verbose=False)
+        local = hook.local_worker
+        workers = [VirtualWorker(id=i, hook=hook, verbose=False) for i in range(1, 4)]
+        for worker in workers:
+            local.add_worker(worker)
+
+        x = Var(torch.FloatTensor([1, 2]), requires_grad=True)
+        x.sum().backward()
+        x.send(workers)
+
+        folded = []
+
+        def reduce(result, tensor):
+            folded.append(tensor)
+            return result.add_(tensor)
+
+        x.get(reduce=reduce)
+        assert torch.equal(x.data, torch.FloatTensor([3, 6]))
+        assert torch.equal(x.grad.data, torch.FloatTensor([3, 3]))
+        # the data and grad of the two copies folded into the first one
+        assert len(folded) == 4
+        registered = list(local._objects.values()) + list(local._tmp_objects.values())
+        assert not any(t is obj for t in folded for obj in registered)
+        assert local._objects[x.id] is x
+
+    def test_multi_owner_get_requests_overlap(self):
+
+        class NetworkWorker(VirtualWorker):
+            """Only lets its messages reach their recipient once three of
+            them are in flight."""
+            in_flight = threading.Barrier(3, timeout=10)
+
+            def _send_msg(self, message_wrapper_json_binary, recipient):
+                self.in_flight.wait()
+                return super()._send_msg(message_wrapper_json_binary, recipient)
+
+        hook = TorchHook(verbose=False)
+        client = NetworkWorker(id=10, hook=hook, verbose=False)
+        workers = [VirtualWorker(id=i, hook=hook, verbose=False) for i in range(1, 4)]
+        obj_id = client.ids.new_id()
+        for i, worker in enumerate(workers):
+            worker.register_object(torch.FloatTensor([i, 2 * i]), id=obj_id)
+
+        # the barrier breaks (and the test fails) unless the three copies are
+        # requested at the same time, their owners processing the requests on
+        # the threads of the pool
+        x = client.request_obj_reduced(obj_id, workers, 'sum', max_in_flight=3)
+        assert torch.equal(x, torch.FloatTensor([3, 6]))
+        assert client._objects[obj_id] is x
+        assert all(obj_id not in worker._objects for worker in workers)
+
+    def test_federated_averaging(self):
+
+        torch.manual_seed(42)
+        hook = TorchHook(verbose=False)
+        me = hook.local_worker
+        bob = VirtualWorker(id=1, hook=hook, verbose=False)
+        alice = VirtualWorker(id=2, hook=hook, verbose=False)
+        me.add_worker(bob)
+        me.add_worker(alice)
+
+        data = Var(torch.FloatTensor([[0, 0], [0, 1], [1, 0], [1, 1]]))
+        target = Var(torch.FloatTensor([[0], [0], [1], [1]]))
+        datasets = [(data[0:2].send(bob), target[0:2].send(bob)),
+                    (data[2:].send(alice), target[2:].send(alice))]
+
+        model = nn.Linear(2, 1)
+        initial_loss = ((model(data) - target)**2).sum().data[0]
+        trainer = syft.federated.FederatedAveraging(model, datasets, weights=[2, 2])
+        for _ in range(20):
+            stats = trainer.round()
+
+        assert len(trainer.history) == 20
+        assert stats['workers'] == [1, 2]
+        assert all(0 < t <= stats['time'] for t in stats['worker_times'])
+        first_losses, last_losses = trainer.history[0]['losses'], stats['losses']
+        assert sum(last_losses) < sum(first_losses)
+        for p in model.parameters():
+            assert not p.is_pointer
+        assert ((model(data) - target)**2).sum().data[0] < initial_loss / 2
+
+    def test_federated_averaging_trains_concurrently(self):
+
+        class BarrierWorker(VirtualWorker):
+            """Once armed, waits on the first message it receives until the
+            other worker received its own."""
+            started = threading.Barrier(2, timeout=10)
+            armed = False
+
+            def receive_msg(self, message_wrapper_json, is_binary=True):
+                if self.armed:
+                    self.armed = False
+                    self.started.wait()
+                return super().receive_msg(message_wrapper_json, is_binary)
+
+        hook = TorchHook(verbose=False)
+        me = hook.local_worker
+        bob = BarrierWorker(id=1, hook=hook, verbose=False)
+        alice = BarrierWorker(id=2, hook=hook, verbose=False)
+        me.add_worker(bob)
+        me.add_worker(alice)
+
+        data = Var(torch.FloatTensor([[0, 0], [0, 1], [1, 0], [1, 1]]))
+        target = Var(torch.FloatTensor([[0], [0], [1], [1]]))
+        datasets = [(data[0:2].send(bob), target[0:2].send(bob)),
+                    (data[2:].send(alice), target[2:].send(alice))]
+        trainer = syft.federated.FederatedAveraging(nn.Linear(2, 1), datasets)
+
+        # the barrier breaks (and the round fails) unless the copies of both
+        # workers are trained at the same time
+        bob.armed = alice.armed = True
+        stats = trainer.round()
+        assert not (bob.armed or alice.armed)
+        assert all(loss is not None for loss in stats['losses'])
+
 
     def test_torch_F_relu_on_remote_var(self):
         hook = TorchHook(verbose=False)